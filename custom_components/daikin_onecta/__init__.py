@@ -5,15 +5,27 @@ import logging
 from aiohttp import ClientError
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.core import SupportsResponse
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import config_entry_oauth2_flow
+from homeassistant.helpers import issue_registry as ir
+from homeassistant.helpers.storage import Store
 
 from .const import COORDINATOR
 from .const import DAIKIN_API
 from .const import DAIKIN_DEVICES
 from .const import DOMAIN
+from .const import FORWARDED_PLATFORMS
 from .coordinator import OnectaDataUpdateCoordinator
 from .daikin_api import DaikinApi
+from .daikin_api import token_claims
+from .phase import STORAGE_KEY
+from .phase import STORAGE_VERSION
+from .scheduler import async_release_scheduler
+from .schemas import BULK_SET_SCHEMA
+from .schemas import FORCE_UPDATE_SCHEMA
+from .schemas import PULL_DEVICES_SCHEMA
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,15 +33,65 @@ PARALLEL_UPDATES = 0
 
 SERVICE_FORCE_UPDATE = "force_update"
 SERVICE_PULL_DEVICES = "pull_devices"
+SERVICE_BULK_SET = "bulk_set"
+
+# Rate limit issues raised before their id included the config entry id
+LEGACY_ISSUES = ["minute_rate_limit", "day_rate_limit"]
 
 SIGNAL_DELETE_ENTITY = "daikin_delete"
 SIGNAL_UPDATE_ENTITY = "daikin_update"
 
 COMPONENT_TYPES = ["climate", "sensor", "water_heater", "switch", "select", "binary_sensor"]
 
+# Platforms which only have entities for devices with one of these management point types
+MANAGEMENT_POINT_PLATFORMS = {
+    "climateControl": "climate",
+    "domesticHotWaterTank": "water_heater",
+    "domesticHotWaterFlowThrough": "water_heater",
+}
+
+
+def required_platforms(devices):
+    """Return the platforms which can have entities for the devices.
+
+    The climate, water heater and select platforms are only needed when a device
+    has their management point or a schedule, the others are generic.
+    """
+    platforms = {"sensor", "switch", "binary_sensor"}
+    for device in devices.values():
+        for management_point in device.daikin_data.get("managementPoints", []):
+            platform = MANAGEMENT_POINT_PLATFORMS.get(management_point.get("managementPointType"))
+            if platform is not None:
+                platforms.add(platform)
+            if "schedule" in management_point:
+                platforms.add("select")
+    return [component for component in COMPONENT_TYPES if component in platforms]
+
 
 async def async_setup(hass, config):
     """Setup the Daikin Onecta component."""
+    for issue_id in LEGACY_ISSUES:
+        ir.async_delete_issue(hass, DOMAIN, issue_id)
+
+    # The services are rarely used, their modules are only imported when called
+    async def force_update(call: ServiceCall):
+        from .refresh import async_force_update
+
+        return await async_force_update(hass, call)
+
+    async def pull_devices(call: ServiceCall):
+        from .refresh import async_pull_devices
+
+        return await async_pull_devices(hass, call)
+
+    async def bulk_set(call: ServiceCall):
+        from .bulk import async_bulk_set
+
+        return await async_bulk_set(hass, call)
+
+    hass.services.async_register(DOMAIN, SERVICE_FORCE_UPDATE, force_update, schema=FORCE_UPDATE_SCHEMA, supports_response=SupportsResponse.OPTIONAL)
+    hass.services.async_register(DOMAIN, SERVICE_PULL_DEVICES, pull_devices, schema=PULL_DEVICES_SCHEMA, supports_response=SupportsResponse.OPTIONAL)
+    hass.services.async_register(DOMAIN, SERVICE_BULK_SET, bulk_set, schema=BULK_SET_SCHEMA, supports_response=SupportsResponse.OPTIONAL)
     return True
 
 
@@ -37,27 +99,42 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
     """Establish connection with Daikin."""
     implementation = await config_entry_oauth2_flow.async_get_config_entry_implementation(hass, config_entry)
 
-    hass.data.update({DOMAIN: {}})
-    hass.data[DOMAIN][DAIKIN_DEVICES] = {}
-    daikin_api = DaikinApi(hass, config_entry, implementation)
-    hass.data[DOMAIN][DAIKIN_API] = daikin_api
-
-    try:
-        await daikin_api.async_get_access_token()
-    except ClientError as err:
-        raise ConfigEntryNotReady from err
+    # Entries created before multiple accounts were supported use the domain as unique id
+    account = token_claims(config_entry.data.get("token", {})).get("sub")
+    if config_entry.unique_id == DOMAIN and account:
+        hass.config_entries.async_update_entry(config_entry, unique_id=account)
 
-    coordinator = OnectaDataUpdateCoordinator(hass, config_entry)
-    hass.data[DOMAIN][COORDINATOR] = coordinator
+    daikin_api = DaikinApi(hass, config_entry, implementation)
+    config_entry.runtime_data = {DAIKIN_API: daikin_api, DAIKIN_DEVICES: {}}
 
     try:
-        await coordinator.async_config_entry_first_refresh()
-    except Exception as ex:
-        raise ConfigEntryNotReady(f"Config Not Ready: {ex}")
-
-    config_entry.async_on_unload(config_entry.add_update_listener(update_listener))
-
-    await hass.config_entries.async_forward_entry_setups(config_entry, COMPONENT_TYPES)
+        try:
+            await daikin_api.async_get_access_token()
+        except ClientError as err:
+            raise ConfigEntryNotReady from err
+
+        coordinator = OnectaDataUpdateCoordinator(hass, config_entry)
+        config_entry.runtime_data[COORDINATOR] = coordinator
+        await coordinator.async_load_phase()
+
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception as ex:
+            raise ConfigEntryNotReady(f"Config Not Ready: {ex}")
+
+        config_entry.async_on_unload(config_entry.add_update_listener(update_listener))
+        coordinator.async_track_boundaries()
+        config_entry.async_on_unload(coordinator.async_untrack_boundaries)
+        daikin_api.async_start_token_refresh()
+        config_entry.async_on_unload(daikin_api.async_stop_token_refresh)
+
+        platforms = required_platforms(config_entry.runtime_data[DAIKIN_DEVICES])
+        config_entry.runtime_data[FORWARDED_PLATFORMS] = platforms
+        await hass.config_entries.async_forward_entry_setups(config_entry, platforms)
+    except BaseException:
+        # A failed setup is never unloaded, so the account is released from the shared scheduler here
+        async_release_scheduler(hass, config_entry.entry_id)
+        raise
 
     return True
 
@@ -65,14 +142,20 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
 async def async_unload_entry(hass, config_entry):
     """Unload a config entry."""
     _LOGGER.debug("Unloading integration...")
-    await asyncio.gather(*(hass.config_entries.async_forward_entry_unload(config_entry, component) for component in COMPONENT_TYPES))
-    hass.data[DOMAIN].clear()
-    if not hass.data[DOMAIN]:
-        hass.data.pop(DOMAIN)
+    # An entry whose setup didn't finish has no forwarded platforms
+    platforms = getattr(config_entry, "runtime_data", {}).get(FORWARDED_PLATFORMS, [])
+    await asyncio.gather(*(hass.config_entries.async_forward_entry_unload(config_entry, component) for component in platforms))
+    async_release_scheduler(hass, config_entry.entry_id)
     return True
 
 
+async def async_remove_entry(hass, config_entry):
+    """Remove the stored polling phase of a config entry."""
+    await Store(hass, STORAGE_VERSION, STORAGE_KEY.format(config_entry.entry_id)).async_remove()
+
+
 async def update_listener(hass, config_entry):
     """Handle options update."""
-    coordinator = hass.data[DOMAIN][COORDINATOR]
+    config_entry.runtime_data[DAIKIN_API].update_settings(config_entry)
+    coordinator = config_entry.runtime_data[COORDINATOR]
     coordinator.update_settings(config_entry)
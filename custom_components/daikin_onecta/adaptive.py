@@ -0,0 +1,133 @@
+"""Adaptive polling from the observed change rates of the Daikin devices."""
+import json
+import math
+import time
+
+# Weight of the newest observation in the moving average of the chance a poll sees no change
+ALPHA = 0.3
+
+# Poll so that on average this many changes happen between two polls
+TARGET_CHANGES = 1.0
+
+# Number of polls needed before the change rates are used
+MIN_OBSERVATIONS = 3
+
+# The adaptive interval is never shorter than this many seconds and never
+# longer than MAX_FACTOR times the configured interval
+MIN_INTERVAL = 60
+MAX_FACTOR = 3
+
+# Share of the daily rate limit the polling may use, the rest is left for commands
+BUDGET_SHARE = 0.8
+
+# Lower bound of the chance a poll sees no change, keeps the change rate finite
+MIN_UNCHANGED = 1e-6
+
+
+class ChangeRate:
+    """Estimated number of changes per second of one management point.
+
+    A poll only shows whether the data changed, not how often it changed since the
+    previous poll. The changes are taken as a Poisson process, for which the chance
+    a poll after elapsed seconds sees no change is exp(-rate * elapsed). The moving
+    average of that chance gives the rate, so a point which changes at every poll
+    gets a rate above one change per interval and the interval shortens.
+    """
+
+    __slots__ = ("fingerprint", "rate", "changes", "observed")
+
+    def __init__(self, fingerprint, now, rate=None):
+        self.fingerprint = fingerprint
+        # Without a seed the first observation assumes one change per elapsed time
+        self.rate = rate
+        self.changes = 0
+        self.observed = now
+
+    def observe(self, changed, now):
+        """Observe the management point, returns False when no time passed since the previous observation."""
+        elapsed = now - self.observed
+        if elapsed <= 0:
+            return False
+        self.observed = now
+        rate = TARGET_CHANGES / elapsed if self.rate is None else self.rate
+        unchanged = ALPHA * (0 if changed else 1) + (1 - ALPHA) * math.exp(-rate * elapsed)
+        self.rate = -math.log(max(unchanged, MIN_UNCHANGED)) / elapsed
+        self.changes += changed
+        return True
+
+
+class ChangeTracker:
+    """Learns per device and management point how often the data changes between polls.
+
+    Each management point is observed at its own pace, a poll of one device only
+    observes the management points of that device. The rate of a new management
+    point is seeded from the base interval, as if that matched its changes.
+    """
+
+    def __init__(self):
+        self._points = {}
+        self.observations = 0
+        self.base = None
+
+    def record(self, devices_json, now=None):
+        """Compare the polled data of the management points with their previous poll."""
+        now = time.monotonic() if now is None else now
+        observed = False
+        for dev_data in devices_json or []:
+            for management_point in dev_data.get("managementPoints", []):
+                key = (dev_data["id"], management_point.get("embeddedId"))
+                fingerprint = hash(json.dumps(management_point, sort_keys=True))
+                point = self._points.get(key)
+                if point is None:
+                    self._points[key] = ChangeRate(fingerprint, now, TARGET_CHANGES / self.base if self.base else None)
+                    continue
+                observed |= point.observe(int(fingerprint != point.fingerprint), now)
+                point.fingerprint = fingerprint
+        if observed:
+            self.observations += 1
+
+    def record_unchanged(self, now=None, device_id=None):
+        """Record a poll which returned the same data as the previous one, of all devices or only of device_id."""
+        now = time.monotonic() if now is None else now
+        observed = False
+        for (dev_id, _), point in self._points.items():
+            if device_id is None or dev_id == device_id:
+                observed |= point.observe(0, now)
+        if observed:
+            self.observations += 1
+
+    def rate(self):
+        """Return the highest change rate in changes per second."""
+        return max((point.rate or 0.0 for point in self._points.values()), default=0.0)
+
+    def interval(self, base, minimum):
+        """Return the polling interval in seconds matching the change rates.
+
+        Until enough polls are observed the base interval is used. The interval
+        stays between minimum, which may be below the base interval, and MAX_FACTOR
+        times the base interval.
+        """
+        self.base = base
+        if self.observations < MIN_OBSERVATIONS:
+            return base
+        rate = self.rate()
+        maximum = max(base * MAX_FACTOR, minimum)
+        if rate <= 0:
+            return maximum
+        return min(max(TARGET_CHANGES / rate, minimum), maximum)
+
+    def as_dict(self):
+        return {
+            "observations": self.observations,
+            "changes_per_hour": {
+                f"{dev_id}/{embedded_id}": round((point.rate or 0.0) * 3600, 2)
+                for (dev_id, embedded_id), point in sorted(self._points.items(), key=lambda item: -(item[1].rate or 0.0))
+            },
+        }
+
+
+def budget_interval(day_limit):
+    """Return the shortest polling interval in seconds the daily rate limit allows, None when unknown."""
+    if not day_limit:
+        return None
+    return max(MIN_INTERVAL, 24 * 60 * 60 / (day_limit * BUDGET_SHARE))
@@ -13,7 +13,6 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import COORDINATOR
 from .const import DAIKIN_DEVICES
-from .const import DOMAIN as DAIKIN_DOMAIN
 from .const import ENABLED_DEFAULT
 from .const import ENTITY_CATEGORY
 from .const import VALUE_SENSOR_MAPPING
@@ -32,9 +31,9 @@ async def async_setup(hass, async_add_entities):
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Daikin climate based on config_entry."""
-    coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
+    coordinator = config_entry.runtime_data[COORDINATOR]
     sensors = []
-    for dev_id, device in hass.data[DAIKIN_DOMAIN][DAIKIN_DEVICES].items():
+    for dev_id, device in config_entry.runtime_data[DAIKIN_DEVICES].items():
         management_points = device.daikin_data.get("managementPoints", [])
         for management_point in management_points:
             management_point_type = management_point["managementPointType"]
@@ -0,0 +1,181 @@
+"""Bulk commands to many Daikin devices at once."""
+import asyncio
+import logging
+from collections import Counter
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.core import ServiceResponse
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from .commands import command_priority
+from .commands import context_priority
+from .const import COORDINATOR
+from .const import DAIKIN_API
+from .const import DAIKIN_DEVICES
+from .const import DOMAIN
+from .deadline import remaining_time
+from .deadline import request_deadline
+
+_LOGGER = logging.getLogger(__name__)
+
+RESULT_SET = "set"
+RESULT_UNCHANGED = "unchanged"
+RESULT_UNSUPPORTED = "unsupported"
+RESULT_UNAVAILABLE = "unavailable"
+RESULT_RATE_LIMITED = "rate_limited"
+RESULT_FAILED = "failed"
+
+
+def find_characteristic(device, management_point, characteristic):
+    """Return the management point and characteristic, the management point is given by type or embedded id."""
+    for mp in device.daikin_data.get("managementPoints", []):
+        if management_point in (mp.get("embeddedId"), mp.get("managementPointType")) and characteristic in mp:
+            return mp, mp[characteristic]
+    return None, None
+
+
+def characteristic_value(characteristic, path):
+    """Return the dict holding the value at path within the characteristic, None when it doesn't exist."""
+    current = characteristic
+    for key in path.split("/")[1:] if path else []:
+        value = current["value"] if isinstance(current.get("value"), dict) else current
+        if not isinstance(value, dict) or key not in value:
+            return None
+        current = value[key]
+    if not isinstance(current, dict) or "value" not in current:
+        return None
+    return current
+
+
+def plan_changes(device, changes):
+    """Return the writes needed for the device and the results of the changes which need no write."""
+    writes = []
+    results = []
+    for change in changes:
+        result = {"management_point": change["management_point"], "characteristic": change["characteristic"], "path": change["path"]}
+        mp, characteristic = find_characteristic(device, change["management_point"], change["characteristic"])
+        holder = characteristic_value(characteristic, change["path"]) if characteristic is not None else None
+        if holder is None or characteristic.get("settable") is False:
+            result["result"] = RESULT_UNSUPPORTED
+        elif holder["value"] == change["value"]:
+            result["result"] = RESULT_UNCHANGED
+        else:
+            writes.append((mp["embeddedId"], change, holder, result))
+        results.append(result)
+    return writes, results
+
+
+async def async_next_window_budget(daikin_api):
+    """Wait for the next minute window of the rate limit and return the requests it allows.
+
+    Nothing is allowed when the daily limit is used up or when the next window doesn't
+    start before the deadline of the call.
+    """
+    rate_limits = daikin_api.rate_limits
+    if rate_limits["day"] and rate_limits["remaining_day"] <= 0:
+        return 0
+    wait = min(rate_limits["ratelimit_reset"] or rate_limits["retry_after"] or 60, 60)
+    if wait >= remaining_time(float("inf")):
+        return 0
+    _LOGGER.debug("Rate limit of the minute reached, waiting %s seconds for the next window", wait)
+    await asyncio.sleep(wait)
+    if rate_limits["day"]:
+        return min(rate_limits["minute"], rate_limits["remaining_day"])
+    return rate_limits["minute"]
+
+
+def target_devices(hass: HomeAssistant, call: ServiceCall):
+    """Return the config entry and Daikin device of every device targeted by the call."""
+    selected = async_extract_referenced_entity_ids(hass, call, expand_group=False)
+    device_ids = set(selected.referenced_devices)
+    entity_registry = er.async_get(hass)
+    for entity_id in selected.referenced:
+        entity_entry = entity_registry.async_get(entity_id)
+        if entity_entry is not None and entity_entry.device_id is not None:
+            device_ids.add(entity_entry.device_id)
+
+    device_registry = dr.async_get(hass)
+    loaded_entries = {entry.entry_id: entry for entry in hass.config_entries.async_entries(DOMAIN) if entry.state is ConfigEntryState.LOADED}
+    targets = []
+    for device_id in device_ids:
+        device_entry = device_registry.async_get(device_id)
+        if device_entry is None:
+            continue
+        for domain, dev_id in device_entry.identifiers:
+            if domain != DOMAIN:
+                continue
+            for entry_id in device_entry.config_entries:
+                entry = loaded_entries.get(entry_id)
+                if entry is not None and dev_id in entry.runtime_data[DAIKIN_DEVICES]:
+                    targets.append((entry, entry.runtime_data[DAIKIN_DEVICES][dev_id]))
+    return targets
+
+
+async def async_bulk_set(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Apply the changes to all targeted devices.
+
+    Changes matching the cached data of a device are skipped. The writes of one
+    device are sent in order, at most max_concurrency devices are written at the
+    same time and each account only gets as many writes as its remaining rate
+    limits allow. When the minute limit is used up the writes wait for the next
+    minute window, the writes which can't be done before the timeout are refused.
+    """
+    targets = target_devices(hass, call)
+    semaphore = asyncio.Semaphore(call.data["max_concurrency"])
+    budgets = {}
+    budget_locks = {}
+    response = {}
+    updated_entries = set()
+
+    async def take_budget(entry):
+        async with budget_locks[entry.entry_id]:
+            if budgets[entry.entry_id] <= 0:
+                budgets[entry.entry_id] = await async_next_window_budget(entry.runtime_data[DAIKIN_API])
+            if budgets[entry.entry_id] <= 0:
+                return False
+            budgets[entry.entry_id] -= 1
+            return True
+
+    async def write_device(entry, device, writes):
+        async with semaphore:
+            for embedded_id, change, holder, result in writes:
+                if not device.available:
+                    result["result"] = RESULT_UNAVAILABLE
+                    continue
+                if not await take_budget(entry):
+                    result["result"] = RESULT_RATE_LIMITED
+                    continue
+                try:
+                    ok = await device.patch(device.id, embedded_id, change["characteristic"], change["path"], change["value"])
+                except Exception as e:
+                    _LOGGER.warning("Device '%s' bulk set of %s failed: %s", device.name, change["characteristic"], e)
+                    ok = False
+                if ok:
+                    # Keep the cached data in sync so that the entities show the new value
+                    holder["value"] = change["value"]
+                    updated_entries.add(entry.entry_id)
+                result["result"] = RESULT_SET if ok else RESULT_FAILED
+
+    tasks = []
+    for entry, device in targets:
+        if entry.entry_id not in budgets:
+            budgets[entry.entry_id] = entry.runtime_data[DAIKIN_API].request_budget()
+            budget_locks[entry.entry_id] = asyncio.Lock()
+        writes, results = plan_changes(device, call.data["changes"])
+        response[device.id] = {"name": device.name, "results": results}
+        if writes:
+            tasks.append(write_device(entry, device, writes))
+
+    with command_priority(context_priority(call.context)), request_deadline(call.data["timeout"]):
+        await asyncio.gather(*tasks)
+
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.entry_id in updated_entries:
+            entry.runtime_data[COORDINATOR].async_update_listeners()
+
+    summary = Counter(result["result"] for device in response.values() for result in device["results"])
+    return {"devices": response, "summary": dict(summary)}
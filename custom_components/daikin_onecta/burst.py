@@ -0,0 +1,101 @@
+"""Burst of fast polls of a device after a command or a mode change."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.core import HassJob
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_call_later
+
+from .conditional import NOT_MODIFIED
+from .daikin_api import DaikinApiError
+
+_LOGGER = logging.getLogger(__name__)
+
+# Seconds between the polls of a burst, after the last one the regular polling continues
+BURST_DELAYS = (30, 60, 120)
+
+# Requests within the rate limits which are never used by a burst, left for commands and the regular polling
+BURST_RESERVE = 5
+
+# Characteristics of which a change starts a burst
+MODE_CHARACTERISTICS = ("onOffMode", "operationMode")
+
+
+def mode_signature(device):
+    """Return the values of the mode characteristics of all management points of the device."""
+    return tuple(
+        management_point[characteristic].get("value")
+        for management_point in device.daikin_data.get("managementPoints", [])
+        for characteristic in MODE_CHARACTERISTICS
+        if isinstance(management_point.get(characteristic), dict)
+    )
+
+
+class BurstPoller:
+    """Polls single devices on a short decaying schedule, one burst per device."""
+
+    def __init__(self, hass: HomeAssistant, coordinator):
+        self.hass = hass
+        self.coordinator = coordinator
+        self._bursts = {}
+        # A cancelled burst doesn't continue after the poll running at that moment
+        self._generations = {}
+        self.stats = {"bursts": 0, "polls": 0, "skipped": 0}
+
+    @callback
+    def async_start(self, device):
+        """Start a burst for the device, a burst in progress starts over."""
+        if not self.coordinator.options.get("burst_scan", False):
+            return
+        self.async_cancel(device.id)
+        _LOGGER.debug("Device '%s' burst polling started", device.name)
+        self.stats["bursts"] += 1
+        self._schedule(device, 0, self._generations[device.id])
+
+    @callback
+    def async_cancel(self, device_id=None):
+        """Cancel the burst of the device, or of all devices."""
+        for dev_id in [device_id] if device_id is not None else list(self._generations):
+            self._generations[dev_id] = self._generations.get(dev_id, 0) + 1
+            cancel = self._bursts.pop(dev_id, None)
+            if cancel is not None:
+                cancel()
+
+    def _schedule(self, device, step, generation):
+        if step >= len(BURST_DELAYS):
+            self._bursts.pop(device.id, None)
+            return
+
+        async def poll(_now):
+            await self._async_poll(device)
+            if self._generations.get(device.id) == generation:
+                self._schedule(device, step + 1, generation)
+
+        # The cloud may still return the old data shortly after a command, like the regular
+        # polling the first poll waits at least scan_ignore seconds
+        delay = max(BURST_DELAYS[step], self.coordinator.scan_ignore()) if step == 0 else BURST_DELAYS[step]
+        self._bursts[device.id] = async_call_later(self.hass, delay, HassJob(poll, cancel_on_shutdown=True))
+
+    async def _async_poll(self, device):
+        daikin_api = self.coordinator.daikin_api
+        if daikin_api.request_budget() <= BURST_RESERVE or daikin_api.circuit_breaker.is_open or self.coordinator.fetched_recently():
+            self.stats["skipped"] += 1
+            return
+        self.stats["polls"] += 1
+        try:
+            dev_data = await daikin_api.getCloudDevice(device.id)
+        except DaikinApiError as err:
+            _LOGGER.debug("Device '%s' burst poll failed: %s", device.name, err)
+            return
+        if dev_data is NOT_MODIFIED:
+            self.coordinator.change_tracker.record_unchanged(device_id=device.id)
+            return
+        if not dev_data:
+            return
+        self.coordinator.merge_devices([dev_data])
+        # All devices returning the data they returned before has to be merged again
+        daikin_api.response_cache.invalidate_endpoint("/v1/gateway-devices")
+        self.coordinator.async_update_listeners()
+
+    def as_dict(self):
+        return {**self.stats, "active": sorted(self._bursts)}
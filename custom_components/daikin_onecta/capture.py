@@ -0,0 +1,122 @@
+"""Record and replay of the requests done to the Daikin cloud."""
+import json
+import threading
+import time
+from collections import deque
+
+from requests.structures import CaseInsensitiveDict
+
+# File in the Home Assistant configuration directory the requests of an account are recorded to, per config entry id
+CAPTURE_FILE = "daikin_onecta_capture_{}.jsonl"
+
+# Response headers which are recorded, the rest isn't needed to replay the traffic
+CAPTURED_HEADERS = (
+    "Content-Type",
+    "X-RateLimit-Limit-minute",
+    "X-RateLimit-Remaining-minute",
+    "X-RateLimit-Limit-day",
+    "X-RateLimit-Remaining-day",
+    "retry-after",
+    "ratelimit-reset",
+)
+
+
+class CaptureRecorder:
+    """Appends each request/response pair as one json line to the capture file.
+
+    The access token is never recorded, only the method, endpoint, request body,
+    status, rate limit headers, response body and timing are.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, method, endpoint, request_body, started, duration, status_code, headers, response_body) -> None:
+        line = json.dumps(
+            {
+                "ts": round(started, 3),
+                "method": method,
+                "url": endpoint,
+                "request": request_body,
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 1),
+                "headers": {header: headers[header] for header in CAPTURED_HEADERS if header in headers},
+                "body": response_body,
+            },
+            separators=(",", ":"),
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as capture:
+            capture.write(line + "\n")
+
+
+def load_capture(path):
+    """Return the recorded requests of a capture file."""
+    with open(path, encoding="utf-8") as capture:
+        return [json.loads(line) for line in capture if line.strip()]
+
+
+class ReplayResponse:
+    """Response of a recorded request, with the parts of requests.Response we use."""
+
+    def __init__(self, entry):
+        self.status_code = entry["status"]
+        self.headers = CaseInsensitiveDict(entry["headers"])
+        self.text = entry["body"] or ""
+        self.content = self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class ReplayTransport:
+    """Replacement of Session.request which answers with the recorded responses.
+
+    Requests are matched on method and endpoint in recorded order. With a speed of 1
+    a request isn't answered before its recorded offset from the first request and each
+    response takes the recorded duration, a higher speed replays accelerated and a speed
+    of 0 answers immediately.
+    """
+
+    def __init__(self, entries, api_url, speed=1.0):
+        self.api_url = api_url
+        self.speed = speed
+        self.entries = entries
+        self._started = None
+        self._queues = {}
+        for entry in entries:
+            self._queues.setdefault((entry["method"], entry["url"]), deque()).append(entry)
+
+    @classmethod
+    def from_file(cls, path, api_url, speed=1.0):
+        return cls(load_capture(path), api_url, speed)
+
+    def schedule(self):
+        """Return the offset in seconds of each recorded request from the first one, scaled with the speed."""
+        if not self.entries:
+            return []
+        first = self.entries[0]["ts"]
+        return [((entry["ts"] - first) / self.speed if self.speed else 0, entry["method"], entry["url"]) for entry in self.entries]
+
+    def _wait_for(self, entry) -> None:
+        """Wait until the scaled offset of the recorded request, the first replayed request sets the start."""
+        offset = (entry["ts"] - self.entries[0]["ts"]) / self.speed
+        now = time.monotonic()
+        if self._started is None:
+            self._started = now - offset
+        delay = self._started + offset - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def __call__(self, method, url, headers=None, data=None, **kwargs):
+        endpoint = url.removeprefix(self.api_url)
+        queue = self._queues.get((method, endpoint))
+        if not queue:
+            raise ConnectionError(f"No recorded response for {method} {endpoint}")
+        entry = queue.popleft()
+        if self.speed:
+            self._wait_for(entry)
+            time.sleep(entry["duration_ms"] / 1000 / self.speed)
+        if entry["status"] == "failed":
+            raise ConnectionError(entry["body"])
+        return ReplayResponse(entry)
@@ -0,0 +1,55 @@
+"""Circuit breaker around the Daikin cloud."""
+from datetime import datetime
+
+# Number of consecutive failed requests which opens the circuit
+FAILURE_THRESHOLD = 5
+
+# Interval in seconds the coordinator probes the cloud while the circuit is open
+PROBE_INTERVAL = 15 * 60
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures of the cloud and closes on the first success.
+
+    While the circuit is open writes fail fast and only the coordinator probes the cloud.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD):
+        self.failure_threshold = failure_threshold
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.opened_at = None
+        self.last_failure = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == CIRCUIT_OPEN
+
+    def record_success(self) -> None:
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, reason) -> bool:
+        """Record a failed request, returns True when this failure opened the circuit."""
+        self.failures += 1
+        self.last_failure = reason
+        if self.state == CIRCUIT_CLOSED and self.failures >= self.failure_threshold:
+            self.state = CIRCUIT_OPEN
+            self.opened += 1
+            self.opened_at = datetime.now()
+            return True
+        return False
+
+    def as_dict(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "last_failure": self.last_failure,
+            "opened": self.opened,
+            "opened_at": self.opened_at,
+        }
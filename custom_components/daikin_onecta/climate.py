@@ -27,9 +27,9 @@ from homeassistant.const import UnitOfTemperature
 from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .commands import CommandPriorityEntity
 from .const import COORDINATOR
 from .const import DAIKIN_DEVICES
-from .const import DOMAIN as DAIKIN_DOMAIN
 from .const import FANMODE_FIXED
 from .const import SWING_COMFORT
 from .const import SWING_COMFORT_HORIZONTAL
@@ -74,8 +74,8 @@ HA_PRESET_TO_DAIKIN = {
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up Daikin climate based on config_entry."""
-    coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
-    for dev_id, device in hass.data[DAIKIN_DOMAIN][DAIKIN_DEVICES].items():
+    coordinator = entry.runtime_data[COORDINATOR]
+    for dev_id, device in entry.runtime_data[DAIKIN_DEVICES].items():
         modes = []
         device_model = device.daikin_data["deviceModel"]
         supported_management_point_types = {"climateControl"}
@@ -102,7 +102,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
             )
 
 
-class DaikinClimate(CoordinatorEntity, ClimateEntity):
+class DaikinClimate(CoordinatorEntity, CommandPriorityEntity, ClimateEntity):
     """Representation of a Daikin HVAC."""
 
     _enable_turn_on_off_backwards_compatibility = False  # Remove with HA 2025.1
@@ -326,7 +326,8 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
             if self._attr_target_temperature != value:
                 operationmode = self.operation_mode()
                 omv = operationmode["value"]
-                res = await self._device.patch(
+                res = await self.async_command(
+                    self._device.patch,
                     self._device.id,
                     self._embedded_id,
                     "temperatureControl",
@@ -392,7 +393,7 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
 
         # Only set the on/off to Daikin when we need to change it
         if on_off_mode is not None:
-            result &= await self._device.patch(self._device.id, self._embedded_id, "onOffMode", "", on_off_mode)
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, "onOffMode", "", on_off_mode)
             if result is False:
                 _LOGGER.warning(
                     "Device '%s' problem setting onOffMode to %s",
@@ -406,7 +407,8 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
             # Only set the operationMode when it has changed, also prevents setting it when
             # it is readOnly
             if operation_mode != cc["operationMode"]["value"]:
-                result &= await self._device.patch(
+                result &= await self.async_command(
+                    self._device.patch,
                     self._device.id,
                     self._embedded_id,
                     "operationMode",
@@ -506,7 +508,8 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
             if not self._attr_fan_mode.isnumeric():
                 # Only set the currentMode to fixed when we currently don't have set
                 # a numeric mode
-                res = await self._device.patch(
+                res = await self.async_command(
+                    self._device.patch,
                     self._device.id,
                     self._embedded_id,
                     "fanControl",
@@ -520,7 +523,8 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
                     )
 
             new_fixed_mode = int(fan_mode)
-            res &= await self._device.patch(
+            res &= await self.async_command(
+                self._device.patch,
                 self._device.id,
                 self._embedded_id,
                 "fanControl",
@@ -534,7 +538,8 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
                     new_fixed_mode,
                 )
         else:
-            res = await self._device.patch(
+            res = await self.async_command(
+                self._device.patch,
                 self._device.id,
                 self._embedded_id,
                 "fanControl",
@@ -654,7 +659,8 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
                     new_h_mode = "stop"
                     if swing_mode in (SWING_HORIZONTAL, SWING_BOTH, SWING_COMFORT_HORIZONTAL, SWING_FLOOR_HORIZONTAL):
                         new_h_mode = "swing"
-                    res &= await self._device.patch(
+                    res &= await self.async_command(
+                        self._device.patch,
                         self._device.id,
                         self._embedded_id,
                         "fanControl",
@@ -676,7 +682,8 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
                         new_v_mode = "floorHeatingAirflow"
                     if swing_mode in (SWING_COMFORT, SWING_COMFORT_HORIZONTAL):
                         new_v_mode = "windNice"
-                    res &= await self._device.patch(
+                    res &= await self.async_command(
+                        self._device.patch,
                         self._device.id,
                         self._embedded_id,
                         "fanControl",
@@ -723,7 +730,7 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
             current_mode = HA_PRESET_TO_DAIKIN[self.preset_mode]
             if self.preset_mode == PRESET_AWAY:
                 value = {"enabled": False}
-                result &= await self._device.post(self._device.id, self._embedded_id, "holiday-mode", value)
+                result &= await self.async_command(self._device.post, self._device.id, self._embedded_id, "holiday-mode", value)
                 if result is False:
                     _LOGGER.warning(
                         "Device '%s' problem setting %s to off",
@@ -731,7 +738,7 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
                         current_mode,
                     )
             else:
-                result &= await self._device.patch(self._device.id, self._embedded_id, current_mode, "", "off")
+                result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, current_mode, "", "off")
                 if result is False:
                     _LOGGER.warning(
                         "Device '%s' problem setting %s to off",
@@ -745,7 +752,7 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
 
             if preset_mode == PRESET_AWAY:
                 value = {"enabled": True, "startDate": date.today().isoformat(), "endDate": (date.today() + timedelta(days=60)).isoformat()}
-                result &= await self._device.post(self._device.id, self._embedded_id, "holiday-mode", value)
+                result &= await self.async_command(self._device.post, self._device.id, self._embedded_id, "holiday-mode", value)
                 if result is False:
                     _LOGGER.warning(
                         "Device '%s' problem setting %s to on",
@@ -753,7 +760,7 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
                         new_daikin_mode,
                     )
             else:
-                result &= await self._device.patch(self._device.id, self._embedded_id, new_daikin_mode, "", "on")
+                result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, new_daikin_mode, "", "on")
                 if result is False:
                     _LOGGER.warning(
                         "Device '%s' problem setting %s to on",
@@ -791,7 +798,7 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
         cc = self.climate_control()
         result = True
         if cc["onOffMode"]["value"] == "off":
-            result &= await self._device.patch(self._device.id, self._embedded_id, "onOffMode", "", "on")
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, "onOffMode", "", "on")
             if result is False:
                 _LOGGER.error("Device '%s' problem setting onOffMode to on", self._device.name)
             else:
@@ -811,7 +818,7 @@ class DaikinClimate(CoordinatorEntity, ClimateEntity):
         cc = self.climate_control()
         result = True
         if cc["onOffMode"]["value"] == "on":
-            result &= await self._device.patch(self._device.id, self._embedded_id, "onOffMode", "", "off")
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, "onOffMode", "", "off")
             if result is False:
                 _LOGGER.error("Device '%s' problem setting onOffMode to off", self._device.name)
             else:
@@ -0,0 +1,228 @@
+"""Prioritized and per device ordered commands to the Daikin cloud."""
+import asyncio
+import collections
+import contextlib
+import contextvars
+import heapq
+import itertools
+import time
+from collections import Counter
+
+from homeassistant.core import callback
+from homeassistant.core import Context
+from homeassistant.helpers.entity import Entity
+
+from .metrics import Histogram
+
+# Priorities of the requests, a lower value is sent first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_AUTOMATION = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_AUTOMATION: "automation",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Priority of the commands sent by the current task, set from the context of the service call
+_priority = contextvars.ContextVar("daikin_onecta_priority", default=PRIORITY_BACKGROUND)
+
+
+def context_priority(context: Context) -> int:
+    """Return the priority of a service call context, a user acting directly goes before automations.
+
+    Every service call is requested by a user, an automation or a script, a time triggered
+    automation has no parent context. Only the polling of the integration itself is background.
+    """
+    if context.user_id is not None:
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_AUTOMATION
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextlib.contextmanager
+def command_priority(priority):
+    """Send the commands of the current task with the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class CommandPriorityEntity(Entity):
+    """Entity whose commands get the priority of the service call context."""
+
+    _command_priority = None
+
+    @callback
+    def async_set_context(self, context: Context) -> None:
+        super().async_set_context(context)
+        self._command_priority = context_priority(context)
+
+    async def async_command(self, send, *args):
+        """Send a command of the device with the priority of the latest service call context."""
+        with command_priority(current_priority() if self._command_priority is None else self._command_priority):
+            return await send(*args)
+
+
+class PriorityLock:
+    """Lock which is handed to the waiter with the highest priority, first come first served within a priority."""
+
+    def __init__(self):
+        self._locked = False
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def locked(self) -> bool:
+        return self._locked
+
+    async def acquire(self, priority=PRIORITY_BACKGROUND):
+        if not self._locked and not self._waiters:
+            self._locked = True
+            return
+        future = asyncio.get_running_loop().create_future()
+        waiter = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The lock was handed over just before the cancellation, pass it on
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                heapq.heapify(self._waiters)
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # The lock stays locked and is owned by the waiter now
+                future.set_result(True)
+                return
+        self._locked = False
+
+    @contextlib.asynccontextmanager
+    async def hold(self, priority=PRIORITY_BACKGROUND):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class CommandMetrics:
+    """Metrics of the commands of all devices of one account."""
+
+    def __init__(self):
+        self.submitted = Counter()
+        self.superseded = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.wait = collections.defaultdict(Histogram)
+
+    def record_submitted(self, priority):
+        self.submitted[PRIORITY_NAMES[priority]] += 1
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+
+    def record_started(self, priority, seconds):
+        self.queued -= 1
+        self.wait[PRIORITY_NAMES[priority]].observe(seconds * 1000)
+
+    def record_dropped(self):
+        self.queued -= 1
+
+    def record_superseded(self):
+        self.superseded += 1
+        self.record_dropped()
+
+    def as_dict(self):
+        return {
+            "submitted": dict(self.submitted),
+            "superseded": self.superseded,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "wait_ms": {priority: histogram.as_dict() for priority, histogram in self.wait.items()},
+        }
+
+
+class Command:
+    """One queued command, the context of the caller is kept so its deadline also applies to the request."""
+
+    def __init__(self, key, priority, send):
+        self.key = key
+        self.priority = priority
+        self.send = send
+        self.context = contextvars.copy_context()
+        self.queued = time.monotonic()
+        self.futures = [asyncio.get_running_loop().create_future()]
+
+
+class CommandQueue:
+    """FIFO queue of the commands of one device.
+
+    The commands of a device are sent one after the other in the order they were
+    given. A queued command for a characteristic and path which gets a newer value
+    before it is sent is superseded, the newer value takes its place in the queue
+    and both callers get its result. The priority of the first command is raised to the highest
+    priority queued behind it so that a user isn't waiting on a background command.
+    """
+
+    def __init__(self, hass, metrics):
+        self.hass = hass
+        self.metrics = metrics
+        self._pending = collections.deque()
+        self._worker = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def submit(self, key, send, priority=None):
+        """Queue send, a coroutine function called with the priority, and return its result.
+
+        Commands with key None are never superseded.
+        """
+        if priority is None:
+            priority = current_priority()
+        command = Command(key, priority, send)
+        self.metrics.record_submitted(priority)
+        for index, queued in enumerate(self._pending):
+            if key is not None and queued.key == key:
+                command.futures.extend(queued.futures)
+                command.priority = min(command.priority, queued.priority)
+                command.queued = queued.queued
+                self._pending[index] = command
+                self.metrics.record_superseded()
+                break
+        else:
+            self._pending.append(command)
+        if self._worker is None or self._worker.done():
+            self._worker = self.hass.async_create_task(self._run(), "daikin_onecta command queue", eager_start=False)
+        return await command.futures[0]
+
+    async def _run(self):
+        while self._pending:
+            command = self._pending.popleft()
+            if all(future.done() for future in command.futures):
+                # All callers were cancelled while waiting
+                self.metrics.record_dropped()
+                continue
+            priority = min([command.priority] + [queued.priority for queued in self._pending])
+            self.metrics.record_started(priority, time.monotonic() - command.queued)
+            try:
+                result = await asyncio.create_task(command.send(priority), context=command.context)
+            except Exception as e:
+                for future in command.futures:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for future in command.futures:
+                    if not future.done():
+                        future.set_result(result)
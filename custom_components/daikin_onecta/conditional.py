@@ -0,0 +1,126 @@
+"""Conditional requests of the Daikin cloud endpoints."""
+import hashlib
+from datetime import date
+
+# Number of days we keep the savings statistics for
+SAVINGS_DAYS = 7
+
+
+class NotModified:
+    """Returned instead of the data when the endpoint data didn't change since the previous request."""
+
+    def __repr__(self):
+        return "NOT_MODIFIED"
+
+
+NOT_MODIFIED = NotModified()
+
+
+class EndpointValidators:
+    """Validators of the last response of one endpoint."""
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.body_hash = None
+        self.body_size = 0
+        # Seconds it took to process (decode and merge) the last changed response
+        self.processing = 0.0
+
+
+def body_hash(res):
+    return hashlib.blake2b(res.content, digest_size=16).digest()
+
+
+class ResponseCache:
+    """Keeps the validators of the responses to do conditional requests.
+
+    When the cloud sends an ETag or Last-Modified header the next request is a
+    conditional one which results in a 304 when nothing changed. Otherwise a hash
+    of the body detects an unchanged response so decoding and merging it can be
+    skipped.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.savings = {}
+
+    def request_headers(self, endpoint):
+        validators = self.endpoints.get(endpoint)
+        headers = {}
+        if validators is not None:
+            if validators.etag:
+                headers["If-None-Match"] = validators.etag
+            if validators.last_modified:
+                headers["If-Modified-Since"] = validators.last_modified
+        return headers
+
+    def is_unchanged(self, endpoint, res) -> bool:
+        """Return if the response has the same data as the last recorded response of the endpoint."""
+        validators = self.endpoints.get(endpoint)
+        if validators is None:
+            return False
+        if res.status_code == 304:
+            self._record_saving(validators, not_modified=True)
+            return True
+
+        if body_hash(res) == validators.body_hash:
+            validators.etag = res.headers.get("ETag")
+            validators.last_modified = res.headers.get("Last-Modified")
+            self._record_saving(validators, not_modified=False)
+            return True
+        return False
+
+    def record(self, endpoint, res) -> None:
+        """Record the validators of a changed response, only once its data was decoded."""
+        validators = self.endpoints.setdefault(endpoint, EndpointValidators())
+        validators.etag = res.headers.get("ETag")
+        validators.last_modified = res.headers.get("Last-Modified")
+        validators.body_hash = body_hash(res)
+        validators.body_size = len(res.content)
+        validators.processing = 0.0
+
+    def invalidate(self, prefix) -> None:
+        """Forget the validators of the endpoints starting with prefix, their next response is always merged.
+
+        After a write the data of the devices holds values the device may not take, the
+        cloud returning the data from before the write has to overwrite them.
+        """
+        for endpoint in [endpoint for endpoint in self.endpoints if endpoint.startswith(prefix)]:
+            del self.endpoints[endpoint]
+
+    def invalidate_endpoint(self, endpoint) -> None:
+        """Forget the validators of one endpoint.
+
+        The endpoints of all devices and of one device overlap, data merged from one of
+        them makes the validators of the other one stale.
+        """
+        self.endpoints.pop(endpoint, None)
+
+    def record_processing(self, endpoint, seconds) -> None:
+        """Record the time spend on processing a changed response, that is what an unchanged one saves."""
+        validators = self.endpoints.get(endpoint)
+        if validators is not None:
+            validators.processing += seconds
+
+    def _record_saving(self, validators, not_modified) -> None:
+        """Record what an unchanged response saved, a 304 also saves downloading the body."""
+        today = date.today().isoformat()
+        saving = self.savings.setdefault(today, {"not_modified": 0, "unchanged_body": 0, "bytes_saved": 0, "cpu_ms_saved": 0.0})
+        if not_modified:
+            saving["not_modified"] += 1
+            saving["bytes_saved"] += validators.body_size
+        else:
+            saving["unchanged_body"] += 1
+        saving["cpu_ms_saved"] = round(saving["cpu_ms_saved"] + validators.processing * 1000, 3)
+        for day in sorted(self.savings)[:-SAVINGS_DAYS]:
+            del self.savings[day]
+
+    def as_dict(self):
+        return {
+            "endpoints": {
+                endpoint: {"etag": validators.etag is not None, "last_modified": validators.last_modified is not None}
+                for endpoint, validators in self.endpoints.items()
+            },
+            "savings": self.savings,
+        }
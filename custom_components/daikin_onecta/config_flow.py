@@ -9,11 +9,18 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import config_entry_oauth2_flow
+from homeassistant.helpers.selector import BooleanSelector
 from homeassistant.helpers.selector import NumberSelector
 from homeassistant.helpers.selector import NumberSelectorConfig
+from homeassistant.helpers.selector import ObjectSelector
 from homeassistant.helpers.selector import TimeSelector
 
+from .const import DAIKIN_API
+from .const import DAIKIN_DAY_LIMIT
 from .const import DOMAIN
+from .daikin_api import token_claims
+from .timetable import Timetable
+from .timetable import WINDOWS_SCHEMA
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,11 +33,35 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         self.config_entry = config_entry
         self.options = dict(config_entry.options)
 
+    def day_limit(self):
+        """Return the daily rate limit of the account, the default limit when the cloud didn't report it yet."""
+        runtime_data = getattr(self.config_entry, "runtime_data", None)
+        if isinstance(runtime_data, dict) and DAIKIN_API in runtime_data:
+            return runtime_data[DAIKIN_API].rate_limits["day"] or DAIKIN_DAY_LIMIT
+        return DAIKIN_DAY_LIMIT
+
     async def async_step_init(self, user_input: dict[str, str] | None = None) -> FlowResult:
-        """Handle a flow initialized by the user."""
+        """Handle a flow initialized by the user.
+
+        The polling windows replace the high and low frequency periods, the polls of
+        the busiest day have to fit within the daily rate limit.
+        """
         errors = {}
+        placeholders = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            try:
+                user_input["polling_windows"] = WINDOWS_SCHEMA(user_input.get("polling_windows") or [])
+            except vol.Invalid:
+                errors["polling_windows"] = "invalid_windows"
+            else:
+                requests = Timetable.from_options(user_input).requests_per_day()
+                limit = self.day_limit()
+                if requests > limit:
+                    errors["base"] = "over_budget"
+                    placeholders = {"requests": str(requests), "limit": str(limit)}
+                else:
+                    return self.async_create_entry(title="", data=user_input)
+            self.options.update(user_input)
 
         return self.async_show_form(
             step_id="init",
@@ -56,15 +87,54 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         "low_scan_start",
                         default=self.options.get("low_scan_start", "22:00:00"),
                     ): TimeSelector(),
+                    vol.Optional(
+                        "polling_windows",
+                        default=self.options.get("polling_windows", []),
+                    ): ObjectSelector(),
+                    vol.Required(
+                        "adaptive_scan",
+                        default=self.options.get("adaptive_scan", False),
+                    ): BooleanSelector(),
+                    vol.Required(
+                        "burst_scan",
+                        default=self.options.get("burst_scan", False),
+                    ): BooleanSelector(),
                     vol.Required(
                         "scan_ignore",
                         default=self.options.get("scan_ignore", 30),
                     ): NumberSelector(
                         NumberSelectorConfig(min=20, max=100, step=1),
                     ),
+                    vol.Required(
+                        "connect_timeout",
+                        default=self.options.get("connect_timeout", 10),
+                    ): NumberSelector(
+                        NumberSelectorConfig(min=1, max=60, step=1),
+                    ),
+                    vol.Required(
+                        "read_timeout",
+                        default=self.options.get("read_timeout", 30),
+                    ): NumberSelector(
+                        NumberSelectorConfig(min=1, max=120, step=1),
+                    ),
+                    vol.Required(
+                        "total_timeout",
+                        default=self.options.get("total_timeout", 60),
+                    ): NumberSelector(
+                        NumberSelectorConfig(min=5, max=300, step=1),
+                    ),
+                    vol.Required(
+                        "profiling",
+                        default=self.options.get("profiling", False),
+                    ): BooleanSelector(),
+                    vol.Required(
+                        "capture",
+                        default=self.options.get("capture", False),
+                    ): BooleanSelector(),
                 }
             ),
             errors=errors,
+            description_placeholders=placeholders,
         )
 
     async def _update_options(self):
@@ -90,23 +160,22 @@ class FlowHandler(
         return {"scope": "openid onecta:basic.integration"}
 
     async def async_oauth_create_entry(self, data: dict) -> FlowResult:
-        """Create an oauth config entry or update existing entry for reauth."""
-        existing_entry = await self.async_set_unique_id(DOMAIN)
-        if existing_entry:
-            self.hass.config_entries.async_update_entry(existing_entry, data=data)
-            await self.hass.config_entries.async_reload(existing_entry.entry_id)
-            return self.async_abort(reason="reauth_successful")
-
-        return await super().async_oauth_create_entry(data)
-
-    async def async_step_user(self, user_input: dict | None = None) -> FlowResult:
-        """Handle a flow start."""
-        await self.async_set_unique_id(DOMAIN)
-
-        if self.source != config_entries.SOURCE_REAUTH and self._async_current_entries():
-            return self.async_abort(reason="single_instance_allowed")
-
-        return await super().async_step_user(user_input)
+        """Create an oauth config entry per Daikin account or update existing entry for reauth.
+
+        The account is identified by the subject of the token, when the token doesn't
+        provide one only a single entry with the domain as unique id is possible.
+        """
+        claims = token_claims(data["token"])
+        unique_id = claims.get("sub", DOMAIN)
+        if self.source == config_entries.SOURCE_REAUTH:
+            reauth_entry = self._get_reauth_entry()
+            if reauth_entry.unique_id not in (DOMAIN, unique_id):
+                return self.async_abort(reason="wrong_account")
+            return self.async_update_reload_and_abort(reauth_entry, unique_id=unique_id, data=data)
+
+        await self.async_set_unique_id(unique_id)
+        self._abort_if_unique_id_configured(updates=data)
+        return self.async_create_entry(title=claims.get("email", self.flow_impl.name), data=data)
 
     async def async_step_reauth(self, entry_data: Mapping[str, Any]) -> FlowResult:
         """Perform reauth upon an API authentication error."""
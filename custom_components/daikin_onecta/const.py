@@ -23,7 +23,11 @@ OAUTH2_TOKEN = "https://idp.onecta.daikineurope.com/v1/oidc/token"
 DAIKIN_DATA = "daikin_data"
 DAIKIN_API = "daikin_api"
 DAIKIN_DEVICES = "daikin_devices"
+SCHEDULER = "scheduler"
+FORWARDED_PLATFORMS = "forwarded_platforms"
 DAIKIN_API_URL = "https://api.onecta.daikineurope.com"
+# Daily rate limit of the Daikin cloud, used until the cloud reported the limit of the account
+DAIKIN_DAY_LIMIT = 200
 
 ATTR_PRESET_MODE = "preset_mode"
 ATTR_OPERATION_MODE = "operation_mode"
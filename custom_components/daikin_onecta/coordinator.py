@@ -1,21 +1,48 @@
 """Coordinator for Daikin Onecta integration."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
 from datetime import datetime
 from datetime import timedelta
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.core import HassJob
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.helpers.update_coordinator import UpdateFailed
+from homeassistant.util import dt as dt_util
 
+from .adaptive import budget_interval
+from .adaptive import ChangeTracker
+from .burst import BurstPoller
+from .burst import mode_signature
+from .circuit import PROBE_INTERVAL
+from .conditional import NOT_MODIFIED
 from .const import DAIKIN_API
 from .const import DAIKIN_DEVICES
 from .const import DOMAIN
+from .const import FORWARDED_PLATFORMS
+from .daikin_api import DaikinApiError
 from .device import DaikinOnectaDevice
+from .phase import initial_phase
+from .phase import next_poll
+from .phase import shifted_phase
+from .phase import STORAGE_KEY
+from .phase import STORAGE_VERSION
+from .timetable import Timetable
 
 _LOGGER = logging.getLogger(__name__)
 
+# A scheduled refresh is skipped when the data was fetched less than this many
+# seconds ago, requested refreshes are already spaced by the debouncer
+MIN_REFRESH_SPACING = 10
+
 
 class OnectaDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching data from the API."""
@@ -23,14 +50,35 @@ class OnectaDataUpdateCoordinator(DataUpdateCoordinator):
     def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry) -> None:
         """Initialize."""
         self.options = config_entry.options
+        self.timetable = Timetable.from_options(self.options)
+        self.daikin_api = config_entry.runtime_data[DAIKIN_API]
+        self.profiler = None
+        self.change_tracker = ChangeTracker()
+        # Refresh requested by the force_update service, concurrent requests share it
+        self._force_refresh = None
+        # Fetch in progress, concurrent refreshes share it, and when the last one succeeded
+        self._fetch = None
+        self._last_fetch = None
+        self.refresh_stats = {"fetches": 0, "coalesced": 0, "spaced": 0}
+        # Polls are spread over the interval by a phase per installation, the phase moves when
+        # the polls collide with other requests and is stored to survive restarts
+        self.phase = initial_phase(config_entry.entry_id)
+        self._phase_store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(config_entry.entry_id))
+        self._last_fetch_time = None
+        self._unsub_boundary = None
 
         super().__init__(
             hass,
             _LOGGER,
+            config_entry=config_entry,
             name=DOMAIN,
             update_interval=self.determine_update_interval(hass),
         )
 
+        self.update_profiler()
+        self.burst = BurstPoller(hass, self)
+        config_entry.async_on_unload(self.burst.async_cancel)
+
         _LOGGER.info(
             "Daikin coordinator initialized with %s interval.",
             self.update_interval,
@@ -39,11 +87,129 @@ class OnectaDataUpdateCoordinator(DataUpdateCoordinator):
     def scan_ignore(self):
         return self.options.get("scan_ignore", 30)
 
+    def fetched_recently(self):
+        """Return whether the data was fetched less than MIN_REFRESH_SPACING seconds ago."""
+        return self._last_fetch is not None and time.monotonic() - self._last_fetch < MIN_REFRESH_SPACING
+
+    async def async_load_phase(self):
+        """Load the phase of the polls stored before a restart."""
+        data = await self._phase_store.async_load()
+        if data is not None:
+            self.phase = data["phase"]
+
+    async def _async_refresh(self, *args, scheduled=False, **kwargs):
+        """Refresh, a scheduled refresh right after a fetch is skipped."""
+        if scheduled and self.fetched_recently():
+            _LOGGER.debug("Daikin scheduled refresh skipped, data fetched less than %s seconds ago", MIN_REFRESH_SPACING)
+            self.refresh_stats["spaced"] += 1
+            self._schedule_refresh()
+            return
+        await super()._async_refresh(*args, scheduled=scheduled, **kwargs)
+
+        daikin_api = self.daikin_api
+        if scheduled and daikin_api.rate_limits["minute"] and daikin_api.rate_limits["remaining_minutes"] == 0:
+            # The minute limit is used up at our phase, move the polls to another moment
+            self.phase = shifted_phase(self.phase)
+            _LOGGER.info("Daikin polls collide with the rate limit, moving them to phase %.3f", self.phase)
+            await self._phase_store.async_save({"phase": self.phase})
+            self._schedule_refresh()
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Schedule the next refresh on the grid of the update interval shifted by the phase."""
+        if self._update_interval_seconds is None:
+            return
+
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+
+        self._async_unsub_refresh()
+        now = time.time()
+        delay = next_poll(now, self._update_interval_seconds, self.phase, self._last_fetch_time) - now
+        self._unsub_refresh = async_call_later(self.hass, delay, HassJob(self._handle_refresh_interval, cancel_on_shutdown=True))
+
+    @callback
+    def async_track_boundaries(self):
+        """Recompute the interval at the next moment the timetable changes it."""
+        self.async_untrack_boundaries()
+        boundary = self.timetable.next_boundary(dt_util.now())
+        if boundary is not None:
+            self._unsub_boundary = async_track_point_in_time(self.hass, self._handle_boundary, boundary)
+
+    @callback
+    def async_untrack_boundaries(self):
+        if self._unsub_boundary is not None:
+            self._unsub_boundary()
+            self._unsub_boundary = None
+
+    @callback
+    def _handle_boundary(self, _now):
+        self._unsub_boundary = None
+        self.update_interval = self.determine_update_interval(self.hass)
+        _LOGGER.debug("Daikin polling period changed, interval %s", self.update_interval)
+        if self._unsub_refresh is not None:
+            self._schedule_refresh()
+        self.async_track_boundaries()
+
     async def _async_update_data(self):
+        """Fetch the data, concurrent refreshes share one fetch."""
+        if self._fetch is None or self._fetch.done():
+            self._fetch = self.hass.async_create_task(self._async_fetch_data(), "daikin_onecta fetch", eager_start=False)
+        else:
+            _LOGGER.debug("Daikin refresh joins the fetch in progress")
+            self.refresh_stats["coalesced"] += 1
+        return await asyncio.shield(self._fetch)
+
+    def merge_devices(self, devices_json):
+        """Merge the polled data of the devices, returns the seconds it took.
+
+        The change rates are learned from the data, a device of which the mode changed
+        starts a burst and unknown devices are added.
+        """
+        devices = self.config_entry.runtime_data[DAIKIN_DEVICES]
+        self.change_tracker.record(devices_json)
+        merge_total = 0.0
+        added = False
+        for dev_data in devices_json:
+            merge_start = time.perf_counter()
+            if dev_data["id"] in devices:
+                device = devices[dev_data["id"]]
+                modes = mode_signature(device)
+                device.setJsonData(dev_data)
+                if mode_signature(device) != modes:
+                    self.burst.async_start(device)
+            else:
+                device = DaikinOnectaDevice(dev_data, self.daikin_api)
+                device.on_write = self.burst.async_start
+                devices[dev_data["id"]] = device
+                added = True
+            merge_seconds = time.perf_counter() - merge_start
+            merge_total += merge_seconds
+            if self.profiler is not None:
+                self.profiler.record_merge(device.id, device.name, merge_seconds)
+        if added:
+            self.async_reload_for_new_platforms()
+        return merge_total
+
+    @callback
+    def async_reload_for_new_platforms(self):
+        """Reload the config entry when an added device needs a platform which wasn't set up."""
+        # Imported here, the package imports the coordinator
+        from . import required_platforms
+
+        forwarded = self.config_entry.runtime_data.get(FORWARDED_PLATFORMS)
+        # During the setup the platforms aren't forwarded yet
+        if forwarded is None:
+            return
+        missing = set(required_platforms(self.config_entry.runtime_data[DAIKIN_DEVICES])) - set(forwarded)
+        if missing:
+            _LOGGER.info("New Daikin device needs the %s platforms, reloading", ", ".join(sorted(missing)))
+            self.hass.config_entries.async_schedule_reload(self.config_entry.entry_id)
+
+    async def _async_fetch_data(self):
         _LOGGER.debug("Daikin coordinator start _async_update_data.")
 
-        daikin_api = self.hass.data[DOMAIN][DAIKIN_API]
-        devices = self.hass.data[DOMAIN][DAIKIN_DEVICES]
+        daikin_api = self.daikin_api
         scan_ignore_value = self.scan_ignore()
 
         if (datetime.now() - daikin_api._last_patch_call).total_seconds() < scan_ignore_value:
@@ -52,13 +218,33 @@ class OnectaDataUpdateCoordinator(DataUpdateCoordinator):
                 "API UPDATE skipped (just updated from UI)",
             )
         else:
-            daikin_api.json_data = await daikin_api.getCloudDeviceDetails()
-            for dev_data in daikin_api.json_data or []:
-                if dev_data["id"] in devices:
-                    devices[dev_data["id"]].setJsonData(dev_data)
-                else:
-                    device = DaikinOnectaDevice(dev_data, daikin_api)
-                    devices[dev_data["id"]] = device
+            if self.profiler is not None:
+                self.profiler.start()
+            fetch_start = time.perf_counter()
+            decode_start = daikin_api.metrics.decode.total
+            try:
+                json_data = await daikin_api.getCloudDeviceDetails()
+            except DaikinApiError as err:
+                # Back off when the circuit opened or a rate limit was reached
+                self.update_interval = self.determine_update_interval(self.hass)
+                if daikin_api.circuit_breaker.is_open:
+                    # Mark all devices unavailable at once and only probe the cloud slowly
+                    self.async_update_listeners()
+                raise UpdateFailed(str(err)) from err
+            self._last_fetch = time.monotonic()
+            self._last_fetch_time = time.time()
+            self.refresh_stats["fetches"] += 1
+            if self.profiler is not None:
+                self.profiler.record_fetch(time.perf_counter() - fetch_start, (daikin_api.metrics.decode.total - decode_start) / 1000)
+            if json_data is NOT_MODIFIED:
+                _LOGGER.debug("Daikin cloud data not modified, skipping the merge")
+                self.change_tracker.record_unchanged()
+            else:
+                daikin_api.json_data = json_data
+                merge_total = self.merge_devices(json_data or [])
+                daikin_api.response_cache.record_processing("/v1/gateway-devices", merge_total)
+                # A device endpoint returning the data it returned before has to be merged again
+                daikin_api.response_cache.invalidate("/v1/gateway-devices/")
 
             self.update_interval = self.determine_update_interval(self.hass)
 
@@ -67,30 +253,72 @@ class OnectaDataUpdateCoordinator(DataUpdateCoordinator):
             self.update_interval,
         )
 
+    async def async_force_refresh(self):
+        """Refresh now and return the number of requests done, concurrent calls share one refresh."""
+        if self._force_refresh is None or self._force_refresh.done():
+            self._force_refresh = self.hass.async_create_task(self._async_counted_refresh(), "daikin_onecta force update")
+        return await asyncio.shield(self._force_refresh)
+
+    async def _async_counted_refresh(self):
+        requests = self.daikin_api.metrics.requests
+        await self.async_refresh()
+        return self.daikin_api.metrics.requests - requests
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all listeners, when profiling measure the time each entity needs."""
+        if self.profiler is None:
+            super().async_update_listeners()
+            return
+
+        for update_callback, _ in list(self._listeners.values()):
+            listener_start = time.perf_counter()
+            update_callback()
+            self.profiler.record_entity(getattr(update_callback, "__self__", update_callback), time.perf_counter() - listener_start)
+        self.profiler.finish()
+
+    def listening_entities(self):
+        """Return the entities listening to this coordinator."""
+        return [update_callback.__self__ for update_callback, _ in self._listeners.values() if hasattr(update_callback, "__self__")]
+
     def update_settings(self, config_entry: ConfigEntry):
         _LOGGER.debug("Daikin coordinator updating settings.")
         self.options = config_entry.options
+        self.timetable = Timetable.from_options(self.options)
         self.update_interval = self.determine_update_interval(self.hass)
+        self.update_profiler()
+        if self._unsub_boundary is not None:
+            self.async_track_boundaries()
+        if self._unsub_refresh is not None:
+            self._schedule_refresh()
         _LOGGER.info("Daikin coordinator changed interval to %s", self.update_interval)
 
+    def update_profiler(self):
+        if self.options.get("profiling", False):
+            if self.profiler is None:
+                # Only imported when profiling is enabled
+                from .profiler import RefreshProfiler
+
+                self.profiler = RefreshProfiler()
+        else:
+            self.profiler = None
+
     def determine_update_interval(self, hass: HomeAssistant):
-        # Default of low scan minutes interval
-        scan_interval = self.options.get("low_scan_interval", 30) * 60
-        hs = datetime.strptime(self.options.get("high_scan_start", "07:00:00"), "%H:%M:%S").time()
-        ls = datetime.strptime(self.options.get("low_scan_start", "22:00:00"), "%H:%M:%S").time()
-        if self.in_between(datetime.now().time(), hs, ls):
-            scan_interval = self.options.get("high_scan_interval", 10) * 60
+        scan_interval = self.timetable.interval(dt_util.now())
+
+        # Follow how often the data of the devices changes, as fast as the daily rate limit
+        # allows. Without a known rate limit the polling isn't faster than configured.
+        daikin_api = self.daikin_api
+        if self.options.get("adaptive_scan", False):
+            minimum = budget_interval(daikin_api.rate_limits["day"]) or scan_interval
+            scan_interval = round(self.change_tracker.interval(scan_interval, minimum))
 
         # When we hit our daily rate limit we check the retry_after which is the amount of seconds
         # we have to wait before we can make a call again
-        daikin_api = hass.data[DOMAIN][DAIKIN_API]
         if daikin_api.rate_limits["remaining_day"] == 0:
             scan_interval = max(daikin_api.rate_limits["retry_after"] + 60, scan_interval)
 
-        return timedelta(seconds=scan_interval)
+        if daikin_api.circuit_breaker.is_open:
+            scan_interval = max(PROBE_INTERVAL, scan_interval)
 
-    def in_between(self, now, start, end):
-        if start <= end:
-            return start <= now < end
-        else:
-            return start <= now or now < end
+        return timedelta(seconds=scan_interval)
@@ -1,7 +1,11 @@
 """Platform for the Daikin AC."""
 import asyncio
+import base64
 import functools
+import json
 import logging
+import random
+import time
 from datetime import datetime
 from http import HTTPStatus
 
@@ -9,15 +13,63 @@ import requests
 from aiohttp import ClientResponseError
 from homeassistant import config_entries
 from homeassistant import core
+from homeassistant.core import HassJob
 from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_entry_oauth2_flow
 from homeassistant.helpers import issue_registry as ir
+from homeassistant.helpers.event import async_call_later
 
+from .circuit import CircuitBreaker
+from .commands import CommandMetrics
+from .commands import current_priority
+from .commands import PRIORITY_BACKGROUND
+from .commands import PriorityLock
+from .conditional import NOT_MODIFIED
+from .conditional import ResponseCache
 from .const import DAIKIN_API_URL
 from .const import DOMAIN
+from .deadline import DeadlineExceeded
+from .deadline import remaining_time
+from .metrics import RequestMetrics
+from .retry import classify_failure
+from .retry import retry_after_seconds
+from .retry import RETRY_RATE_LIMITED
+from .retry import RetryPolicy
+from .scheduler import async_get_scheduler
 
 _LOGGER = logging.getLogger(__name__)
 
+# The token is refreshed in the background this many seconds before it expires,
+# minus a random jitter so that accounts don't refresh at the same moment
+TOKEN_REFRESH_MARGIN = 300
+TOKEN_REFRESH_JITTER = 60
+# Delay before retrying a failed background refresh
+TOKEN_REFRESH_RETRY = 60
+
+
+class DaikinApiError(HomeAssistantError):
+    """Error communicating with the Daikin cloud."""
+
+
+class DaikinRateLimitError(DaikinApiError):
+    """The Daikin cloud refused a request because a rate limit was reached."""
+
+    def __init__(self, message, retry_after=0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def token_claims(token):
+    """Return the claims of the id token or access token, an empty dict when these are not a JWT."""
+    for key in ("id_token", "access_token"):
+        try:
+            payload = token[key].split(".")[1]
+            return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        except (KeyError, IndexError, AttributeError, ValueError):
+            continue
+    return {}
+
 
 class DaikinApi:
     """Daikin Onecta API."""
@@ -50,63 +102,288 @@ class DaikinApi:
             "ratelimit_reset": 0,
         }
 
+        # Latency, payload size and status code statistics of the requests we do
+        self.metrics = RequestMetrics()
+
+        # Transient failures are retried with backoff, when the cloud keeps failing the circuit opens
+        self.retry_policy = RetryPolicy()
+        self.circuit_breaker = CircuitBreaker()
+
+        # Validators of the responses for conditional requests
+        self.response_cache = ResponseCache()
+
+        # All accounts share one connection pool and their requests are scheduled fairly
+        self.scheduler = async_get_scheduler(hass)
+        self.scheduler.register(entry.entry_id)
+
+        # Function doing the http requests and the optional recorder of all requests
+        self.transport = self.scheduler.session.request
+        self.recorder = None
+        self.update_settings(entry)
+
         # The following lock is used to serialize http requests to Daikin cloud
-        # to prevent receiving old settings while a PATCH is ongoing.
-        self._cloud_lock = asyncio.Lock()
+        # to prevent receiving old settings while a PATCH is ongoing. Waiting
+        # requests get the lock in order of their priority.
+        self._cloud_lock = PriorityLock()
+        self.command_metrics = CommandMetrics()
+
+        # Refresh of the token, shared by all concurrent callers, and the timer of
+        # the next background refresh
+        self._token_refresh = None
+        self._cancel_token_refresh = None
 
         _LOGGER.info("Daikin Onecta API initialized.")
 
     async def async_get_access_token(self) -> str:
-        """Return a valid access token."""
+        """Return a valid access token, refreshing it when it expired."""
         if not self.session.valid_token:
-            try:
-                await self.session.async_ensure_token_valid()
-            except ClientResponseError as ex:
-                # https://developers.home-assistant.io/docs/integration_setup_failures/#handling-expired-credentials
-                if ex.status == HTTPStatus.BAD_REQUEST:
-                    raise ConfigEntryAuthFailed(f"Problem refreshing token: {ex}") from ex
-                raise ex
+            await self.async_refresh_token()
 
         return self.session.token["access_token"]
 
-    async def doBearerRequest(self, method, resourceUrl, options=None):
-        async with self._cloud_lock:
-            token = await self.async_get_access_token()
+    async def async_refresh_token(self, force=False):
+        """Refresh the token, concurrent callers wait for the same refresh.
+
+        Without force the token is only refreshed when it isn't valid anymore.
+        """
+        if self._token_refresh is None or self._token_refresh.done():
+            self._token_refresh = self.hass.async_create_task(self._async_refresh_token(force), "daikin_onecta token refresh", eager_start=False)
+        await asyncio.shield(self._token_refresh)
+
+    async def _async_refresh_token(self, force):
+        try:
+            if force:
+                new_token = await self.session.implementation.async_refresh_token(self.session.token)
+                self.hass.config_entries.async_update_entry(self._config_entry, data={**self._config_entry.data, "token": new_token})
+            else:
+                await self.session.async_ensure_token_valid()
+        except ClientResponseError as ex:
+            # https://developers.home-assistant.io/docs/integration_setup_failures/#handling-expired-credentials
+            if ex.status == HTTPStatus.BAD_REQUEST:
+                raise ConfigEntryAuthFailed(f"Problem refreshing token: {ex}") from ex
+            raise ex
 
-            resourceUrl = DAIKIN_API_URL + resourceUrl
-            headers = {"Accept-Encoding": "gzip", "Authorization": "Bearer " + token, "Content-Type": "application/json"}
+    @core.callback
+    def async_start_token_refresh(self, delay=None):
+        """Schedule the background refresh of the token shortly before it expires.
 
-            _LOGGER.debug("BEARER REQUEST URL: %s", resourceUrl)
-            _LOGGER.debug("BEARER TYPE %s JSON: %s", method, options)
+        Without a known expiry or when the token already expired the refresh is
+        left to the next request.
+        """
+        self.async_stop_token_refresh()
+        if delay is None:
+            expires_at = self.session.token.get("expires_at")
+            if expires_at is None or not self.session.valid_token:
+                return
+            delay = max(0, expires_at - time.time() - TOKEN_REFRESH_MARGIN - random.uniform(0, TOKEN_REFRESH_JITTER))
+        self._cancel_token_refresh = async_call_later(self.hass, delay, HassJob(self._async_background_refresh, cancel_on_shutdown=True))
 
-            func = functools.partial(requests.request, url=resourceUrl, method=method, headers=headers, data=options)
-            try:
-                res = await self.hass.async_add_executor_job(func)
-            except Exception as e:
-                _LOGGER.error("REQUEST TYPE %s FAILED: %s", method, e)
-                if method == "GET":
-                    return []
-                else:
-                    return False
+    @core.callback
+    def async_stop_token_refresh(self):
+        """Cancel the scheduled background refresh of the token."""
+        if self._cancel_token_refresh is not None:
+            self._cancel_token_refresh()
+            self._cancel_token_refresh = None
+
+    async def _async_background_refresh(self, _now):
+        self._cancel_token_refresh = None
+        try:
+            await self.async_refresh_token(force=True)
+        except ConfigEntryAuthFailed as ex:
+            # The next request starts the reauthentication
+            _LOGGER.warning("Background refresh of the Daikin token failed: %s", ex)
+            return
+        except Exception as ex:
+            _LOGGER.warning("Background refresh of the Daikin token failed, retrying in %s seconds: %s", TOKEN_REFRESH_RETRY, ex)
+            self.async_start_token_refresh(TOKEN_REFRESH_RETRY)
+            return
+        _LOGGER.debug("Daikin token refreshed, expires at %s", datetime.fromtimestamp(self.session.token["expires_at"]))
+        self.async_start_token_refresh()
+
+    def update_settings(self, config_entry: config_entries.ConfigEntry):
+        # Connect and read timeout of the http request and the total time a request may take
+        self.timeouts = (config_entry.options.get("connect_timeout", 10), config_entry.options.get("read_timeout", 30))
+        self.total_timeout = config_entry.options.get("total_timeout", 60)
+
+        if config_entry.options.get("capture", False):
+            if self.recorder is None:
+                # Only imported when recording is enabled
+                from .capture import CAPTURE_FILE
+                from .capture import CaptureRecorder
 
-            self.rate_limits["minute"] = int(res.headers.get("X-RateLimit-Limit-minute", 0))
-            self.rate_limits["day"] = int(res.headers.get("X-RateLimit-Limit-day", 0))
-            self.rate_limits["remaining_minutes"] = int(res.headers.get("X-RateLimit-Remaining-minute", 0))
-            self.rate_limits["remaining_day"] = int(res.headers.get("X-RateLimit-Remaining-day", 0))
-            self.rate_limits["retry_after"] = int(res.headers.get("retry-after", 0))
-            self.rate_limits["ratelimit_reset"] = int(res.headers.get("ratelimit-reset", 0))
+                self.recorder = CaptureRecorder(self.hass.config.path(CAPTURE_FILE.format(config_entry.entry_id)))
+                _LOGGER.info("Recording the Daikin cloud requests to %s", self.recorder.path)
+        else:
+            self.recorder = None
 
-            if self.rate_limits["remaining_minutes"] > 0:
-                ir.async_delete_issue(self.hass, DOMAIN, "minute_rate_limit")
+    def request_budget(self):
+        """Return the number of requests which can still be done this minute and today, unlimited before the cloud reported its limits."""
+        budget = float("inf")
+        if self.rate_limits["minute"]:
+            budget = min(budget, self.rate_limits["remaining_minutes"])
+        if self.rate_limits["day"]:
+            budget = min(budget, self.rate_limits["remaining_day"])
+        return budget
 
-            if self.rate_limits["remaining_day"] > 0:
-                ir.async_delete_issue(self.hass, DOMAIN, "day_rate_limit")
+    def issue_id(self, issue):
+        """Rate limits are per account, so are the issues about them."""
+        return f"{issue}_{self._config_entry.entry_id}"
 
-            _LOGGER.debug("BEARER RESPONSE CODE: %s LIMIT: %s", res.status_code, self.rate_limits)
+    def _request(self, method, endpoint, url, headers, data):
+        """Do the http request, when recording also append it to the capture, runs in the executor."""
+        started = time.time()
+        try:
+            res = self.transport(url=url, method=method, headers=headers, data=data, timeout=self.timeouts)
+        except Exception as e:
+            if self.recorder is not None:
+                self.recorder.record(method, endpoint, data, started, time.time() - started, "failed", {}, str(e))
+            raise
+        if self.recorder is not None:
+            self.recorder.record(method, endpoint, data, started, time.time() - started, res.status_code, res.headers, res.text)
+        return res
+
+    async def _send_locked(self, func, priority, sent):
+        """Do the request in the executor under the cloud lock and a scheduler slot.
+
+        Runs as its own task so that when the caller stops waiting, the lock is held until the
+        request in the executor finished. The sent future gets the moment the request started.
+        """
+        lock_requested = time.monotonic()
+        async with self._cloud_lock.hold(priority), self.scheduler.slot(self._config_entry.entry_id):
+            self.metrics.record_lock_wait(time.monotonic() - lock_requested)
+            sent.set_result(time.monotonic())
+            return await self.hass.async_add_executor_job(func)
+
+    async def _send(self, method, resourceUrl, options, extra_headers=None, priority=PRIORITY_BACKGROUND):
+        """Do one request under the cloud lock, returns the response or the exception of the request.
+
+        The lock wait and the request together have to finish within the total timeout or the
+        remaining time of the deadline. On a timeout a request which is waiting for the lock is
+        cancelled, a request which was sent keeps the lock until it finished so that it never
+        overlaps the next one.
+        """
+        endpoint = resourceUrl
+        request_bytes = len(options) if options else 0
+        total_timeout = remaining_time(self.total_timeout)
+        if total_timeout <= 0:
+            self.metrics.record_timeout("deadline")
+            return None, DeadlineExceeded(f"Deadline exceeded before {method} {endpoint}")
+
+        request_start = time.monotonic()
+        sent = self.hass.loop.create_future()
+        request = None
+        try:
+            async with asyncio.timeout(total_timeout):
+                # The token is fetched before taking the lock, a refresh never holds up other requests
+                token = await self.async_get_access_token()
+
+                resourceUrl = DAIKIN_API_URL + resourceUrl
+                headers = {"Accept-Encoding": "gzip", "Authorization": "Bearer " + token, "Content-Type": "application/json"}
+                if extra_headers:
+                    headers.update(extra_headers)
+
+                _LOGGER.debug("BEARER REQUEST URL: %s", resourceUrl)
+                _LOGGER.debug("BEARER TYPE %s JSON: %s", method, options)
+
+                func = functools.partial(self._request, method, endpoint, resourceUrl, headers, options)
+                request = self.hass.async_create_background_task(self._send_locked(func, priority, sent), f"daikin_onecta {method} {endpoint}")
+                try:
+                    res = await asyncio.shield(request)
+                except Exception as e:
+                    if isinstance(e, requests.ConnectTimeout):
+                        self.metrics.record_timeout("connect")
+                    elif isinstance(e, requests.Timeout):
+                        self.metrics.record_timeout("read")
+                    self.metrics.record_failure(method, endpoint, time.monotonic() - sent.result(), request_bytes)
+                    return None, e
+        except TimeoutError as e:
+            if sent.done():
+                request_start = sent.result()
+            elif request is not None:
+                # Still waiting for the lock, give up the place in the queue
+                request.cancel()
+            self.metrics.record_failure(method, endpoint, time.monotonic() - request_start, request_bytes)
+            if total_timeout < self.total_timeout:
+                self.metrics.record_timeout("deadline")
+                return None, DeadlineExceeded(f"Deadline exceeded during {method} {endpoint}")
+            self.metrics.record_timeout("total")
+            return None, e
+
+        self.metrics.record_response(method, endpoint, res.status_code, time.monotonic() - sent.result(), request_bytes, len(res.content))
+
+        self.rate_limits["minute"] = int(res.headers.get("X-RateLimit-Limit-minute", 0))
+        self.rate_limits["day"] = int(res.headers.get("X-RateLimit-Limit-day", 0))
+        self.rate_limits["remaining_minutes"] = int(res.headers.get("X-RateLimit-Remaining-minute", 0))
+        self.rate_limits["remaining_day"] = int(res.headers.get("X-RateLimit-Remaining-day", 0))
+        self.rate_limits["retry_after"] = int(res.headers.get("retry-after", 0))
+        self.rate_limits["ratelimit_reset"] = int(res.headers.get("ratelimit-reset", 0))
+
+        if self.rate_limits["remaining_minutes"] > 0:
+            ir.async_delete_issue(self.hass, DOMAIN, self.issue_id("minute_rate_limit"))
+
+        if self.rate_limits["remaining_day"] > 0:
+            ir.async_delete_issue(self.hass, DOMAIN, self.issue_id("day_rate_limit"))
+
+        _LOGGER.debug("BEARER RESPONSE CODE: %s LIMIT: %s", res.status_code, self.rate_limits)
+        return res, None
+
+    async def doBearerRequest(self, method, resourceUrl, options=None, conditional=False, priority=None):
+        """Do a request to the Daikin cloud.
+
+        With conditional a GET returns NOT_MODIFIED when the data of the endpoint didn't change
+        since the previous request. Without a priority the priority of the current task is used.
+        """
+        if priority is None:
+            priority = current_priority()
+        if method != "GET" and self.circuit_breaker.is_open:
+            raise DaikinApiError("The Daikin cloud is unavailable, command not sent")
+
+        request_start = time.monotonic()
+        attempt = 1
+        while True:
+            res, error = await self._send(
+                method, resourceUrl, options, self.response_cache.request_headers(resourceUrl) if conditional else None, priority
+            )
+            reason = classify_failure(res, error, self.retry_policy.max_delay)
+            if reason is None:
+                if res is not None and (200 <= res.status_code < 300 or res.status_code == 304):
+                    self.circuit_breaker.record_success()
+                break
+            # Rate limiting protects the cloud against our requests, the cloud itself is available
+            if reason != RETRY_RATE_LIMITED and self.circuit_breaker.record_failure(reason):
+                _LOGGER.warning(
+                    "Daikin cloud unavailable after %s consecutive failures, only probing it until it recovers", self.circuit_breaker.failures
+                )
+            if self.circuit_breaker.is_open:
+                break
+            delay = self.retry_policy.delay(attempt, retry_after_seconds(res) if res is not None else 0)
+            if not self.retry_policy.allows(attempt, time.monotonic() - request_start, delay) or remaining_time(self.total_timeout) <= delay:
+                break
+            self.metrics.record_retry(reason)
+            _LOGGER.info("REQUEST TYPE %s %s FAILED (%s), retry %s in %.1f seconds", method, resourceUrl, reason, attempt, delay)
+            # Wait outside the cloud lock so that other requests can continue
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        if error is not None:
+            _LOGGER.error("REQUEST TYPE %s FAILED: %s", method, error)
+            if method == "GET":
+                raise DaikinApiError(f"Retrieving data failed after {attempt} attempt(s): {error}") from error
+            return False
+
+        if conditional and res.status_code in (200, 304) and self.response_cache.is_unchanged(resourceUrl, res):
+            _LOGGER.debug("BEARER RESPONSE %s NOT MODIFIED", resourceUrl)
+            return NOT_MODIFIED
 
         if method == "GET" and res.status_code == 200:
             try:
-                return res.json()
+                decode_start = time.monotonic()
+                json_data = res.json()
+                self.metrics.record_decode(time.monotonic() - decode_start)
+                if conditional:
+                    self.response_cache.record(resourceUrl, res)
+                    self.response_cache.record_processing(resourceUrl, time.monotonic() - decode_start)
+                return json_data
             except Exception:
                 _LOGGER.error("RETRIEVE JSON FAILED: %s", res.text)
                 return False
@@ -115,37 +392,45 @@ class DaikinApi:
                 ir.async_create_issue(
                     self.hass,
                     DOMAIN,
-                    "minute_rate_limit",
+                    self.issue_id("minute_rate_limit"),
                     is_fixable=False,
                     is_persistent=True,
                     severity=ir.IssueSeverity.ERROR,
                     learn_more_url="https://developer.cloud.daikineurope.com/docs/b0dffcaa-7b51-428a-bdff-a7c8a64195c0/general_api_guidelines#doc-heading-rate-limitation",
                     translation_key="minute_rate_limit",
+                    translation_placeholders={"account": self._config_entry.title},
                 )
 
             if self.rate_limits["remaining_day"] == 0:
                 ir.async_create_issue(
                     self.hass,
                     DOMAIN,
-                    "day_rate_limit",
+                    self.issue_id("day_rate_limit"),
                     is_fixable=False,
                     is_persistent=True,
                     severity=ir.IssueSeverity.ERROR,
                     learn_more_url="https://developer.cloud.daikineurope.com/docs/b0dffcaa-7b51-428a-bdff-a7c8a64195c0/general_api_guidelines#doc-heading-rate-limitation",
                     translation_key="day_rate_limit",
+                    translation_placeholders={"account": self._config_entry.title},
                 )
             if method == "GET":
-                return []
-            else:
-                return False
+                retry_after = retry_after_seconds(res)
+                raise DaikinRateLimitError(f"Rate limit of the Daikin cloud reached, retry after {retry_after} seconds", retry_after)
+            return False
         elif res.status_code == 204:
             self._last_patch_call = datetime.now()
+            # The devices hold the written values now, the next response has to be merged even when unchanged
+            self.response_cache.invalidate("/v1/gateway-devices")
             return True
 
         _LOGGER.error("REQUEST TYPE %s FAILED: %s %s", method, res.status_code, res.text)
 
-        raise Exception("Communication failed! Status: " + str(res.status_code) + " " + res.text)
+        raise DaikinApiError("Communication failed! Status: " + str(res.status_code) + " " + res.text)
 
     async def getCloudDeviceDetails(self):
         """Get pure Device Data from the Daikin cloud devices."""
-        return await self.doBearerRequest("GET", "/v1/gateway-devices")
+        return await self.doBearerRequest("GET", "/v1/gateway-devices", conditional=True)
+
+    async def getCloudDevice(self, device_id):
+        """Get the data of one device from the Daikin cloud."""
+        return await self.doBearerRequest("GET", f"/v1/gateway-devices/{device_id}", conditional=True)
@@ -0,0 +1,37 @@
+"""Deadlines of the requests to the Daikin cloud."""
+import contextlib
+import contextvars
+import time
+
+# Monotonic time at which the requests of the current context have to be finished
+_deadline = contextvars.ContextVar("daikin_onecta_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The deadline of the caller passed, which isn't a failure of the Daikin cloud."""
+
+
+@contextlib.contextmanager
+def request_deadline(seconds):
+    """All requests done within the context have to finish within the given seconds.
+
+    The deadline is inherited by the tasks created within the context, a nested
+    deadline can only make it shorter.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time(default):
+    """Return the seconds a request may take, at most default."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return default
+    return min(default, deadline - time.monotonic())
@@ -1,8 +1,10 @@
 import json
 import logging
+from datetime import datetime
 
 from homeassistant.helpers.device_registry import CONNECTION_NETWORK_MAC
 
+from .commands import CommandQueue
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
@@ -14,8 +16,14 @@ class DaikinOnectaDevice:
     def __init__(self, jsonData, apiInstance):
         """Initialize a new Daikin Onecta Device."""
         self.api = apiInstance
+        # Commands of this device are sent in order, created when the first command is sent
+        self.commands = None
+        # Called with this device after a command succeeded
+        self.on_write = None
         # get name from climateControl
         self.daikin_data = jsonData
+        # Moment we received the last data from the Daikin cloud
+        self.last_data_update = datetime.now()
         self.id = self.daikin_data["id"]
         self.name = self.daikin_data["deviceModel"]
 
@@ -30,6 +38,8 @@ class DaikinOnectaDevice:
 
     @property
     def available(self) -> bool:
+        if self.api is not None and self.api.circuit_breaker.is_open:
+            return False
         result = False
         icu = self.daikin_data.get("isCloudConnectionUp")
         if icu is not None:
@@ -86,6 +96,7 @@ class DaikinOnectaDevice:
     def setJsonData(self, desc):
         """Set a device description and parse/traverse data structure."""
         self.merge_json(self.daikin_data, desc)
+        self.last_data_update = datetime.now()
 
     async def patch(self, id, embeddedId, dataPoint, dataPointPath, value):
         setPath = "/v1/gateway-devices/" + id + "/management-points/" + embeddedId + "/characteristics/" + dataPoint
@@ -96,7 +107,7 @@ class DaikinOnectaDevice:
 
         _LOGGER.info("Path: " + setPath + " , options: %s", setOptions)
 
-        res = await self.api.doBearerRequest("PATCH", setPath, setOptions)
+        res = await self._submit(("PATCH", setPath, dataPointPath), "PATCH", setPath, setOptions)
         _LOGGER.debug("RES IS {}".format(res))
 
         return res
@@ -107,7 +118,7 @@ class DaikinOnectaDevice:
 
         _LOGGER.info("Path: " + setPath + " , options: %s", setOptions)
 
-        res = await self.api.doBearerRequest("POST", setPath, setOptions)
+        res = await self._submit(None, "POST", setPath, setOptions)
         _LOGGER.debug("RES IS {}".format(res))
 
         return res
@@ -118,7 +129,20 @@ class DaikinOnectaDevice:
 
         _LOGGER.info("Path: " + setPath + " , options: %s", setOptions)
 
-        res = await self.api.doBearerRequest("PUT", setPath, setOptions)
+        res = await self._submit(None, "PUT", setPath, setOptions)
         _LOGGER.debug("RES IS {}".format(res))
 
         return res
+
+    async def _submit(self, key, method, path, options):
+        """Queue the request behind the other commands of this device, a newer command with the same key supersedes it."""
+        if self.commands is None:
+            self.commands = CommandQueue(self.api.hass, self.api.command_metrics)
+
+        async def send(priority):
+            return await self.api.doBearerRequest(method, path, options, priority=priority)
+
+        res = await self.commands.submit(key, send)
+        if res and self.on_write is not None:
+            self.on_write(self)
+        return res
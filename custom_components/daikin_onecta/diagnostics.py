@@ -7,17 +7,31 @@ from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceEntry
 
+from .const import COORDINATOR
 from .const import DAIKIN_API
 from .const import DAIKIN_DEVICES
-from .const import DOMAIN
+from .memory import device_memory
+from .memory import memory_report
 
 
 async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
     data = {}
-    daikin_api = hass.data[DOMAIN][DAIKIN_API]
+    daikin_api = entry.runtime_data[DAIKIN_API]
     data["json_data"] = daikin_api.json_data
     data["rate_limits"] = daikin_api.rate_limits
+    data["request_metrics"] = daikin_api.metrics.as_dict()
+    data["circuit_breaker"] = daikin_api.circuit_breaker.as_dict()
+    data["response_cache"] = daikin_api.response_cache.as_dict()
+    data["scheduler"] = daikin_api.scheduler.as_dict()
+    data["command_queue"] = daikin_api.command_metrics.as_dict()
+    coordinator = entry.runtime_data[COORDINATOR]
+    data["refresh"] = coordinator.refresh_stats
+    data["change_rates"] = coordinator.change_tracker.as_dict()
+    data["burst_polling"] = coordinator.burst.as_dict()
+    if coordinator.profiler is not None:
+        data["refresh_profile"] = coordinator.profiler.as_dict()
+    data["memory"] = memory_report(entry.runtime_data[DAIKIN_DEVICES], coordinator.listening_entities(), daikin_api.json_data)
     data["options"] = entry.options
     data["oauth2_token_valid"] = daikin_api.session.valid_token
     return data
@@ -27,10 +41,12 @@ async def async_get_device_diagnostics(hass: HomeAssistant, entry: ConfigEntry,
     """Return diagnostics for a device entry."""
     data = {}
     dev_id = next(iter(device.identifiers))[1]
-    daikin_api = hass.data[DOMAIN][DAIKIN_API]
-    daikin_device = hass.data[DOMAIN][DAIKIN_DEVICES].get(dev_id)
+    daikin_api = entry.runtime_data[DAIKIN_API]
+    daikin_device = entry.runtime_data[DAIKIN_DEVICES].get(dev_id)
     if daikin_device is not None:
         data["device_json_data"] = daikin_device.daikin_data
+        payload = next((dev_data for dev_data in daikin_api.json_data or [] if dev_data.get("id") == dev_id), None)
+        data["memory"] = device_memory(daikin_device, payload)
     data["rate_limits"] = daikin_api.rate_limits
     data["options"] = entry.options
     data["oauth2_token_valid"] = daikin_api.session.valid_token
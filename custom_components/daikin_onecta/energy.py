@@ -0,0 +1,143 @@
+"""Helpers to derive additional information from the Daikin consumption data."""
+from collections import deque
+from datetime import datetime
+from datetime import time
+from datetime import timedelta
+
+from .const import SENSOR_PERIOD_WEEKLY
+
+# The daily consumption data contains 24 buckets of 2 hours, the first 12
+# are for yesterday, the last 12 for today. The weekly data has 14 days, the
+# yearly data 24 months, both with the current period in the second half
+DAILY_TODAY_START = 12
+WEEKLY_CURRENT_START = 7
+
+# Hours of one bucket of the daily consumption data
+BUCKET_HOURS = 2
+
+# Number of completed buckets of which we keep the average power
+POWER_SAMPLES = 12
+
+
+def current_period_energy(values, period):
+    """Return the energy consumed in the current day/week/year of a consumption data array."""
+    energy_values = [0 if v is None else v for v in values]
+    start_index = WEEKLY_CURRENT_START if period == SENSOR_PERIOD_WEEKLY else DAILY_TODAY_START
+    return round(sum(energy_values[start_index:]), 3)
+
+
+class PowerEstimator:
+    """Average electrical power per bucket of the daily consumption data.
+
+    The last bucket with a value is the one in progress, the bucket before it is
+    complete and its energy (kWh) divided by the bucket length gives the average
+    power (W) over those 2 hours. The power of the last completed buckets is kept
+    in a ring buffer, a bucket revised by the cloud replaces its earlier value.
+    """
+
+    def __init__(self, maxlen=POWER_SAMPLES):
+        self._buckets = deque(maxlen=maxlen)
+
+    def update(self, timestamp: datetime, values) -> None:
+        """Process the daily consumption data received at timestamp."""
+        if values is None:
+            return
+        current = max((index for index, value in enumerate(values) if value is not None), default=0)
+        if current == 0:
+            # Without the bucket in progress we don't know which bucket is complete
+            return
+        completed = current - 1
+        day = timestamp.date() if completed >= DAILY_TODAY_START else timestamp.date() - timedelta(days=1)
+        start = datetime.combine(day, time(hour=(completed % DAILY_TODAY_START) * BUCKET_HOURS))
+        power = round((values[completed] or 0) * 1000 / BUCKET_HOURS, 1)
+        if self._buckets and self._buckets[-1][0] == start:
+            self._buckets[-1] = (start, power)
+        elif not self._buckets or start > self._buckets[-1][0]:
+            self._buckets.append((start, power))
+
+    @property
+    def power(self):
+        """Return the average power in W of the last completed bucket, None when unknown."""
+        return self._buckets[-1][1] if self._buckets else None
+
+    @property
+    def bucket_start(self):
+        """Return the start of the last completed bucket, None when unknown."""
+        return self._buckets[-1][0] if self._buckets else None
+
+    def history(self):
+        """Return the start and average power of the buckets in the ring buffer, oldest first."""
+        return list(self._buckets)
+
+
+class EnergyAccumulator:
+    """Accumulate the daily consumption buckets into a lifetime energy total.
+
+    The daily consumption data is a sliding window of 48 hours, at midnight the
+    buckets of today move to yesterday. For each update we align the new buckets
+    with the buckets we have seen before and only add the increase of each bucket
+    to the total, so the total never resets. A bucket which goes down is a
+    revision by the cloud, we keep the highest value so that it isn't counted
+    twice when it goes up again.
+    """
+
+    def __init__(self, total=0.0, buckets=None, last_update: datetime | None = None, revisions=0):
+        self.total = total
+        self.buckets = buckets
+        self.last_update = last_update
+        self.revisions = revisions
+
+    def update(self, timestamp: datetime, values) -> float:
+        """Process a new daily consumption array and return the lifetime total."""
+        if values is None:
+            return self.total
+        values = [0 if v is None else v for v in values]
+        if self.buckets is not None and len(self.buckets) == len(values):
+            previous = self._align(timestamp, values)
+            for index, value in enumerate(values):
+                if value > previous[index]:
+                    self.total = round(self.total + value - previous[index], 3)
+                elif value < previous[index]:
+                    self.revisions += 1
+                    values[index] = previous[index]
+        # Without previous buckets the current values are the baseline, we
+        # don't know what part of them we already counted
+        self.buckets = values
+        self.last_update = timestamp
+        return self.total
+
+    def _align(self, timestamp: datetime, values):
+        """Return the previous buckets aligned with the new buckets."""
+        size = len(values)
+        if self.last_update is not None and (timestamp.date() - self.last_update.date()).days > 1:
+            # We missed a complete day, all buckets are new
+            return [0] * size
+
+        unshifted = self.buckets
+        shifted = self.buckets[DAILY_TODAY_START:] + [0] * DAILY_TODAY_START
+        unshifted_distance = sum(abs(v - p) for v, p in zip(values, unshifted))
+        shifted_distance = sum(abs(v - p) for v, p in zip(values, shifted))
+        if shifted_distance < unshifted_distance:
+            return shifted
+        if shifted_distance == unshifted_distance and self.last_update is not None and timestamp.date() != self.last_update.date():
+            # Data doesn't tell us, use the calendar
+            return shifted
+        return unshifted
+
+    def as_dict(self):
+        return {
+            "total": self.total,
+            "buckets": self.buckets,
+            "last_update": self.last_update.isoformat() if self.last_update is not None else None,
+            "revisions": self.revisions,
+        }
+
+    @classmethod
+    def from_dict(cls, restored):
+        last_update = restored.get("last_update")
+        return cls(
+            total=restored.get("total", 0.0),
+            buckets=restored.get("buckets"),
+            last_update=datetime.fromisoformat(last_update) if last_update is not None else None,
+            revisions=restored.get("revisions", 0),
+        )
@@ -0,0 +1,109 @@
+"""Memory accounting of the Daikin Onecta devices and entities."""
+import os
+import sys
+import tracemalloc
+
+# Number of stale key paths reported per device
+STALE_KEYS_TOP = 20
+
+# Number of allocation lines reported when tracemalloc is tracing
+TRACEMALLOC_TOP = 10
+
+# Entity attributes that refer to shared objects, they are accounted elsewhere
+SHARED_ATTRIBUTES = {"hass", "platform", "coordinator", "_device", "registry_entry", "device_entry"}
+
+
+def deep_sizeof(obj, seen=None):
+    """Return the bytes retained by obj and the containers/strings it holds."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(value, seen) for value in obj)
+    return size
+
+
+def entity_sizeof(entity):
+    """Return the bytes of the entity object and its own attributes, shared objects are excluded."""
+    attributes = vars(entity)
+    size = sys.getsizeof(entity) + sys.getsizeof(attributes)
+    seen = set()
+    for name, value in attributes.items():
+        if name not in SHARED_ATTRIBUTES and isinstance(value, (str, bytes, int, float, dict, list, tuple, set)):
+            size += deep_sizeof(value, seen)
+    return size
+
+
+def stale_keys(data, payload, path=""):
+    """Return the key paths in data which are not part of the payload anymore.
+
+    merge_json only adds and updates keys, so keys which disappeared from the cloud
+    payload stay in the device data and make it grow.
+    """
+    result = []
+    for key, value in data.items():
+        key_path = f"{path}/{key}"
+        if key not in payload:
+            result.append(key_path)
+        elif isinstance(value, dict) and isinstance(payload[key], dict):
+            result.extend(stale_keys(value, payload[key], key_path))
+    return result
+
+
+def device_memory(device, payload=None):
+    """Return the bytes retained by the device data and per management point."""
+    management_points = {}
+    for management_point in device.daikin_data.get("managementPoints", []):
+        management_points[management_point.get("embeddedId")] = deep_sizeof(management_point)
+    result = {
+        "name": device.name,
+        "bytes": deep_sizeof(device.daikin_data),
+        "management_points": management_points,
+    }
+    if payload is not None:
+        keys = stale_keys(device.daikin_data, payload)
+        result["stale_keys_count"] = len(keys)
+        result["stale_keys"] = keys[:STALE_KEYS_TOP]
+    return result
+
+
+def memory_report(devices, entities, json_data=None):
+    """Return the memory report for the diagnostics."""
+    payloads = {dev_data["id"]: dev_data for dev_data in json_data or [] if isinstance(dev_data, dict) and "id" in dev_data}
+    report_devices = {}
+    for device in devices.values():
+        # Keyed by id, device names don't have to be unique
+        report_devices[device.id] = device_memory(device, payloads.get(device.id))
+
+    entity_classes = {}
+    for entity in entities:
+        entity_class = entity_classes.setdefault(type(entity).__name__, {"count": 0, "bytes": 0})
+        entity_class["count"] += 1
+        entity_class["bytes"] += entity_sizeof(entity)
+
+    report = {
+        "devices": report_devices,
+        "entity_classes": dict(sorted(entity_classes.items(), key=lambda item: item[1]["bytes"], reverse=True)),
+        "growing_devices": [device_id for device_id, device in report_devices.items() if device.get("stale_keys_count")],
+    }
+    if tracemalloc.is_tracing():
+        report["tracemalloc"] = tracemalloc_report()
+    return report
+
+
+def tracemalloc_report():
+    """Return the allocations by line of this integration, tracemalloc has to be tracing."""
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(True, os.path.join(os.path.dirname(__file__), "*"))])
+    statistics = snapshot.statistics("lineno")
+    return {
+        "bytes": sum(statistic.size for statistic in statistics),
+        "top": {
+            f"{os.path.basename(statistic.traceback[0].filename)}:{statistic.traceback[0].lineno}": statistic.size
+            for statistic in statistics[:TRACEMALLOC_TOP]
+        },
+    }
@@ -0,0 +1,148 @@
+"""Request metrics of the Daikin Onecta API."""
+import re
+from collections import Counter
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Device ids would make an endpoint for each device, group them together
+DEVICE_PATH = re.compile(r"^/v1/gateway-devices/[^/]+")
+
+
+def endpoint_name(method, resource_url):
+    """Return the name of the endpoint used to group the metrics."""
+    return f"{method} {DEVICE_PATH.sub('/v1/gateway-devices/{id}', resource_url)}"
+
+
+class Histogram:
+    """Histogram with fixed bucket bounds."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value) -> None:
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def average(self):
+        if self.count == 0:
+            return 0
+        return round(self.total / self.count, 1)
+
+    def as_dict(self):
+        buckets = {f"<={bound}": count for bound, count in zip(self.bounds, self.buckets)}
+        buckets["+Inf"] = self.buckets[-1]
+        return {
+            "count": self.count,
+            "average": self.average,
+            "max": round(self.max, 1),
+            "buckets": buckets,
+        }
+
+
+class EndpointMetrics:
+    """Metrics of one endpoint."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.status_codes = Counter()
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def as_dict(self):
+        return {
+            "latency_ms": self.latency.as_dict(),
+            "status_codes": dict(self.status_codes),
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+        }
+
+
+class RequestMetrics:
+    """Metrics of all requests done to the Daikin cloud."""
+
+    def __init__(self):
+        self.endpoints = {}
+        self.status_codes = Counter()
+        self.lock_wait = Histogram()
+        self.decode = Histogram()
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.retry_reasons = Counter()
+        self.timeouts = Counter()
+
+    def record_lock_wait(self, seconds) -> None:
+        self.lock_wait.observe(seconds * 1000)
+
+    def record_decode(self, seconds) -> None:
+        self.decode.observe(seconds * 1000)
+
+    def record_retry(self, reason) -> None:
+        self.retries += 1
+        self.retry_reasons[reason] += 1
+
+    def record_timeout(self, kind) -> None:
+        """Record a timeout, kind is connect, read, total or deadline."""
+        self.timeouts[kind] += 1
+
+    def record_response(self, method, resource_url, status_code, seconds, request_bytes, response_bytes) -> None:
+        self._record(method, resource_url, status_code, seconds, request_bytes, response_bytes)
+        if status_code == 429:
+            self.rate_limited += 1
+        elif status_code >= 400:
+            self.errors += 1
+
+    def record_failure(self, method, resource_url, seconds, request_bytes) -> None:
+        """Record a request which didn't get a response."""
+        self._record(method, resource_url, "failed", seconds, request_bytes, 0)
+        self.errors += 1
+
+    def _record(self, method, resource_url, status_code, seconds, request_bytes, response_bytes) -> None:
+        endpoint = self.endpoints.setdefault(endpoint_name(method, resource_url), EndpointMetrics())
+        endpoint.latency.observe(seconds * 1000)
+        endpoint.status_codes[status_code] += 1
+        endpoint.request_bytes += request_bytes
+        endpoint.response_bytes += response_bytes
+        self.status_codes[status_code] += 1
+        self.requests += 1
+
+    def summary(self):
+        """Return the values used by the request sensors."""
+        latency = Histogram()
+        for endpoint in self.endpoints.values():
+            latency.count += endpoint.latency.count
+            latency.total += endpoint.latency.total
+            latency.max = max(latency.max, endpoint.latency.max)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "timeouts": sum(self.timeouts.values()),
+            "latency_average": latency.average,
+            "latency_max": round(latency.max, 1),
+            "lock_wait_average": self.lock_wait.average,
+        }
+
+    def as_dict(self):
+        return {
+            "summary": self.summary(),
+            "status_codes": dict(self.status_codes),
+            "retry_reasons": dict(self.retry_reasons),
+            "timeouts": dict(self.timeouts),
+            "lock_wait_ms": self.lock_wait.as_dict(),
+            "decode_ms": self.decode.as_dict(),
+            "endpoints": {name: endpoint.as_dict() for name, endpoint in self.endpoints.items()},
+        }
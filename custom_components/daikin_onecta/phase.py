@@ -0,0 +1,35 @@
+"""Phase aligned polling, spreads the polls of the installations over the interval."""
+import hashlib
+import math
+
+# Version and key of the stored phase of a config entry
+STORAGE_VERSION = 1
+STORAGE_KEY = "daikin_onecta.{}.phase"
+
+# A scheduled poll is at least this fraction of the interval after the previous fetch
+MIN_GAP_FRACTION = 0.5
+
+# Step of the phase when the polls collide with other requests, the golden ratio
+# spreads the successive phases evenly over the interval
+PHASE_STEP = (math.sqrt(5) - 1) / 2
+
+
+def initial_phase(entry_id):
+    """Return the deterministic phase of the polls of the config entry, between 0 and 1."""
+    digest = hashlib.sha256(entry_id.encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def shifted_phase(phase):
+    """Return the next phase to try after a collision."""
+    return (phase + PHASE_STEP) % 1
+
+
+def next_poll(now, interval, phase, last_fetch=None):
+    """Return the timestamp of the first poll after now on the grid of the interval shifted by the phase.
+
+    The poll is at least MIN_GAP_FRACTION of the interval after the last fetch.
+    """
+    earliest = now if last_fetch is None else max(now, last_fetch + interval * MIN_GAP_FRACTION)
+    offset = phase * interval
+    return offset + (math.floor((earliest - offset) / interval) + 1) * interval
@@ -0,0 +1,97 @@
+"""Profiling of the Daikin Onecta coordinator refreshes."""
+from collections import deque
+
+# Number of refreshes we keep for the profile
+PROFILE_WINDOW = 20
+
+# Number of slowest devices/entities reported
+PROFILE_TOP = 5
+
+
+class RefreshProfile:
+    """Time spend in each phase of one coordinator refresh, all times in seconds."""
+
+    def __init__(self):
+        self.network = 0.0
+        self.decode = 0.0
+        self.merge = {}
+        self.entities = {}
+        self.entity_classes = {}
+
+    def as_dict(self):
+        return {
+            "network_ms": round(self.network * 1000, 3),
+            "decode_ms": round(self.decode * 1000, 3),
+            "merge_ms": round(sum(self.merge.values()) * 1000, 3),
+            "entities_ms": round(sum(self.entities.values()) * 1000, 3),
+        }
+
+
+class RefreshProfiler:
+    """Keeps the profiles of the last coordinator refreshes."""
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.profiles = deque(maxlen=window)
+        self._current = None
+        # Merge times are kept per device id, names aren't unique and are only shown
+        self.device_names = {}
+
+    def start(self) -> None:
+        self._current = RefreshProfile()
+
+    def record_fetch(self, seconds, decode_seconds) -> None:
+        """Record the time of retrieving the data, the network part is the time not spend on decoding."""
+        if self._current is not None:
+            self._current.network += max(seconds - decode_seconds, 0)
+            self._current.decode += decode_seconds
+
+    def record_merge(self, device_id, device_name, seconds) -> None:
+        if self._current is not None:
+            self.device_names[device_id] = device_name
+            self._current.merge[device_id] = self._current.merge.get(device_id, 0) + seconds
+
+    def record_entity(self, entity, seconds) -> None:
+        """Record the time an entity needed to update its state and write it to HA."""
+        if self._current is not None:
+            entity_id = getattr(entity, "entity_id", None) or repr(entity)
+            entity_class = type(entity).__name__
+            self._current.entities[entity_id] = self._current.entities.get(entity_id, 0) + seconds
+            self._current.entity_classes[entity_class] = self._current.entity_classes.get(entity_class, 0) + seconds
+
+    def finish(self) -> None:
+        if self._current is not None:
+            self.profiles.append(self._current)
+            self._current = None
+
+    def as_dict(self):
+        """Return the averages over the profiled refreshes and the slowest devices and entities."""
+        count = len(self.profiles)
+        if count == 0:
+            return {"refreshes": 0}
+
+        def average_ms(values):
+            return round(sum(values) * 1000 / count, 3)
+
+        def slowest(attribute):
+            totals = {}
+            for profile in self.profiles:
+                for name, seconds in getattr(profile, attribute).items():
+                    totals[name] = totals.get(name, 0) + seconds
+            ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+            return {name: round(seconds * 1000 / count, 3) for name, seconds in ordered[:PROFILE_TOP]}
+
+        return {
+            "refreshes": count,
+            "average": {
+                "network_ms": average_ms([p.network for p in self.profiles]),
+                "decode_ms": average_ms([p.decode for p in self.profiles]),
+                "merge_ms": average_ms([sum(p.merge.values()) for p in self.profiles]),
+                "entities_ms": average_ms([sum(p.entities.values()) for p in self.profiles]),
+            },
+            "entity_classes_ms": slowest("entity_classes"),
+            "slowest_devices_ms": {
+                device_id: {"name": self.device_names.get(device_id), "merge_ms": merge_ms} for device_id, merge_ms in slowest("merge").items()
+            },
+            "slowest_entities_ms": slowest("entities"),
+            "last": self.profiles[-1].as_dict(),
+        }
@@ -0,0 +1,124 @@
+"""On demand refreshes of the Daikin cloud data."""
+import asyncio
+import logging
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.core import ServiceCall
+from homeassistant.core import ServiceResponse
+from homeassistant.exceptions import HomeAssistantError
+
+from .bulk import target_devices
+from .commands import command_priority
+from .commands import context_priority
+from .conditional import NOT_MODIFIED
+from .const import COORDINATOR
+from .const import DAIKIN_API
+from .const import DOMAIN
+from .daikin_api import DaikinRateLimitError
+
+_LOGGER = logging.getLogger(__name__)
+
+RESULT_REFRESHED = "refreshed"
+RESULT_UNCHANGED = "unchanged"
+RESULT_RATE_LIMITED = "rate_limited"
+RESULT_FAILED = "failed"
+
+
+def budget_report(daikin_api, requests):
+    """Return the requests consumed and what is left of the rate limits."""
+    return {
+        "requests": requests,
+        "remaining_minute": daikin_api.rate_limits["remaining_minutes"],
+        "remaining_day": daikin_api.rate_limits["remaining_day"],
+    }
+
+
+async def async_force_update(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Refresh the data of all accounts, or the given config entries, now.
+
+    A refresh already in progress because of another call is shared. An account
+    which has no requests left within its rate limits isn't refreshed, when no
+    account could be refreshed the call fails.
+    """
+    entry_ids = call.data.get("config_entry_id")
+    entries = [
+        entry
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED and (entry_ids is None or entry.entry_id in entry_ids)
+    ]
+    if not entries:
+        raise HomeAssistantError("No loaded Daikin Onecta account to update")
+
+    async def force_update(entry):
+        daikin_api = entry.runtime_data[DAIKIN_API]
+        coordinator = entry.runtime_data[COORDINATOR]
+        if daikin_api.request_budget() <= 0:
+            _LOGGER.warning("Daikin account '%s' not updated, its rate limit has been reached", entry.title)
+            return {"result": RESULT_RATE_LIMITED, "retry_after": daikin_api.rate_limits["retry_after"], **budget_report(daikin_api, 0)}
+        requests = await coordinator.async_force_refresh()
+        return {"result": RESULT_REFRESHED if coordinator.last_update_success else RESULT_FAILED, **budget_report(daikin_api, requests)}
+
+    with command_priority(context_priority(call.context)):
+        results = await asyncio.gather(*(force_update(entry) for entry in entries))
+
+    if all(result["result"] == RESULT_RATE_LIMITED for result in results):
+        retry_after = max(result["retry_after"] for result in results)
+        raise HomeAssistantError(f"Rate limit of the Daikin cloud reached, retry after {retry_after} seconds")
+
+    return {"accounts": {entry.entry_id: {"title": entry.title, **result} for entry, result in zip(entries, results)}}
+
+
+async def async_pull_devices(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Refresh only the targeted devices, each with its own request.
+
+    A device whose data didn't change since its previous pull isn't merged. Each
+    account only pulls as many devices as its remaining rate limits allow.
+    """
+    targets = target_devices(hass, call)
+    budgets = {}
+    requests = {}
+    updated_entries = set()
+    response = {}
+
+    async def pull(entry, device):
+        daikin_api = entry.runtime_data[DAIKIN_API]
+        if budgets[entry.entry_id] <= 0:
+            return RESULT_RATE_LIMITED
+        budgets[entry.entry_id] -= 1
+        try:
+            dev_data = await daikin_api.getCloudDevice(device.id)
+        except DaikinRateLimitError as e:
+            _LOGGER.warning("Device '%s' not pulled: %s", device.name, e)
+            return RESULT_RATE_LIMITED
+        except HomeAssistantError as e:
+            _LOGGER.warning("Device '%s' pull failed: %s", device.name, e)
+            return RESULT_FAILED
+        if dev_data is NOT_MODIFIED:
+            return RESULT_UNCHANGED
+        if not dev_data:
+            return RESULT_FAILED
+        device.setJsonData(dev_data)
+        # All devices returning the data they returned before has to be merged again
+        daikin_api.response_cache.invalidate_endpoint("/v1/gateway-devices")
+        updated_entries.add(entry.entry_id)
+        return RESULT_REFRESHED
+
+    for entry, _ in targets:
+        budgets.setdefault(entry.entry_id, entry.runtime_data[DAIKIN_API].request_budget())
+        requests.setdefault(entry.entry_id, entry.runtime_data[DAIKIN_API].metrics.requests)
+
+    with command_priority(context_priority(call.context)):
+        results = await asyncio.gather(*(pull(entry, device) for entry, device in targets))
+
+    for (entry, device), result in zip(targets, results):
+        response[device.id] = {"name": device.name, "result": result}
+        if entry.entry_id in updated_entries:
+            entry.runtime_data[COORDINATOR].async_update_listeners()
+            updated_entries.discard(entry.entry_id)
+
+    accounts = {}
+    for entry, _ in targets:
+        daikin_api = entry.runtime_data[DAIKIN_API]
+        accounts[entry.entry_id] = {"title": entry.title, **budget_report(daikin_api, daikin_api.metrics.requests - requests[entry.entry_id])}
+    return {"devices": response, "accounts": accounts}
@@ -0,0 +1,64 @@
+"""Retry policy for the requests to the Daikin cloud."""
+import random
+
+import requests
+
+from .deadline import DeadlineExceeded
+
+# Classification of failed requests which are worth retrying
+RETRY_TIMEOUT = "timeout"
+RETRY_CONNECTION = "connection"
+RETRY_SERVER = "server_error"
+RETRY_RATE_LIMITED = "rate_limited"
+
+
+def classify_failure(res, error, max_retry_after):
+    """Return why a request can be retried, None when retrying doesn't help.
+
+    Timeouts, connection problems and 5xx responses are transient. A 429 is only
+    retried when the retry-after of the cloud is short, other 4xx responses won't
+    change by retrying, neither does a request past the deadline of the caller.
+    """
+    if error is not None:
+        if isinstance(error, DeadlineExceeded):
+            return None
+        if isinstance(error, (requests.Timeout, TimeoutError)):
+            return RETRY_TIMEOUT
+        if isinstance(error, (requests.ConnectionError, ConnectionError)):
+            return RETRY_CONNECTION
+        return None
+    if res.status_code >= 500:
+        return RETRY_SERVER
+    if res.status_code == 429:
+        retry_after = retry_after_seconds(res)
+        if 0 < retry_after <= max_retry_after:
+            return RETRY_RATE_LIMITED
+    return None
+
+
+def retry_after_seconds(res):
+    try:
+        return int(res.headers.get("retry-after", 0))
+    except ValueError:
+        return 0
+
+
+class RetryPolicy:
+    """Bounded exponential backoff with full jitter and a deadline per request."""
+
+    def __init__(self, attempts=3, base_delay=1.0, max_delay=10.0, deadline=30.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def delay(self, attempt, retry_after=0):
+        """Return the seconds to wait before the next attempt, attempt is the number of the failed attempt."""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after:
+            return retry_after + backoff
+        return backoff
+
+    def allows(self, attempt, elapsed, delay):
+        """Return if another attempt fits in the number of attempts and the deadline."""
+        return attempt < self.attempts and elapsed + delay < self.deadline
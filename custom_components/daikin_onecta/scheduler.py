@@ -0,0 +1,97 @@
+"""Process wide scheduling of the requests of all Daikin Onecta accounts."""
+import asyncio
+import contextlib
+import time
+
+import requests
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .const import SCHEDULER
+
+# Number of requests which may be sent to the Daikin cloud at the same time by all accounts together
+MAX_CONCURRENT = 2
+
+
+class AccountStatistics:
+    """Number of requests of one account and how long they waited for a slot."""
+
+    def __init__(self):
+        self.requests = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "wait_avg_ms": round(self.wait_total / self.requests * 1000, 3) if self.requests else 0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+class RequestScheduler:
+    """Multiplexes the requests of all accounts over one http connection pool.
+
+    Each account sends at most one request at a time (its own cloud lock), so at
+    most one request per account waits for a slot. The slots are handed out first
+    come first served, which results in a round robin between the busy accounts
+    and one account polling many devices can't starve the others. The rate limits
+    are tracked per account by its own DaikinApi.
+    """
+
+    def __init__(self, max_concurrent=MAX_CONCURRENT):
+        self.max_concurrent = max_concurrent
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrent)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.accounts = {}
+
+    def register(self, account):
+        self.accounts.setdefault(account, AccountStatistics())
+
+    def unregister(self, account):
+        """Remove the account, returns if there are no accounts left."""
+        self.accounts.pop(account, None)
+        return not self.accounts
+
+    @contextlib.asynccontextmanager
+    async def slot(self, account):
+        """Wait until the account may send its request."""
+        requested = time.monotonic()
+        async with self._slots:
+            waited = time.monotonic() - requested
+            statistics = self.accounts.setdefault(account, AccountStatistics())
+            statistics.requests += 1
+            statistics.wait_total += waited
+            statistics.wait_max = max(statistics.wait_max, waited)
+            yield
+
+    def close(self):
+        self.session.close()
+
+    def as_dict(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "accounts": {account: statistics.as_dict() for account, statistics in self.accounts.items()},
+        }
+
+
+def async_get_scheduler(hass: HomeAssistant) -> RequestScheduler:
+    """Return the scheduler shared by all config entries, create it for the first one."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if SCHEDULER not in domain_data:
+        domain_data[SCHEDULER] = RequestScheduler()
+    return domain_data[SCHEDULER]
+
+
+def async_release_scheduler(hass: HomeAssistant, account) -> None:
+    """Remove the account from the scheduler, the last one closes the connection pool."""
+    domain_data = hass.data.get(DOMAIN, {})
+    scheduler = domain_data.get(SCHEDULER)
+    if scheduler is not None and scheduler.unregister(account):
+        scheduler.close()
+        domain_data.pop(SCHEDULER)
+    if DOMAIN in hass.data and not hass.data[DOMAIN]:
+        hass.data.pop(DOMAIN)
@@ -0,0 +1,37 @@
+"""Schemas of the Daikin Onecta services.
+
+The services are registered when the integration is set up, their handlers are
+only imported when they are called.
+"""
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+
+FORCE_UPDATE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("config_entry_id"): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+PULL_DEVICES_SCHEMA = vol.Schema(
+    {
+        **cv.TARGET_SERVICE_FIELDS,
+    }
+)
+
+CHANGE_SCHEMA = vol.Schema(
+    {
+        vol.Required("management_point"): cv.string,
+        vol.Required("characteristic"): cv.string,
+        vol.Optional("path", default=""): cv.string,
+        vol.Required("value"): vol.Any(int, float, str, dict),
+    }
+)
+
+BULK_SET_SCHEMA = vol.Schema(
+    {
+        **cv.TARGET_SERVICE_FIELDS,
+        vol.Required("changes"): vol.All(cv.ensure_list, [CHANGE_SCHEMA]),
+        vol.Optional("max_concurrency", default=4): vol.All(vol.Coerce(int), vol.Range(min=1, max=10)),
+        vol.Optional("timeout", default=60): vol.All(vol.Coerce(float), vol.Range(min=5, max=300)),
+    }
+)
@@ -5,9 +5,9 @@ from homeassistant.components.select import SelectEntity
 from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .commands import CommandPriorityEntity
 from .const import COORDINATOR
 from .const import DAIKIN_DEVICES
-from .const import DOMAIN as DAIKIN_DOMAIN
 from .const import SCHEDULE_OFF
 from .device import DaikinOnectaDevice
 
@@ -16,9 +16,9 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up Daikin climate based on config_entry."""
-    coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
+    coordinator = entry.runtime_data[COORDINATOR]
     sensors = []
-    for dev_id, device in hass.data[DAIKIN_DOMAIN][DAIKIN_DEVICES].items():
+    for dev_id, device in entry.runtime_data[DAIKIN_DEVICES].items():
         managementPoints = device.daikin_data.get("managementPoints", [])
         for management_point in managementPoints:
             management_point_type = management_point["managementPointType"]
@@ -33,7 +33,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
     async_add_entities(sensors)
 
 
-class DaikinScheduleSelect(CoordinatorEntity, SelectEntity):
+class DaikinScheduleSelect(CoordinatorEntity, CommandPriorityEntity, SelectEntity):
     """Daikin Schecule Select class."""
 
     def __init__(self, device: DaikinOnectaDevice, coordinator, embedded_id, management_point_type, value) -> None:
@@ -119,7 +119,7 @@ class DaikinScheduleSelect(CoordinatorEntity, SelectEntity):
                                     break
 
         value = {"scheduleId": scheduleid, "enabled": option != SCHEDULE_OFF}
-        result = await self._device.put(self._device.id, self._embedded_id, f"schedule/{currentMode}/current", value)
+        result = await self.async_command(self._device.put, self._device.id, self._embedded_id, f"schedule/{currentMode}/current", value)
         if result is False:
             _LOGGER.warning(
                 "Device '%s' problem selecting schedule %s",
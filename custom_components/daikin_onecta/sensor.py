@@ -1,15 +1,20 @@
 """Support for Daikin AC sensors."""
 import logging
 import re
+from dataclasses import dataclass
 
 from homeassistant.components.sensor import CONF_STATE_CLASS
+from homeassistant.components.sensor import RestoreSensor
 from homeassistant.components.sensor import SensorDeviceClass
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.components.sensor import SensorExtraStoredData
 from homeassistant.components.sensor import SensorStateClass
 from homeassistant.const import CONF_DEVICE_CLASS
 from homeassistant.const import CONF_ICON
 from homeassistant.const import CONF_UNIT_OF_MEASUREMENT
 from homeassistant.const import UnitOfEnergy
+from homeassistant.const import UnitOfPower
+from homeassistant.const import UnitOfTime
 from homeassistant.core import callback
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import EntityCategory
@@ -18,13 +23,15 @@ from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from .const import COORDINATOR
 from .const import DAIKIN_API
 from .const import DAIKIN_DEVICES
-from .const import DOMAIN as DAIKIN_DOMAIN
 from .const import ENABLED_DEFAULT
 from .const import ENTITY_CATEGORY
-from .const import SENSOR_PERIOD_WEEKLY
+from .const import SENSOR_PERIOD_DAILY
 from .const import SENSOR_PERIODS
 from .const import VALUE_SENSOR_MAPPING
 from .device import DaikinOnectaDevice
+from .energy import current_period_energy
+from .energy import EnergyAccumulator
+from .energy import PowerEstimator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -39,8 +46,8 @@ async def async_setup(hass, async_add_entities):
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Daikin climate based on config_entry."""
-    coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
-    daikin_api = hass.data[DAIKIN_DOMAIN][DAIKIN_API]
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
     sensors = []
     supported_management_point_types = {
         "domesticHotWaterTank",
@@ -48,11 +55,15 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         "climateControl",
         "climateControlMainZone",
     }
-    for dev_id, device in hass.data[DAIKIN_DOMAIN][DAIKIN_DEVICES].items():
+    for dev_id, device in config_entry.runtime_data[DAIKIN_DEVICES].items():
         # For each rate limit we provide a sensor
         for name in daikin_api.rate_limits.keys():
             sensors.append(DaikinLimitSensor(hass, device, coordinator, name))
 
+        # For each request statistic we provide an optional sensor
+        for name in daikin_api.metrics.summary().keys():
+            sensors.append(DaikinRequestSensor(hass, device, coordinator, name))
+
         management_points = device.daikin_data.get("managementPoints", [])
         for management_point in management_points:
             management_point_type = management_point["managementPointType"]
@@ -138,6 +149,10 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
                                         sensor = f"{device.name} {management_point_type} {mode} {periodName}"
                                         _LOGGER.info("Proposing sensor '%s'", sensor)
                                         sensors.append(DaikinEnergySensor(device, coordinator, embedded_id, management_point_type, mode, period))
+                                    if SENSOR_PERIOD_DAILY in cdve[mode]:
+                                        # The daily buckets are fine grained enough to estimate the power
+                                        sensors.append(DaikinPowerSensor(device, coordinator, embedded_id, management_point_type, mode))
+                                        sensors.append(DaikinEnergyTotalSensor(device, coordinator, embedded_id, management_point_type, mode))
                                 else:
                                     _LOGGER.info(
                                         "Ignoring consumption data '%s', not a supported operation_mode",
@@ -147,6 +162,22 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     async_add_entities(sensors)
 
 
+def consumption_values(device: DaikinOnectaDevice, embedded_id, operation_mode, period):
+    """Return the electrical consumption data of a management point for an operation mode and period."""
+    for management_point in device.daikin_data["managementPoints"]:
+        if embedded_id == management_point["embeddedId"]:
+            cd = management_point.get("consumptionData")
+            if cd is not None:
+                cdv = cd.get("value")
+                if cdv is not None:
+                    cdve = cdv.get("electrical")
+                    if cdve is not None:
+                        mode = cdve.get(operation_mode)
+                        if mode is not None:
+                            return mode.get(period)
+    return None
+
+
 class DaikinEnergySensor(CoordinatorEntity, SensorEntity):
     """Representation of a power/energy consumption sensor."""
 
@@ -200,35 +231,158 @@ class DaikinEnergySensor(CoordinatorEntity, SensorEntity):
 
     def sensor_value(self):
         energy_value = None
-        for management_point in self._device.daikin_data["managementPoints"]:
-            if self._embedded_id == management_point["embeddedId"]:
-                management_point_type = management_point["managementPointType"]
-                cd = management_point.get("consumptionData")
-                if cd is not None:
-                    # Retrieve the available operationModes, we can only provide consumption data for
-                    # supported operation modes
-                    cdv = cd.get("value")
-                    if cdv is not None:
-                        cdve = cdv.get("electrical")
-                        if cdve is not None:
-                            for mode in cdve:
-                                # Only handle consumptionData for an operation mode supported by this device
-                                if mode == self._operation_mode:
-                                    energy_values = [0 if v is None else v for v in cdve[mode].get(self._period)]
-                                    start_index = 7 if self._period == SENSOR_PERIOD_WEEKLY else 12
-                                    energy_value = round(sum(energy_values[start_index:]), 3)
-                                    _LOGGER.info(
-                                        "Device '%s' has energy value '%s' for mode %s %s period %s",
-                                        self._device.name,
-                                        energy_value,
-                                        management_point_type,
-                                        mode,
-                                        self._period,
-                                    )
+        energy_values = consumption_values(self._device, self._embedded_id, self._operation_mode, self._period)
+        if energy_values is not None:
+            energy_value = current_period_energy(energy_values, self._period)
+            _LOGGER.info(
+                "Device '%s' has energy value '%s' for mode %s %s period %s",
+                self._device.name,
+                energy_value,
+                self._management_point_type,
+                self._operation_mode,
+                self._period,
+            )
 
         return energy_value
 
 
+class DaikinPowerSensor(CoordinatorEntity, SensorEntity):
+    """Representation of the electrical power derived from the daily consumption data."""
+
+    def __init__(
+        self,
+        device: DaikinOnectaDevice,
+        coordinator,
+        embedded_id,
+        management_point_type,
+        operation_mode,
+    ) -> None:
+        super().__init__(coordinator)
+        self._device = device
+        self._embedded_id = embedded_id
+        self._management_point_type = management_point_type
+        self._operation_mode = operation_mode
+        self._estimator = PowerEstimator()
+        mpt = management_point_type[0].upper() + management_point_type[1:]
+        self._attr_name = f"{mpt} {operation_mode.capitalize()} Electrical Power"
+        self._attr_unique_id = f"{self._device.id}_{self._management_point_type}_electrical_power_{self._operation_mode}"
+        self._attr_entity_category = None
+        self._attr_icon = "mdi:flash"
+        self._attr_has_entity_name = True
+        self._attr_device_class = SensorDeviceClass.POWER
+        self._attr_state_class = SensorStateClass.MEASUREMENT
+        self._attr_native_unit_of_measurement = UnitOfPower.WATT
+        self.update_state()
+        _LOGGER.info(
+            "Device '%s:%s' supports sensor '%s'",
+            device.name,
+            self._embedded_id,
+            self._attr_name,
+        )
+
+    def update_state(self) -> None:
+        self._attr_native_value = self.sensor_value()
+        bucket_start = self._estimator.bucket_start
+        self._attr_extra_state_attributes = {"bucket_start": bucket_start.isoformat() if bucket_start is not None else None}
+        self._attr_device_info = self._device.device_info()
+
+    @property
+    def available(self) -> bool:
+        return self._device.available
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self.update_state()
+        self.async_write_ha_state()
+
+    def sensor_value(self):
+        self._estimator.update(
+            self._device.last_data_update, consumption_values(self._device, self._embedded_id, self._operation_mode, SENSOR_PERIOD_DAILY)
+        )
+        return self._estimator.power
+
+
+@dataclass
+class DaikinEnergyTotalExtraStoredData(SensorExtraStoredData):
+    """Extra stored data of the total energy sensor, includes the accumulator state."""
+
+    accumulator: dict
+
+    def as_dict(self):
+        data = super().as_dict()
+        data["accumulator"] = self.accumulator
+        return data
+
+
+class DaikinEnergyTotalSensor(CoordinatorEntity, RestoreSensor):
+    """Representation of the lifetime energy consumption accumulated from the daily consumption data."""
+
+    def __init__(
+        self,
+        device: DaikinOnectaDevice,
+        coordinator,
+        embedded_id,
+        management_point_type,
+        operation_mode,
+    ) -> None:
+        super().__init__(coordinator)
+        self._device = device
+        self._embedded_id = embedded_id
+        self._management_point_type = management_point_type
+        self._operation_mode = operation_mode
+        self._accumulator = EnergyAccumulator()
+        mpt = management_point_type[0].upper() + management_point_type[1:]
+        self._attr_name = f"{mpt} {operation_mode.capitalize()} Total Electrical Consumption"
+        self._attr_unique_id = f"{self._device.id}_{self._management_point_type}_electrical_total_{self._operation_mode}"
+        self._attr_entity_category = None
+        self._attr_icon = "mdi:fire"
+        if operation_mode == "cooling":
+            self._attr_icon = "mdi:snowflake"
+        self._attr_has_entity_name = True
+        self._attr_device_class = SensorDeviceClass.ENERGY
+        self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self._attr_native_unit_of_measurement = UnitOfEnergy.KILO_WATT_HOUR
+        self._attr_device_info = self._device.device_info()
+        _LOGGER.info(
+            "Device '%s:%s' supports sensor '%s'",
+            device.name,
+            self._embedded_id,
+            self._attr_name,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the accumulator before processing the current data."""
+        await super().async_added_to_hass()
+        last_extra_data = await self.async_get_last_extra_data()
+        if last_extra_data is not None:
+            accumulator = last_extra_data.as_dict().get("accumulator")
+            if accumulator is not None:
+                self._accumulator = EnergyAccumulator.from_dict(accumulator)
+        self.update_state()
+
+    def update_state(self) -> None:
+        self._attr_native_value = self.sensor_value()
+        self._attr_extra_state_attributes = {"revisions": self._accumulator.revisions}
+        self._attr_device_info = self._device.device_info()
+
+    @property
+    def available(self) -> bool:
+        return self._device.available
+
+    @property
+    def extra_restore_state_data(self) -> DaikinEnergyTotalExtraStoredData:
+        return DaikinEnergyTotalExtraStoredData(self.native_value, self.native_unit_of_measurement, self._accumulator.as_dict())
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self.update_state()
+        self.async_write_ha_state()
+
+    def sensor_value(self):
+        energy_values = consumption_values(self._device, self._embedded_id, self._operation_mode, SENSOR_PERIOD_DAILY)
+        return self._accumulator.update(self._device.last_data_update, energy_values)
+
+
 class DaikinValueSensor(CoordinatorEntity, SensorEntity):
     def __init__(
         self,
@@ -340,10 +494,56 @@ class DaikinLimitSensor(CoordinatorEntity, SensorEntity):
         self.async_write_ha_state()
 
     def sensor_value(self):
-        daikin_api = self._hass.data[DAIKIN_DOMAIN][DAIKIN_API]
+        daikin_api = self._device.api
         return daikin_api.rate_limits[self._limit_key]
 
     @property
     def device_info(self):
         """Return a device description for device registry."""
         return self._device.device_info()
+
+
+class DaikinRequestSensor(CoordinatorEntity, SensorEntity):
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        device: DaikinOnectaDevice,
+        coordinator,
+        metric_key,
+    ) -> None:
+        _LOGGER.info("Device '%s' RequestSensor '%s'", device.name, metric_key)
+        super().__init__(coordinator)
+        self._hass = hass
+        self._device = device
+        self._metric_key = metric_key
+        self._attr_has_entity_name = True
+        self._attr_icon = "mdi:information-outline"
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+        self._attr_entity_registry_enabled_default = False
+        self._attr_name = f"Requests {self._metric_key}"
+        self._attr_unique_id = f"{self._device.id}_requestsensor_{self._metric_key}"
+        if self._metric_key.startswith("latency") or self._metric_key.startswith("lock_wait"):
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+        else:
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        self.update_state()
+        _LOGGER.info(
+            "Device '%s' supports sensor '%s'",
+            device.name,
+            self._attr_name,
+        )
+
+    def update_state(self) -> None:
+        self._attr_device_info = self._device.device_info()
+        self._attr_native_value = self.sensor_value()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self.update_state()
+        self.async_write_ha_state()
+
+    def sensor_value(self):
+        daikin_api = self._device.api
+        return daikin_api.metrics.summary()[self._metric_key]
@@ -12,9 +12,9 @@ from homeassistant.core import callback
 from homeassistant.helpers.entity import ToggleEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .commands import CommandPriorityEntity
 from .const import COORDINATOR
 from .const import DAIKIN_DEVICES
-from .const import DOMAIN as DAIKIN_DOMAIN
 from .const import ENABLED_DEFAULT
 from .const import ENTITY_CATEGORY
 from .const import VALUE_SENSOR_MAPPING
@@ -25,7 +25,7 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up Daikin switches based on config_entry."""
-    coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
+    coordinator = config_entry.runtime_data[COORDINATOR]
     sensors = []
     supported_management_point_types = {
         "domesticHotWaterTank",
@@ -34,7 +34,7 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
         "climateControlMainZone",
     }
 
-    for dev_id, device in hass.data[DAIKIN_DOMAIN][DAIKIN_DEVICES].items():
+    for dev_id, device in config_entry.runtime_data[DAIKIN_DEVICES].items():
         management_points = device.daikin_data.get("managementPoints", [])
         for management_point in management_points:
             management_point_type = management_point["managementPointType"]
@@ -74,7 +74,7 @@ async def async_setup_entry(hass, config_entry, async_add_entities):
     async_add_entities(sensors)
 
 
-class DaikinSwitch(CoordinatorEntity, ToggleEntity):
+class DaikinSwitch(CoordinatorEntity, CommandPriorityEntity, ToggleEntity):
     def __init__(self, device: DaikinOnectaDevice, coordinator, embedded_id, management_point_type, value) -> None:
         _LOGGER.info("DaikinSwitch '%s' '%s'", management_point_type, value)
         super().__init__(coordinator)
@@ -147,7 +147,7 @@ class DaikinSwitch(CoordinatorEntity, ToggleEntity):
         """Turn the zone on."""
         result = True
         if not self.is_on:
-            result &= await self._device.patch(self._device.id, self._embedded_id, self._value, "", "on")
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, self._value, "", "on")
             if result is False:
                 _LOGGER.warning("Device '%s' problem setting '%s' to on", self._device.name, self._value)
             else:
@@ -162,7 +162,7 @@ class DaikinSwitch(CoordinatorEntity, ToggleEntity):
         """Turn the zone off."""
         result = True
         if self.is_on:
-            result &= await self._device.patch(self._device.id, self._embedded_id, self._value, "", "off")
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, self._value, "", "off")
             if result is False:
                 _LOGGER.warning(
                     "Device '%s' problem setting '%s' to off",
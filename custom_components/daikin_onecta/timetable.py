@@ -0,0 +1,99 @@
+"""Timetable of the polling intervals over the week."""
+import math
+from array import array
+from datetime import datetime
+from datetime import timedelta
+
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+ALL_DAYS = tuple(range(7))
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# A polling window of the options, from its start on the given days the interval in minutes applies
+WINDOW_SCHEMA = vol.Schema(
+    {
+        vol.Required("name"): cv.string,
+        vol.Optional("days", default=list(WEEKDAYS)): vol.All(cv.ensure_list, [vol.In(WEEKDAYS)]),
+        vol.Required("start"): vol.All(cv.string, vol.Match(r"^([01]?\d|2[0-3]):[0-5]\d(:[0-5]\d)?$")),
+        vol.Required("interval"): vol.All(vol.Coerce(int), vol.Range(min=5, max=24 * 60)),
+    }
+)
+WINDOWS_SCHEMA = vol.All(cv.ensure_list, [WINDOW_SCHEMA])
+
+
+def parse_time(value):
+    """Return the minute of the day of a HH:MM[:SS] time, seconds are ignored."""
+    parts = value.split(":")
+    return int(parts[0]) * 60 + int(parts[1])
+
+
+class Timetable:
+    """Polling interval for every minute of the week, compiled from the moments the interval changes.
+
+    A change is a tuple of weekdays (0 is Monday), a start time and the interval in
+    seconds from that moment on. The interval of a minute is the one of the latest
+    change at or before it, wrapping around the week.
+    """
+
+    def __init__(self, changes, default):
+        starts = {}
+        for weekdays, start, interval in changes:
+            for weekday in weekdays:
+                starts[weekday * MINUTES_PER_DAY + parse_time(start)] = interval
+
+        if not starts:
+            starts[0] = default
+        # Segments of the week with one interval, as start minute and interval
+        self.segments = sorted(starts.items())
+        # Index into the segments of every minute of the week
+        self._segment = array("H", bytes(2 * MINUTES_PER_WEEK))
+        for index, (start, _) in enumerate(self.segments):
+            end = self.segments[index + 1][0] if index + 1 < len(self.segments) else MINUTES_PER_WEEK
+            self._segment[start:end] = array("H", [index]) * (end - start)
+        # Minutes before the first change belong to the last segment of the previous week
+        first = self.segments[0][0]
+        self._segment[:first] = array("H", [len(self.segments) - 1]) * first
+
+    @classmethod
+    def from_options(cls, options):
+        """Compile the polling windows of the options, without windows the high and low frequency periods."""
+        if windows := options.get("polling_windows"):
+            return cls(
+                [([WEEKDAYS.index(day) for day in window["days"]], window["start"], window["interval"] * 60) for window in WINDOWS_SCHEMA(windows)],
+                options.get("low_scan_interval", 30) * 60,
+            )
+        return cls(
+            [
+                (ALL_DAYS, options.get("high_scan_start", "07:00:00"), options.get("high_scan_interval", 10) * 60),
+                (ALL_DAYS, options.get("low_scan_start", "22:00:00"), options.get("low_scan_interval", 30) * 60),
+            ],
+            options.get("low_scan_interval", 30) * 60,
+        )
+
+    @staticmethod
+    def minute_of_week(moment: datetime):
+        return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+    def interval(self, moment: datetime):
+        """Return the polling interval in seconds at the moment."""
+        return self.segments[self._segment[self.minute_of_week(moment)]][1]
+
+    def requests_per_day(self):
+        """Return the number of polls on the busiest day of the week."""
+        return max(
+            math.ceil(sum(60 / self.segments[index][1] for index in self._segment[day * MINUTES_PER_DAY : (day + 1) * MINUTES_PER_DAY]))
+            for day in ALL_DAYS
+        )
+
+    def next_boundary(self, moment: datetime):
+        """Return the next moment the interval changes, None when it never changes."""
+        if len({interval for _, interval in self.segments}) < 2:
+            return None
+        minute = self.minute_of_week(moment)
+        index = self._segment[minute]
+        next_start = self.segments[(index + 1) % len(self.segments)][0]
+        minutes = (next_start - minute) % MINUTES_PER_WEEK or MINUTES_PER_WEEK
+        return moment.replace(second=0, microsecond=0) + timedelta(minutes=minutes)
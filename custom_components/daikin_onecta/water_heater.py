@@ -11,17 +11,17 @@ from homeassistant.const import UnitOfTemperature
 from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .commands import CommandPriorityEntity
 from .const import COORDINATOR
 from .const import DAIKIN_DEVICES
-from .const import DOMAIN as DAIKIN_DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up Daikin water tank entities."""
-    coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
-    for dev_id, device in hass.data[DAIKIN_DOMAIN][DAIKIN_DEVICES].items():
+    coordinator = entry.runtime_data[COORDINATOR]
+    for dev_id, device in entry.runtime_data[DAIKIN_DEVICES].items():
         supported_management_point_types = {
             "domesticHotWaterTank",
             "domesticHotWaterFlowThrough",
@@ -40,7 +40,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
                 )
 
 
-class DaikinWaterTank(CoordinatorEntity, WaterHeaterEntity):
+class DaikinWaterTank(CoordinatorEntity, CommandPriorityEntity, WaterHeaterEntity):
     """Representation of a Daikin Water Tank."""
 
     def __init__(self, device, coordinator, management_point_type, embedded_id):
@@ -190,7 +190,8 @@ class DaikinWaterTank(CoordinatorEntity, WaterHeaterEntity):
                 return None
 
         if int(value) != self._attr_target_temperature:
-            res = await self._device.patch(
+            res = await self.async_command(
+                self._device.patch,
                 self._device.id,
                 self._embedded_id,
                 "temperatureControl",
@@ -256,14 +257,15 @@ class DaikinWaterTank(CoordinatorEntity, WaterHeaterEntity):
 
         # Only set the on/off to Daikin when we need to change it
         if on_off_mode != "":
-            result &= await self._device.patch(self._device.id, self._embedded_id, "onOffMode", "", on_off_mode)
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, "onOffMode", "", on_off_mode)
             if result is True:
                 hwtd = self.hotwatertank_data
                 hwtd["onOffMode"]["value"] = on_off_mode
 
         # Only set powerfulMode when it is set and supported by the device
         if (powerful_mode != "") and (STATE_PERFORMANCE in self.operation_list):
-            result &= await self._device.patch(
+            result &= await self.async_command(
+                self._device.patch,
                 self._device.id,
                 self._embedded_id,
                 "powerfulMode",
@@ -291,7 +293,7 @@ class DaikinWaterTank(CoordinatorEntity, WaterHeaterEntity):
         _LOGGER.debug("Device '%s' request to turn on", self._device.name)
         result = True
         if self.current_operation == STATE_OFF:
-            result &= await self._device.patch(self._device.id, self._embedded_id, "onOffMode", "", "on")
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, "onOffMode", "", "on")
             if result is False:
                 _LOGGER.error("Device '%s' problem setting onOffMode to on", self._device.name)
             else:
@@ -312,7 +314,7 @@ class DaikinWaterTank(CoordinatorEntity, WaterHeaterEntity):
         _LOGGER.debug("Device '%s' request to turn off", self._device.name)
         result = True
         if self.current_operation != STATE_OFF:
-            result &= await self._device.patch(self._device.id, self._embedded_id, "onOffMode", "", "off")
+            result &= await self.async_command(self._device.patch, self._device.id, self._embedded_id, "onOffMode", "", "off")
             if result is False:
                 _LOGGER.error("Device '%s' problem setting onOffMode to off", self._device.name)
             else:
@@ -1,6 +1,7 @@
 # """Global fixtures for myenergi integration."""
 from __future__ import annotations
 
+import contextlib
 import json
 from typing import Any
 from unittest.mock import AsyncMock
@@ -41,6 +42,29 @@ async def snapshot_platform_entities(
     fixture_device_json,
 ) -> None:
     """Snapshot entities and their states."""
+    await setup_config_entry(hass, config_entry, load_fixture_json(fixture_device_json))
+
+    entity_entries = er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)
+
+    assert entity_entries
+    for entity_entry in entity_entries:
+        entity_entry == snapshot(name=f"{entity_entry.entity_id}-entry")  # todo add assert back
+        hass.states.get(entity_entry.entity_id) == snapshot(name=f"{entity_entry.entity_id}-state")  # todo add assert back
+
+
+async def setup_config_entry(hass: HomeAssistant, config_entry: MockConfigEntry, devices_json) -> None:
+    """Setup the config entry with the given gateway-devices payload."""
+    with patch_oauth_session():
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=devices_json)
+            assert await hass.config_entries.async_setup(config_entry.entry_id)
+
+        await hass.async_block_till_done()
+
+
+@contextlib.contextmanager
+def patch_oauth_session():
+    """Let the OAuth2 session return a valid access token."""
     with patch(
         "homeassistant.helpers.config_entry_oauth2_flow.async_get_config_entry_implementation",
     ), patch(
@@ -52,18 +76,7 @@ async def snapshot_platform_entities(
         "homeassistant.helpers.config_entry_oauth2_flow.OAuth2Session.token",
         {"access_token": "AAAA"},
     ):
-        with responses.RequestsMock() as rsps:
-            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json(fixture_device_json))
-            assert await hass.config_entries.async_setup(config_entry.entry_id)
-
-        await hass.async_block_till_done()
-
-    entity_entries = er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)
-
-    assert entity_entries
-    for entity_entry in entity_entries:
-        entity_entry == snapshot(name=f"{entity_entry.entity_id}-entry")  # todo add assert back
-        hass.states.get(entity_entry.entity_id) == snapshot(name=f"{entity_entry.entity_id}-state")  # todo add assert back
+        yield
 
 
 @pytest.fixture(name="config_entry")
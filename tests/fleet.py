@@ -0,0 +1,79 @@
+"""Generator of synthetic Daikin accounts composed from the test fixtures."""
+import copy
+import random
+import uuid
+
+from .conftest import load_fixture_json
+
+# Fixtures the fleet devices are copied from
+FLEET_TEMPLATES = ["altherma", "climate_floorheatingairflow", "ururu"]
+
+# Characteristics which are identifiers or configuration instead of measured values
+FIXED_VALUES = {"macAddress", "serialNumber", "firmwareVersion", "modelInfo", "name", "ipAddress", "ssid", "errorCode"}
+
+
+def randomize_value(rng, characteristic) -> None:
+    """Randomize a numeric value within its allowed range."""
+    value = characteristic["value"]
+    minimum = characteristic.get("minValue")
+    maximum = characteristic.get("maxValue")
+    step = characteristic.get("stepValue")
+    if minimum is not None and maximum is not None and step:
+        steps = int((maximum - minimum) / step)
+        characteristic["value"] = minimum + rng.randint(0, steps) * step
+    elif isinstance(value, float):
+        characteristic["value"] = round(value * rng.uniform(0.5, 1.5), 2)
+    else:
+        characteristic["value"] = max(value + rng.randint(-3, 3), 0)
+
+
+def randomize_consumption(rng, data) -> None:
+    """Randomize the consumption buckets keeping the missing values."""
+    if isinstance(data, dict):
+        for value in data.values():
+            randomize_consumption(rng, value)
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                data[index] = round(rng.uniform(0, 2), 1)
+
+
+def randomize(rng, data) -> None:
+    """Randomize the numeric values of a device description."""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == "consumptionData":
+                randomize_consumption(rng, value)
+            elif key in FIXED_VALUES:
+                continue
+            elif isinstance(value, dict) and isinstance(value.get("value"), (int, float)) and not isinstance(value.get("value"), bool):
+                randomize_value(rng, value)
+            else:
+                randomize(rng, value)
+    elif isinstance(data, list):
+        for value in data:
+            randomize(rng, value)
+
+
+def generate_fleet(count, seed=0, templates=FLEET_TEMPLATES, tick=0):
+    """Return the gateway-devices payload of an account with count devices.
+
+    The devices are copied round robin from the templates, each copy gets a unique
+    id, name and mac address and randomized values. The same seed gives the same fleet,
+    another tick gives the same devices with other values like a later poll.
+    """
+    rng = random.Random(seed)
+    values_rng = random.Random(f"{seed}/{tick}")
+    template_devices = [device for template in templates for device in load_fixture_json(template)]
+    fleet = []
+    for index in range(count):
+        device = copy.deepcopy(template_devices[index % len(template_devices)])
+        device["id"] = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        randomize(values_rng, device["managementPoints"])
+        for management_point in device["managementPoints"]:
+            if management_point["managementPointType"] == "climateControl":
+                management_point["name"]["value"] = f"Fleet {index:04d}"
+            if "macAddress" in management_point:
+                management_point["macAddress"]["value"] = ":".join(f"{rng.getrandbits(8):02x}" for _ in range(6))
+        fleet.append(device)
+    return fleet
@@ -0,0 +1,225 @@
+"""In-process simulator of the Daikin Onecta cloud.
+
+The simulator serves the gateway-devices endpoints on localhost so the real
+requests path of DaikinApi can be tested. Writes are applied to the simulator
+state, responses contain the rate limit headers of the Daikin cloud and latency,
+jitter, errors and stale reads after a write can be configured. All randomness
+comes from a seeded generator so a test run is deterministic.
+"""
+import asyncio
+import contextlib
+import copy
+import random
+import time
+from unittest.mock import patch
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Rate limits of the Daikin cloud
+MINUTE_LIMIT = 20
+DAY_LIMIT = 200
+
+
+class OnectaSimulator:
+    """Simulated Daikin cloud with the state of the given devices."""
+
+    def __init__(
+        self,
+        devices,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=500,
+        stale_read_window=0.0,
+        minute_limit=MINUTE_LIMIT,
+        day_limit=DAY_LIMIT,
+        seed=0,
+        clock=time.monotonic,
+    ):
+        self.devices = {device["id"]: copy.deepcopy(device) for device in devices}
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stale_read_window = stale_read_window
+        self.minute_limit = minute_limit
+        self.day_limit = day_limit
+        self.clock = clock
+        self.rng = random.Random(seed)
+
+        # Log of all requests as (method, path, status)
+        self.requests = []
+        self._minute_start = None
+        self._minute_count = 0
+        self._day_start = None
+        self._day_count = 0
+        # Device data returned by a GET until the write becomes visible, per device id
+        self._stale = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/v1/gateway-devices", self._get_devices)
+        app.router.add_get("/v1/gateway-devices/{device_id}", self._get_device)
+        app.router.add_patch(
+            "/v1/gateway-devices/{device_id}/management-points/{embedded_id}/characteristics/{characteristic}",
+            self._patch_characteristic,
+        )
+        app.router.add_post("/v1/gateway-devices/{device_id}/management-points/{embedded_id}/{action}", self._post_action)
+        app.router.add_put("/v1/gateway-devices/{device_id}/management-points/{embedded_id}/schedule/{mode}/current", self._put_schedule)
+        return app
+
+    @contextlib.asynccontextmanager
+    async def serve(self):
+        """Serve the simulator on localhost and let DaikinApi use it."""
+        server = TestServer(self.app(), host="127.0.0.1")
+        await server.start_server()
+        try:
+            with patch("custom_components.daikin_onecta.daikin_api.DAIKIN_API_URL", str(server.make_url("")).rstrip("/")):
+                yield self
+        finally:
+            await server.close()
+
+    def count(self, method=None, status=None):
+        """Return the number of handled requests with the given method and status."""
+        return len([r for r in self.requests if (method is None or r[0] == method) and (status is None or r[2] == status)])
+
+    def management_point(self, device_id, embedded_id):
+        for management_point in self.devices[device_id]["managementPoints"]:
+            if management_point["embeddedId"] == embedded_id:
+                return management_point
+        raise web.HTTPNotFound()
+
+    def _rate_limit_headers(self, now):
+        return {
+            "X-RateLimit-Limit-minute": str(self.minute_limit),
+            "X-RateLimit-Remaining-minute": str(max(self.minute_limit - self._minute_count, 0)),
+            "X-RateLimit-Limit-day": str(self.day_limit),
+            "X-RateLimit-Remaining-day": str(max(self.day_limit - self._day_count, 0)),
+            "ratelimit-reset": str(int(self._minute_start + 60 - now)),
+        }
+
+    async def _handle(self, request, handler):
+        """Apply latency, authentication, rate limits and error injection around a handler."""
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        now = self.clock()
+        if self._minute_start is None or now - self._minute_start >= 60:
+            self._minute_start = now
+            self._minute_count = 0
+        if self._day_start is None or now - self._day_start >= 86400:
+            self._day_start = now
+            self._day_count = 0
+
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            response = web.Response(status=401)
+        elif self._minute_count >= self.minute_limit or self._day_count >= self.day_limit:
+            if self._day_count >= self.day_limit:
+                retry_after = self._day_start + 86400 - now
+            else:
+                retry_after = self._minute_start + 60 - now
+            response = web.Response(status=429, headers={**self._rate_limit_headers(now), "retry-after": str(int(retry_after) + 1)})
+        else:
+            self._minute_count += 1
+            self._day_count += 1
+            if self.error_rate and self.rng.random() < self.error_rate:
+                response = web.Response(status=self.error_status, text="Simulated error")
+            else:
+                try:
+                    response = await handler(request, now)
+                except web.HTTPException as ex:
+                    response = web.Response(status=ex.status, text=ex.text)
+            response.headers.update(self._rate_limit_headers(now))
+
+        self.requests.append((request.method, request.path, response.status))
+        return response
+
+    def _visible_device(self, device_id, now):
+        stale = self._stale.get(device_id)
+        if stale is not None:
+            if now < stale[0]:
+                return stale[1]
+            del self._stale[device_id]
+        return self.devices[device_id]
+
+    def _before_write(self, device_id, now) -> None:
+        """Keep the data from before the first write for the stale read window."""
+        if self.stale_read_window > 0 and device_id not in self._stale:
+            self._stale[device_id] = (now + self.stale_read_window, copy.deepcopy(self.devices[device_id]))
+
+    async def _get_devices(self, request):
+        async def handler(request, now):
+            return web.json_response([self._visible_device(device_id, now) for device_id in self.devices])
+
+        return await self._handle(request, handler)
+
+    async def _get_device(self, request):
+        async def handler(request, now):
+            device_id = request.match_info["device_id"]
+            if device_id not in self.devices:
+                raise web.HTTPNotFound()
+            return web.json_response(self._visible_device(device_id, now))
+
+        return await self._handle(request, handler)
+
+    async def _patch_characteristic(self, request):
+        async def handler(request, now):
+            device_id = request.match_info["device_id"]
+            if device_id not in self.devices:
+                raise web.HTTPNotFound()
+            body = await request.json()
+            characteristic = self.management_point(device_id, request.match_info["embedded_id"]).get(request.match_info["characteristic"])
+            if characteristic is None:
+                raise web.HTTPNotFound()
+
+            # The path points to the characteristic in the value of the management point characteristic
+            for key in body.get("path", "").strip("/").split("/"):
+                if key:
+                    characteristic = characteristic.get("value", characteristic).get(key)
+                    if characteristic is None:
+                        raise web.HTTPBadRequest(text=f"Invalid path {body['path']}")
+            if not characteristic.get("settable", False):
+                raise web.HTTPBadRequest(text="Characteristic not settable")
+            value = body["value"]
+            if "minValue" in characteristic and not characteristic["minValue"] <= value <= characteristic["maxValue"]:
+                raise web.HTTPBadRequest(text=f"Value {value} out of range")
+            if "values" in characteristic and value not in characteristic["values"]:
+                raise web.HTTPBadRequest(text=f"Invalid value {value}")
+
+            self._before_write(device_id, now)
+            characteristic["value"] = value
+            return web.Response(status=204)
+
+        return await self._handle(request, handler)
+
+    async def _post_action(self, request):
+        async def handler(request, now):
+            device_id = request.match_info["device_id"]
+            if device_id not in self.devices or request.match_info["action"] != "holiday-mode":
+                raise web.HTTPNotFound()
+            body = await request.json()
+            management_point = self.management_point(device_id, request.match_info["embedded_id"])
+            self._before_write(device_id, now)
+            management_point["holidayMode"]["value"].update(body)
+            return web.Response(status=204)
+
+        return await self._handle(request, handler)
+
+    async def _put_schedule(self, request):
+        async def handler(request, now):
+            device_id = request.match_info["device_id"]
+            if device_id not in self.devices:
+                raise web.HTTPNotFound()
+            body = await request.json()
+            management_point = self.management_point(device_id, request.match_info["embedded_id"])
+            mode = management_point["schedule"]["value"]["modes"].get(request.match_info["mode"])
+            if mode is None:
+                raise web.HTTPNotFound()
+            self._before_write(device_id, now)
+            mode["currentSchedule"]["value"] = body["scheduleId"]
+            mode["enabled"]["value"] = body["enabled"]
+            return web.Response(status=204)
+
+        return await self._handle(request, handler)
@@ -0,0 +1,137 @@
+"""Test daikin_onecta adaptive polling."""
+import copy
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.adaptive import budget_interval
+from custom_components.daikin_onecta.adaptive import ChangeTracker
+from custom_components.daikin_onecta.adaptive import MAX_FACTOR
+from custom_components.daikin_onecta.adaptive import MIN_INTERVAL
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+
+
+def set_tank_temperature(devices_json, temperature):
+    """Change the tank temperature of the Altherma in the fixture."""
+    for dev_data in devices_json:
+        for management_point in dev_data["managementPoints"]:
+            if management_point["embeddedId"] == "domesticHotWaterTank":
+                management_point["sensoryData"]["value"]["tankTemperature"]["value"] = temperature
+
+
+def test_change_tracker() -> None:
+    """Test the interval follows the observed change rates within its bounds."""
+    tracker = ChangeTracker()
+    devices_json = load_fixture_json("altherma")
+
+    # Until enough polls are observed the configured interval is used
+    tracker.record(devices_json, now=0)
+    tracker.record(devices_json, now=600)
+    assert tracker.interval(600, 300) == 600
+
+    # Nothing changes, poll slower
+    for poll in range(2, 6):
+        tracker.record_unchanged(now=poll * 600)
+    assert tracker.interval(600, 300) == 600 * MAX_FACTOR
+
+    # The tank heats up and changes every poll, poll faster than configured but not faster than the budget allows
+    now = 6 * 600
+    intervals = []
+    for temperature in range(40, 50):
+        devices_json = copy.deepcopy(devices_json)
+        set_tank_temperature(devices_json, temperature)
+        tracker.record(devices_json, now=now)
+        intervals.append(tracker.interval(600, 300))
+        now += intervals[-1]
+    assert intervals == sorted(intervals, reverse=True)
+    assert intervals[-1] == 300
+    assert tracker.interval(600, 900) == 900
+
+    diagnostics = tracker.as_dict()
+    assert diagnostics["observations"] == 15
+    assert next(iter(diagnostics["changes_per_hour"])) == "1ece521b-5401-4a42-acce-6f76fba246aa/domesticHotWaterTank"
+
+
+def test_change_tracker_single_device() -> None:
+    """Test a poll of one device only observes the management points of that device."""
+    tracker = ChangeTracker()
+    devices_json = load_fixture_json("altherma")
+    tracker.record(devices_json, now=0)
+
+    changed = copy.deepcopy(devices_json)
+    set_tank_temperature(changed, 40)
+    altherma = [dev_data for dev_data in changed if dev_data["id"] == "1ece521b-5401-4a42-acce-6f76fba246aa"]
+    tracker.record(altherma, now=60)
+    tracker.record_unchanged(now=120, device_id="1ece521b-5401-4a42-acce-6f76fba246aa")
+    # The full poll observes the other devices over the whole time since the first poll
+    tracker.record(changed, now=600)
+
+    # The other devices are observed once without change, like by a single full poll
+    unchanged = ChangeTracker()
+    unchanged.record(devices_json, now=0)
+    unchanged.record_unchanged(now=600)
+    unchanged_rate = unchanged.as_dict()["changes_per_hour"]["32db6075-b739-4026-b661-127009254b42/climateControl"]
+
+    changes = tracker.as_dict()["changes_per_hour"]
+    assert changes["1ece521b-5401-4a42-acce-6f76fba246aa/domesticHotWaterTank"] > unchanged_rate
+    assert all(rate == unchanged_rate for key, rate in changes.items() if not key.startswith("1ece521b"))
+    assert tracker.as_dict()["observations"] == 3
+
+
+def test_budget_interval() -> None:
+    """Test the shortest interval the daily rate limit allows."""
+    assert budget_interval(0) is None
+    assert budget_interval(200) == 540
+    assert budget_interval(100000) == MIN_INTERVAL
+
+
+async def test_adaptive_interval(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the coordinator polls faster than configured when the data changes at every poll."""
+    hass.config_entries.async_update_entry(config_entry, options={"adaptive_scan": True, "high_scan_interval": 10, "low_scan_interval": 10})
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    base = timedelta(minutes=10)
+    assert coordinator.update_interval == base
+    devices_json = load_fixture_json("altherma")
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ), patch("custom_components.daikin_onecta.coordinator.MIN_REFRESH_SPACING", 0), patch(
+        "custom_components.daikin_onecta.adaptive.time"
+    ) as adaptive_time:
+        # The polls are observed at the moments they would have been done
+        clock = adaptive_time.monotonic
+        clock.return_value = time.monotonic()
+        for temperature in range(40, 50):
+            devices_json = copy.deepcopy(devices_json)
+            set_tank_temperature(devices_json, temperature)
+            clock.return_value += coordinator.update_interval.total_seconds()
+            with responses.RequestsMock() as rsps:
+                rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=devices_json, headers={"X-RateLimit-Limit-day": "2000"})
+                await coordinator.async_refresh()
+                await hass.async_block_till_done()
+
+    # Down to the shortest interval the daily rate limit allows
+    assert coordinator.update_interval < base
+    assert coordinator.update_interval == timedelta(seconds=budget_interval(2000))
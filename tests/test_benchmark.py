@@ -0,0 +1,183 @@
+"""Benchmarks of the daikin_onecta hot paths using the fixture payloads.
+
+The benchmarks run as normal tests (one round) with the default options, to
+compare a change with the current code on the same machine run:
+
+    pytest tests/test_benchmark.py --benchmark-enable --benchmark-save=base
+    pytest tests/test_benchmark.py --benchmark-enable --benchmark-compare --benchmark-compare-fail=mean:25%
+"""
+import asyncio
+import copy
+import functools
+import json
+import subprocess
+import sys
+from unittest.mock import AsyncMock
+
+import homeassistant.helpers.entity_registry as er
+import pytest
+import responses
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.const import DAIKIN_DEVICES
+from custom_components.daikin_onecta.device import DaikinOnectaDevice
+
+FIXTURES = [
+    "altherma",
+    "altherma3m",
+    "altherma_boost",
+    "climate_fixedfanmode",
+    "climate_floorheatingairflow",
+    "dry",
+    "dry2",
+    "fanmode",
+    "holidaymode",
+    "homehub",
+    "mc80z",
+    "offlinedevice",
+    "schedule",
+    "ururu",
+]
+
+
+# Imports the integration in a fresh interpreter after the Home Assistant modules it shares
+# with other integrations, prints the import time of the integration itself
+IMPORT_SCRIPT = """
+import time
+import homeassistant.helpers.config_entry_oauth2_flow
+import homeassistant.helpers.update_coordinator
+start = time.perf_counter()
+import custom_components.daikin_onecta
+print(time.perf_counter() - start)
+"""
+
+
+def load_fixture_text(name):
+    with open(f"tests/fixtures/{name}.json") as json_file:
+        return json_file.read()
+
+
+def test_benchmark_import(benchmark) -> None:
+    """Benchmark importing the integration, the platforms are imported when they are set up."""
+
+    def import_integration():
+        return float(subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, text=True, check=True).stdout)
+
+    seconds = benchmark.pedantic(import_integration, rounds=1, iterations=1)
+    benchmark.extra_info["import_ms"] = round(seconds * 1000, 3)
+
+
+def test_lazy_imports() -> None:
+    """Test the modules of the services and of the disabled diagnostics options aren't imported with the integration."""
+    script = "import sys, custom_components.daikin_onecta; print(' '.join(sys.modules))"
+    modules = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout.split()
+    for module in ("bulk", "refresh", "capture", "profiler"):
+        assert f"custom_components.daikin_onecta.{module}" not in modules
+
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_benchmark_json_decode(benchmark, fixture) -> None:
+    """Benchmark decoding the gateway-devices payload."""
+    text = load_fixture_text(fixture)
+    result = benchmark(json.loads, text)
+    assert result
+
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_benchmark_device_construction(benchmark, fixture) -> None:
+    """Benchmark creating the devices of the payload."""
+    data = load_fixture_json(fixture)
+    devices = benchmark(lambda: [DaikinOnectaDevice(dev_data, None) for dev_data in data])
+    assert len(devices) == len(data)
+
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_benchmark_merge_json(benchmark, fixture) -> None:
+    """Benchmark merging a refreshed payload into the existing devices."""
+    data = load_fixture_json(fixture)
+    devices = [DaikinOnectaDevice(copy.deepcopy(dev_data), None) for dev_data in data]
+
+    def merge():
+        for device, dev_data in zip(devices, data):
+            device.setJsonData(dev_data)
+
+    benchmark(merge)
+    assert devices[0].daikin_data == data[0]
+
+
+def run_in_loop(hass, target):
+    """Run the coroutine function on the event loop and wait for its result, called from a worker thread."""
+    return asyncio.run_coroutine_threadsafe(target(), hass.loop).result()
+
+
+@pytest.mark.parametrize("fixture", ["altherma", "mc80z", "homehub"])
+async def test_benchmark_platform_setup(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    entity_registry: er.EntityRegistry,
+    benchmark,
+    fixture,
+) -> None:
+    """Benchmark the config entry setup with all its platforms, the entry is unloaded before every round."""
+
+    async def setup():
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+
+    async def unload():
+        if config_entry.state is ConfigEntryState.LOADED:
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
+            await hass.async_block_till_done()
+
+    with patch_oauth_session(), responses.RequestsMock() as rsps:
+        rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json(fixture))
+        # The benchmark runs in a worker thread so that the setup can run on the event loop
+        await hass.async_add_executor_job(
+            functools.partial(
+                benchmark.pedantic,
+                run_in_loop,
+                args=(hass, setup),
+                setup=functools.partial(run_in_loop, hass, unload),
+                rounds=5,
+                warmup_rounds=1,
+            )
+        )
+
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)
+
+
+@pytest.mark.parametrize("fixture", ["altherma", "mc80z", "homehub"])
+async def test_benchmark_coordinator_update(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    benchmark,
+    fixture,
+) -> None:
+    """Benchmark merging the payload and updating all attached entities."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, fixture)
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    devices = config_entry.runtime_data[DAIKIN_DEVICES]
+    data = load_fixture_json(fixture)
+
+    def update():
+        for dev_data in data:
+            devices[dev_data["id"]].setJsonData(dev_data)
+        coordinator.async_update_listeners()
+
+    benchmark(update)
+    await hass.async_block_till_done()
@@ -0,0 +1,130 @@
+"""Test daikin_onecta bulk_set service."""
+import re
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.device_registry as dr
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.bulk import characteristic_value
+from custom_components.daikin_onecta.bulk import find_characteristic
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.const import DAIKIN_DEVICES
+from custom_components.daikin_onecta.const import DOMAIN as DAIKIN_DOMAIN
+
+
+def test_characteristic_value() -> None:
+    """Test finding the value of a characteristic by its path."""
+    characteristic = {
+        "settable": True,
+        "value": {"operationModes": {"heating": {"setpoints": {"roomTemperature": {"value": 21, "settable": True}}}}},
+    }
+    assert characteristic_value(characteristic, "/operationModes/heating/setpoints/roomTemperature")["value"] == 21
+    assert characteristic_value(characteristic, "/operationModes/cooling/setpoints/roomTemperature") is None
+    assert characteristic_value({"value": "on"}, "")["value"] == "on"
+
+
+async def test_bulk_set(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    device_registry: dr.DeviceRegistry,
+) -> None:
+    """Test the bulk set skips unchanged devices and refuses the writes the rate limit doesn't allow before the timeout."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
+    daikin_api.rate_limits["minute"] = 20
+    daikin_api.rate_limits["remaining_minutes"] = 3
+    daikin_api.rate_limits["ratelimit_reset"] = 30
+    device_ids = [device.id for device in dr.async_entries_for_config_entry(device_registry, config_entry.entry_id)]
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), responses.RequestsMock() as rsps:
+        rsps.patch(re.compile(DAIKIN_API_URL + "/v1/gateway-devices/.*/characteristics/onOffMode"), status=204)
+        response = await hass.services.async_call(
+            DAIKIN_DOMAIN,
+            "bulk_set",
+            {
+                "device_id": device_ids,
+                "changes": [
+                    {"management_point": "climateControl", "characteristic": "onOffMode", "value": "on"},
+                    {"management_point": "domesticHotWaterTank", "characteristic": "onOffMode", "value": "on"},
+                ],
+                "max_concurrency": 2,
+                "timeout": 20,
+            },
+            blocking=True,
+            return_response=True,
+        )
+        await hass.async_block_till_done()
+        assert len(rsps.calls) == 3
+
+    assert response["summary"] == {"set": 3, "rate_limited": 2, "unchanged": 1, "unsupported": 4}
+    assert response["devices"]["1ece521b-5401-4a42-acce-6f76fba246aa"]["name"] == "Altherma"
+
+    # The cached data of the devices which were set is updated
+    devices = config_entry.runtime_data[DAIKIN_DEVICES]
+    turned_on = [
+        dev_id
+        for dev_id, result in response["devices"].items()
+        if result["results"][0]["result"] == "set" and find_characteristic(devices[dev_id], "climateControl", "onOffMode")[1]["value"] == "on"
+    ]
+    assert len(turned_on) == 3
+
+
+async def test_bulk_set_next_window(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    device_registry: dr.DeviceRegistry,
+) -> None:
+    """Test the bulk set waits for the next minute window within the timeout."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
+    daikin_api.rate_limits["minute"] = 20
+    daikin_api.rate_limits["remaining_minutes"] = 3
+    daikin_api.rate_limits["ratelimit_reset"] = 1
+    device_ids = [device.id for device in dr.async_entries_for_config_entry(device_registry, config_entry.entry_id)]
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), responses.RequestsMock() as rsps:
+        rsps.patch(
+            re.compile(DAIKIN_API_URL + "/v1/gateway-devices/.*/characteristics/onOffMode"),
+            status=204,
+            headers={"X-RateLimit-Limit-minute": "20", "X-RateLimit-Remaining-minute": "0", "ratelimit-reset": "1"},
+        )
+        response = await hass.services.async_call(
+            DAIKIN_DOMAIN,
+            "bulk_set",
+            {
+                "device_id": device_ids,
+                "changes": [
+                    {"management_point": "climateControl", "characteristic": "onOffMode", "value": "on"},
+                    {"management_point": "domesticHotWaterTank", "characteristic": "onOffMode", "value": "on"},
+                ],
+                "max_concurrency": 2,
+            },
+            blocking=True,
+            return_response=True,
+        )
+        await hass.async_block_till_done()
+        assert len(rsps.calls) == 5
+
+    assert response["summary"] == {"set": 5, "unchanged": 1, "unsupported": 4}
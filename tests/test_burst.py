@@ -0,0 +1,127 @@
+"""Test daikin_onecta burst polling."""
+import copy
+import json
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.components.water_heater import ATTR_OPERATION_MODE
+from homeassistant.components.water_heater import DOMAIN as WATER_HEATER_DOMAIN
+from homeassistant.components.water_heater import SERVICE_SET_OPERATION_MODE
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import Platform
+from homeassistant.const import STATE_OFF
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.burst import BURST_DELAYS
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+
+ALTHERMA = "1ece521b-5401-4a42-acce-6f76fba246aa"
+
+
+def altherma_data(tank_temperature, on_off_mode="off"):
+    """Return the data of the Altherma with the tank off, or the given mode, at the given temperature."""
+    dev_data = copy.deepcopy(next(dev_data for dev_data in load_fixture_json("altherma") if dev_data["id"] == ALTHERMA))
+    for management_point in dev_data["managementPoints"]:
+        if management_point["embeddedId"] == "domesticHotWaterTank":
+            management_point["onOffMode"]["value"] = on_off_mode
+            management_point["sensoryData"]["value"]["tankTemperature"]["value"] = tank_temperature
+    return dev_data
+
+
+async def test_burst_after_command(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test a command starts a burst of polls of its device which then stops."""
+    hass.config_entries.async_update_entry(config_entry, options={"burst_scan": True})
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    tank_temperature = iter(range(40, 50))
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch("custom_components.daikin_onecta.coordinator.MIN_REFRESH_SPACING", 0), responses.RequestsMock() as rsps:
+        rsps.patch(
+            DAIKIN_API_URL + f"/v1/gateway-devices/{ALTHERMA}/management-points/domesticHotWaterTank/characteristics/onOffMode",
+            status=204,
+        )
+        rsps.add_callback(
+            responses.GET,
+            DAIKIN_API_URL + f"/v1/gateway-devices/{ALTHERMA}",
+            callback=lambda request: (200, {}, json.dumps(altherma_data(next(tank_temperature)))),
+        )
+        await hass.services.async_call(
+            WATER_HEATER_DOMAIN,
+            SERVICE_SET_OPERATION_MODE,
+            {ATTR_ENTITY_ID: "water_heater.altherma", ATTR_OPERATION_MODE: STATE_OFF},
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+        assert coordinator.burst.as_dict()["active"] == [ALTHERMA]
+
+        now = dt_util.utcnow()
+        for polls, delay in enumerate(BURST_DELAYS, start=1):
+            now += timedelta(seconds=delay + 1)
+            async_fire_time_changed(hass, now)
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 1 + polls
+
+        assert hass.states.get("water_heater.altherma").attributes["current_temperature"] == 42
+        assert coordinator.burst.as_dict() == {"bursts": 1, "polls": 3, "skipped": 0, "active": []}
+
+
+async def test_burst_restarts_on_mode_change(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test a burst poll is merged like a regular poll, a changed mode restarts the burst and the change is learned."""
+    hass.config_entries.async_update_entry(config_entry, options={"burst_scan": True})
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    coordinator = config_entry.runtime_data[COORDINATOR]
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch("custom_components.daikin_onecta.coordinator.MIN_REFRESH_SPACING", 0), responses.RequestsMock() as rsps:
+        rsps.patch(
+            DAIKIN_API_URL + f"/v1/gateway-devices/{ALTHERMA}/management-points/domesticHotWaterTank/characteristics/onOffMode",
+            status=204,
+        )
+        # The tank didn't take the command and is still heating
+        rsps.get(DAIKIN_API_URL + f"/v1/gateway-devices/{ALTHERMA}", status=200, json=altherma_data(45, "on"))
+        await hass.services.async_call(
+            WATER_HEATER_DOMAIN,
+            SERVICE_SET_OPERATION_MODE,
+            {ATTR_ENTITY_ID: "water_heater.altherma", ATTR_OPERATION_MODE: STATE_OFF},
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+        assert hass.states.get("water_heater.altherma").state == STATE_OFF
+
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=BURST_DELAYS[0] + 1))
+        await hass.async_block_till_done()
+        assert len(rsps.calls) == 2
+
+    assert hass.states.get("water_heater.altherma").state != STATE_OFF
+    assert coordinator.burst.as_dict() == {"bursts": 2, "polls": 1, "skipped": 0, "active": [ALTHERMA]}
+    change_rates = coordinator.change_tracker.as_dict()
+    assert change_rates["observations"] == 1
+    assert change_rates["changes_per_hour"][f"{ALTHERMA}/domesticHotWaterTank"] > 0
+    coordinator.burst.async_cancel()
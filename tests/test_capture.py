@@ -0,0 +1,151 @@
+"""Test daikin_onecta record and replay of the cloud requests."""
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import pytest
+import responses
+from homeassistant.components.water_heater import ATTR_TEMPERATURE
+from homeassistant.components.water_heater import DOMAIN as WATER_HEATER_DOMAIN
+from homeassistant.components.water_heater import SERVICE_SET_TEMPERATURE
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.capture import CAPTURE_FILE
+from custom_components.daikin_onecta.capture import load_capture
+from custom_components.daikin_onecta.capture import ReplayTransport
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+
+
+async def replay_capture(hass: HomeAssistant, config_entry: MockConfigEntry, transport: ReplayTransport):
+    """Setup the config entry against the recorded traffic and refresh at each recorded GET."""
+    state_writes = []
+    hass.bus.async_listen(EVENT_STATE_CHANGED, state_writes.append)
+    polls = [entry for entry in transport.schedule() if entry[1:] == ("GET", "/v1/gateway-devices")]
+    loop = asyncio.get_running_loop()
+
+    cpu_start = time.process_time()
+    with patch("custom_components.daikin_onecta.scheduler.requests.Session.request", transport), patch_oauth_session(), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        assert await hass.config_entries.async_setup(config_entry.entry_id)
+        await hass.async_block_till_done()
+        coordinator = config_entry.runtime_data[COORDINATOR]
+        replay_start = loop.time() - polls[0][0]
+        for offset, _, _ in polls[1:]:
+            # Refresh at the recorded moments, scaled with the speed of the transport
+            await asyncio.sleep(max(0, replay_start + offset - loop.time()))
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    return {
+        "cpu_seconds": time.process_time() - cpu_start,
+        "requests": config_entry.runtime_data[DAIKIN_API].metrics.requests,
+        "state_writes": len(state_writes),
+    }
+
+
+async def test_record_and_replay(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    tmp_path,
+) -> None:
+    """Test recording the requests and replaying them."""
+    hass.config.config_dir = str(tmp_path)
+    hass.config_entries.async_update_entry(config_entry, options={"capture": True})
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.patch(
+                DAIKIN_API_URL
+                + "/v1/gateway-devices/1ece521b-5401-4a42-acce-6f76fba246aa/management-points/domesticHotWaterTank/characteristics/temperatureControl",
+                status=204,
+                headers={"X-RateLimit-Remaining-minute": "18", "Authorization": "secret"},
+            )
+            await hass.services.async_call(
+                WATER_HEATER_DOMAIN,
+                SERVICE_SET_TEMPERATURE,
+                {ATTR_ENTITY_ID: "water_heater.altherma", ATTR_TEMPERATURE: 58},
+                blocking=True,
+            )
+            await hass.async_block_till_done()
+
+    # Each account records to its own file
+    capture_path = tmp_path / CAPTURE_FILE.format(config_entry.entry_id)
+    assert list(tmp_path.glob("daikin_onecta_capture*")) == [capture_path]
+    capture_text = capture_path.read_text()
+    assert "XXXXXX" not in capture_text
+    assert "AAAA" not in capture_text
+    assert "secret" not in capture_text
+
+    entries = load_capture(capture_path)
+    assert [(entry["method"], entry["url"], entry["status"]) for entry in entries] == [
+        ("GET", "/v1/gateway-devices", 200),
+        (
+            "PATCH",
+            "/v1/gateway-devices/1ece521b-5401-4a42-acce-6f76fba246aa/management-points/domesticHotWaterTank/characteristics/temperatureControl",
+            204,
+        ),
+    ]
+    assert json.loads(entries[0]["body"]) == load_fixture_json("altherma")
+    assert entries[1]["request"] == '{"value": 58, "path": "/operationModes/heating/setpoints/domesticHotWaterTemperature"}'
+    assert entries[1]["headers"] == {"Content-Type": "text/plain", "X-RateLimit-Remaining-minute": "18"}
+
+    # Disabling the capture stops recording
+    hass.config_entries.async_update_entry(config_entry, options={"capture": False})
+    await hass.async_block_till_done()
+    assert config_entry.runtime_data[DAIKIN_API].recorder is None
+
+    # Replay the recorded traffic against a new setup
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    poll = entries[0]
+    transport = ReplayTransport([poll, {**poll, "ts": poll["ts"] + 600}, {**poll, "ts": poll["ts"] + 1200}], DAIKIN_API_URL, speed=0)
+    result = await replay_capture(hass, config_entry, transport)
+    assert result["requests"] == 3
+    assert result["state_writes"] > 0
+    assert hass.states.get("water_heater.altherma").attributes["temperature"] == 48
+
+
+def test_replay_transport() -> None:
+    """Test the replay transport matches the requests on method and endpoint."""
+    entries = [
+        {"ts": 100, "method": "GET", "url": "/v1/gateway-devices", "status": 200, "duration_ms": 10, "headers": {"retry-after": "5"}, "body": "[]"},
+        {"ts": 160, "method": "GET", "url": "/v1/gateway-devices", "status": "failed", "duration_ms": 10, "headers": {}, "body": "timeout"},
+    ]
+    transport = ReplayTransport(entries, DAIKIN_API_URL, speed=100)
+    assert transport.schedule() == [(0, "GET", "/v1/gateway-devices"), (0.6, "GET", "/v1/gateway-devices")]
+
+    replay_start = time.monotonic()
+    response = transport("GET", DAIKIN_API_URL + "/v1/gateway-devices")
+    assert response.status_code == 200
+    assert response.headers["Retry-After"] == "5"
+    assert response.json() == []
+
+    # The recorded failure and a request without recorded response fail
+    with pytest.raises(ConnectionError):
+        transport("GET", DAIKIN_API_URL + "/v1/gateway-devices")
+    # The second request isn't answered before its scaled recorded offset
+    assert time.monotonic() - replay_start >= 0.6
+    with pytest.raises(ConnectionError):
+        transport("GET", DAIKIN_API_URL + "/v1/gateway-devices")
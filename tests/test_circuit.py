@@ -0,0 +1,167 @@
+"""Test daikin_onecta circuit breaker."""
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import pytest
+import responses
+from homeassistant.const import Platform
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
+from .conftest import snapshot_platform_entities
+from .simulator import OnectaSimulator
+from custom_components.daikin_onecta.circuit import CircuitBreaker
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.const import DAIKIN_DEVICES
+from custom_components.daikin_onecta.daikin_api import DaikinApiError
+from custom_components.daikin_onecta.daikin_api import DaikinRateLimitError
+from custom_components.daikin_onecta.deadline import request_deadline
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+
+
+def test_circuit_breaker() -> None:
+    """Test the circuit opens after consecutive failures and closes on success."""
+    breaker = CircuitBreaker(failure_threshold=2)
+    assert not breaker.record_failure("timeout")
+    breaker.record_success()
+    assert not breaker.record_failure("timeout")
+    assert breaker.record_failure("server_error")
+    assert breaker.is_open
+    assert not breaker.record_failure("server_error")
+    assert breaker.as_dict()["opened"] == 1
+    breaker.record_success()
+    assert not breaker.is_open
+
+
+async def test_circuit_breaker_outage(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test an outage of the cloud opens the circuit and a successful probe closes it."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
+    daikin_api.circuit_breaker.failure_threshold = 2
+    daikin_api.retry_policy.base_delay = 0
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=503)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 2
+
+        assert daikin_api.circuit_breaker.is_open
+        assert coordinator.update_interval == timedelta(minutes=15)
+        assert hass.states.get("water_heater.altherma").state == STATE_UNAVAILABLE
+        assert hass.states.get("climate.altherma_room_temperature").state == STATE_UNAVAILABLE
+        diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+        assert diagnostics["circuit_breaker"]["state"] == "open"
+
+        # Writes fail fast without a request
+        device = config_entry.runtime_data[DAIKIN_DEVICES]["1ece521b-5401-4a42-acce-6f76fba246aa"]
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            with pytest.raises(HomeAssistantError):
+                await device.patch(device.id, "domesticHotWaterTank", "onOffMode", "", "on")
+            assert len(rsps.calls) == 0
+
+        # A probe during the outage does one attempt
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=503)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 1
+
+        # The first successful probe closes the circuit
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    assert not daikin_api.circuit_breaker.is_open
+    assert coordinator.update_interval < timedelta(minutes=15)
+    assert hass.states.get("water_heater.altherma").state != STATE_UNAVAILABLE
+
+
+async def test_circuit_breaker_rate_limited(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test rate limiting neither opens nor closes the circuit."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
+    daikin_api.circuit_breaker.failure_threshold = 2
+    daikin_api.retry_policy.delay = lambda attempt, retry_after=0: 0
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ):
+        # Retried 429s with a short retry-after don't count as failures
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=429, headers={"X-RateLimit-Remaining-minute": "0", "retry-after": "5"})
+            with pytest.raises(DaikinRateLimitError):
+                await daikin_api.getCloudDeviceDetails()
+            assert len(rsps.calls) == 3
+
+        assert not daikin_api.circuit_breaker.is_open
+        assert daikin_api.circuit_breaker.failures == 0
+
+        # A 429 with a long retry-after doesn't close an open circuit
+        daikin_api.circuit_breaker.record_failure("server_error")
+        daikin_api.circuit_breaker.record_failure("server_error")
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=429, headers={"X-RateLimit-Remaining-minute": "0", "retry-after": "60"})
+            with pytest.raises(DaikinRateLimitError) as err:
+                await daikin_api.getCloudDeviceDetails()
+            assert err.value.retry_after == 60
+            assert len(rsps.calls) == 1
+
+        assert daikin_api.circuit_breaker.is_open
+
+
+async def test_circuit_breaker_deadline(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    socket_enabled: None,
+) -> None:
+    """Test a request abandoned at the deadline of the caller isn't a failure of the cloud."""
+    simulator = OnectaSimulator(load_fixture_json("altherma"))
+
+    async with simulator.serve():
+        with patch_oauth_session():
+            assert await hass.config_entries.async_setup(config_entry.entry_id)
+            await hass.async_block_till_done()
+
+            daikin_api = config_entry.runtime_data[DAIKIN_API]
+            daikin_api.circuit_breaker.failure_threshold = 1
+            simulator.latency = 0.5
+            with request_deadline(0.2), pytest.raises(DaikinApiError):
+                await daikin_api.getCloudDeviceDetails()
+            assert daikin_api.metrics.timeouts == {"deadline": 1}
+            assert daikin_api.circuit_breaker.failures == 0
+
+            simulator.latency = 0
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
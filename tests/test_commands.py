@@ -0,0 +1,225 @@
+"""Test daikin_onecta command queue and priorities."""
+import asyncio
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.components.automation import DOMAIN as AUTOMATION_DOMAIN
+from homeassistant.components.water_heater import ATTR_TEMPERATURE
+from homeassistant.components.water_heater import DOMAIN as WATER_HEATER_DOMAIN
+from homeassistant.components.water_heater import SERVICE_SET_TEMPERATURE
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import ENTITY_MATCH_ALL
+from homeassistant.const import Platform
+from homeassistant.const import SERVICE_TURN_OFF
+from homeassistant.core import Context
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.common import MockUser
+from syrupy import SnapshotAssertion
+
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.commands import CommandMetrics
+from custom_components.daikin_onecta.commands import CommandQueue
+from custom_components.daikin_onecta.commands import context_priority
+from custom_components.daikin_onecta.commands import current_priority
+from custom_components.daikin_onecta.commands import PRIORITY_AUTOMATION
+from custom_components.daikin_onecta.commands import PRIORITY_BACKGROUND
+from custom_components.daikin_onecta.commands import PRIORITY_INTERACTIVE
+from custom_components.daikin_onecta.commands import PriorityLock
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+
+
+def test_context_priority() -> None:
+    """Test the priority of a service call context."""
+    assert context_priority(Context(user_id="user")) == PRIORITY_INTERACTIVE
+    assert context_priority(Context(parent_id="automation")) == PRIORITY_AUTOMATION
+    # A time triggered automation has no parent context
+    assert context_priority(Context()) == PRIORITY_AUTOMATION
+
+
+async def test_priority_lock() -> None:
+    """Test the lock is handed to the waiter with the highest priority."""
+    lock = PriorityLock()
+    order = []
+
+    async def waiter(name, priority):
+        async with lock.hold(priority):
+            order.append(name)
+
+    await lock.acquire()
+    tasks = [
+        asyncio.create_task(waiter("background", PRIORITY_BACKGROUND)),
+        asyncio.create_task(waiter("automation", PRIORITY_AUTOMATION)),
+        asyncio.create_task(waiter("cancelled", PRIORITY_INTERACTIVE)),
+        asyncio.create_task(waiter("interactive", PRIORITY_INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    tasks[2].cancel()
+    lock.release()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert order == ["interactive", "automation", "background"]
+    assert not lock.locked()
+
+
+async def test_command_queue(hass: HomeAssistant) -> None:
+    """Test commands are sent in order and superseded commands are not sent."""
+    metrics = CommandMetrics()
+    queue = CommandQueue(hass, metrics)
+    sent = []
+    release = asyncio.Event()
+
+    def command(value):
+        async def send(priority):
+            await release.wait()
+            sent.append((value, priority))
+            return value
+
+        return send
+
+    results = [hass.async_create_task(queue.submit("onOffMode", command("on"), PRIORITY_BACKGROUND))]
+    while len(queue):
+        await asyncio.sleep(0)
+    results += [
+        hass.async_create_task(queue.submit("temperature", command(20), PRIORITY_BACKGROUND)),
+        hass.async_create_task(queue.submit("onOffMode", command("off"), PRIORITY_BACKGROUND)),
+        hass.async_create_task(queue.submit("onOffMode", command("on"), PRIORITY_INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    assert len(queue) == 2
+    release.set()
+
+    assert await asyncio.gather(*results) == ["on", 20, "on", "on"]
+    # The first command already started, the superseded off is never sent and the
+    # command before the interactive one inherits its priority
+    assert sent == [("on", PRIORITY_BACKGROUND), (20, PRIORITY_INTERACTIVE), ("on", PRIORITY_INTERACTIVE)]
+    diagnostics = metrics.as_dict()
+    assert diagnostics["submitted"] == {"background": 3, "interactive": 1}
+    assert diagnostics["superseded"] == 1
+    assert diagnostics["queued"] == 0
+    assert diagnostics["max_queued"] == 3
+
+
+async def test_command_queue_supersede_keeps_order(hass: HomeAssistant) -> None:
+    """Test a superseding command takes the place of the queued one and isn't moved behind later commands."""
+    queue = CommandQueue(hass, CommandMetrics())
+    sent = []
+    release = asyncio.Event()
+
+    def command(value):
+        async def send(priority):
+            await release.wait()
+            sent.append(value)
+            return value
+
+        return send
+
+    results = [hass.async_create_task(queue.submit("powerfulMode", command("blocker")))]
+    while len(queue):
+        await asyncio.sleep(0)
+    results += [
+        hass.async_create_task(queue.submit("onOffMode", command("off"))),
+        hass.async_create_task(queue.submit("temperature", command(20))),
+        hass.async_create_task(queue.submit("onOffMode", command("on"))),
+    ]
+    await asyncio.sleep(0)
+    assert len(queue) == 2
+    release.set()
+
+    assert await asyncio.gather(*results) == ["blocker", "on", 20, "on"]
+    assert sent == ["blocker", "on", 20]
+
+
+async def test_service_call_priority(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    hass_admin_user: MockUser,
+) -> None:
+    """Test a command of a user gets the interactive priority."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), responses.RequestsMock() as rsps:
+        rsps.patch(
+            DAIKIN_API_URL
+            + "/v1/gateway-devices/1ece521b-5401-4a42-acce-6f76fba246aa/management-points/domesticHotWaterTank/characteristics/temperatureControl",
+            status=204,
+        )
+        await hass.services.async_call(
+            WATER_HEATER_DOMAIN,
+            SERVICE_SET_TEMPERATURE,
+            {ATTR_ENTITY_ID: "water_heater.altherma", ATTR_TEMPERATURE: 58},
+            blocking=True,
+            context=Context(user_id=hass_admin_user.id),
+        )
+        await hass.async_block_till_done()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["command_queue"]["submitted"] == {"interactive": 1}
+    assert diagnostics["command_queue"]["wait_ms"]["interactive"]["count"] == 1
+
+
+async def test_automation_priority(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    hass_admin_user: MockUser,
+) -> None:
+    """Test a time triggered automation gets the automation priority and a priority doesn't outlive its call."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    assert await async_setup_component(
+        hass,
+        AUTOMATION_DOMAIN,
+        {
+            AUTOMATION_DOMAIN: {
+                "trigger": {"platform": "time_pattern", "hours": "/1"},
+                "action": {
+                    "service": f"{WATER_HEATER_DOMAIN}.{SERVICE_SET_TEMPERATURE}",
+                    "target": {ATTR_ENTITY_ID: "water_heater.altherma"},
+                    "data": {ATTR_TEMPERATURE: 58},
+                },
+            }
+        },
+    )
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), responses.RequestsMock() as rsps:
+        rsps.patch(
+            DAIKIN_API_URL
+            + "/v1/gateway-devices/1ece521b-5401-4a42-acce-6f76fba246aa/management-points/domesticHotWaterTank/characteristics/temperatureControl",
+            status=204,
+        )
+        async_fire_time_changed(hass, dt_util.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        await hass.async_block_till_done()
+        assert len(rsps.calls) == 1
+
+        # The priority of a user's call is only used for its own commands
+        await hass.services.async_call(
+            WATER_HEATER_DOMAIN,
+            SERVICE_SET_TEMPERATURE,
+            {ATTR_ENTITY_ID: "water_heater.altherma", ATTR_TEMPERATURE: 59},
+            blocking=True,
+            context=Context(user_id=hass_admin_user.id),
+        )
+        await hass.async_block_till_done()
+        assert current_priority() == PRIORITY_BACKGROUND
+
+    await hass.services.async_call(AUTOMATION_DOMAIN, SERVICE_TURN_OFF, {ATTR_ENTITY_ID: ENTITY_MATCH_ALL}, blocking=True)
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["command_queue"]["submitted"] == {"automation": 1, "interactive": 1}
@@ -0,0 +1,203 @@
+"""Test daikin_onecta conditional requests."""
+import json
+import re
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.components.water_heater import DOMAIN as WATER_HEATER_DOMAIN
+from homeassistant.components.water_heater import STATE_HEAT_PUMP
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import Platform
+from homeassistant.const import SERVICE_TURN_OFF
+from homeassistant.const import STATE_OFF
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.conditional import NOT_MODIFIED
+from custom_components.daikin_onecta.conditional import ResponseCache
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.const import DAIKIN_DEVICES
+from custom_components.daikin_onecta.const import DOMAIN as DAIKIN_DOMAIN
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+
+
+class Response:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+def test_response_cache() -> None:
+    """Test detecting unchanged responses."""
+    cache = ResponseCache()
+    assert cache.request_headers("/a") == {}
+
+    assert not cache.is_unchanged("/a", Response(200, b"[1]", {"ETag": '"1"'}))
+    # Validators are only used once the response was recorded
+    assert cache.request_headers("/a") == {}
+    cache.record("/a", Response(200, b"[1]", {"ETag": '"1"'}))
+    cache.record_processing("/a", 0.002)
+    assert cache.request_headers("/a") == {"If-None-Match": '"1"'}
+    assert cache.is_unchanged("/a", Response(304))
+
+    cache.record("/b", Response(200, b"[1]", {"Last-Modified": "Wed, 21 Oct 2015 07:28:00 GMT"}))
+    assert cache.request_headers("/b") == {"If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT"}
+
+    cache.record("/c", Response(200, b"[1]"))
+    assert cache.is_unchanged("/c", Response(200, b"[1]"))
+    assert not cache.is_unchanged("/c", Response(200, b"[2]"))
+
+    cache.invalidate("/c")
+    assert not cache.is_unchanged("/c", Response(200, b"[1]"))
+    assert cache.request_headers("/a") == {"If-None-Match": '"1"'}
+
+    (saving,) = cache.savings.values()
+    assert saving == {"not_modified": 1, "unchanged_body": 1, "bytes_saved": 3, "cpu_ms_saved": 2}
+
+
+async def test_conditional_get(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the ETag of the cloud is used and an unchanged response isn't merged."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
+    device = config_entry.runtime_data[DAIKIN_DEVICES]["1ece521b-5401-4a42-acce-6f76fba246aa"]
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        # The same body without validators is detected by its hash
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            assert await daikin_api.getCloudDeviceDetails() is NOT_MODIFIED
+
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma3m"), headers={"ETag": '"abc"'})
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+        last_update = device.last_data_update
+
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=304)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert rsps.calls[0].request.headers["If-None-Match"] == '"abc"'
+
+    assert coordinator.last_update_success
+    assert device.last_data_update == last_update
+    assert daikin_api.json_data == load_fixture_json("altherma3m")
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    (saving,) = diagnostics["response_cache"]["savings"].values()
+    assert saving["not_modified"] == 1
+    assert saving["unchanged_body"] == 1
+    assert saving["bytes_saved"] > 0
+    assert saving["cpu_ms_saved"] > 0
+
+
+async def test_conditional_get_after_write(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the data from before a write reverts the written value the device didn't take."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    assert hass.states.get("water_heater.altherma").state == STATE_HEAT_PUMP
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.patch(
+                DAIKIN_API_URL
+                + "/v1/gateway-devices/1ece521b-5401-4a42-acce-6f76fba246aa/management-points/domesticHotWaterTank/characteristics/onOffMode",
+                status=204,
+            )
+            await hass.services.async_call(WATER_HEATER_DOMAIN, SERVICE_TURN_OFF, {ATTR_ENTITY_ID: "water_heater.altherma"}, blocking=True)
+            await hass.async_block_till_done()
+        assert hass.states.get("water_heater.altherma").state == STATE_OFF
+
+        # The cloud returns the same data as before the write
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    assert hass.states.get("water_heater.altherma").state == STATE_HEAT_PUMP
+
+
+async def test_conditional_get_revert(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test data merged from one device endpoint or all devices is reverted by the other endpoint."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    original = load_fixture_json("altherma")
+    changed = load_fixture_json("altherma")
+    for management_point in changed[0]["managementPoints"]:
+        if management_point["embeddedId"] == "domesticHotWaterTank":
+            management_point["onOffMode"]["value"] = "off"
+
+    async def pull_device(devices):
+        def device_data(request):
+            return (200, {}, json.dumps(next(dev_data for dev_data in devices if request.url.endswith(dev_data["id"]))))
+
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.GET, re.compile(DAIKIN_API_URL + "/v1/gateway-devices/[^/]+$"), callback=device_data)
+            await hass.services.async_call(DAIKIN_DOMAIN, "pull_devices", {ATTR_ENTITY_ID: "water_heater.altherma"}, blocking=True)
+            await hass.async_block_till_done()
+
+    async def poll(devices):
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=devices)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ), patch("custom_components.daikin_onecta.coordinator.MIN_REFRESH_SPACING", 0):
+        # All devices return the data from before the device pull
+        await pull_device(changed)
+        assert hass.states.get("water_heater.altherma").state == STATE_OFF
+        await poll(original)
+        assert hass.states.get("water_heater.altherma").state == STATE_HEAT_PUMP
+
+        # The device returns the data from before the poll of all devices
+        await pull_device(original)
+        await poll(changed)
+        assert hass.states.get("water_heater.altherma").state == STATE_OFF
+        await pull_device(original)
+        assert hass.states.get("water_heater.altherma").state == STATE_HEAT_PUMP
@@ -1,4 +1,6 @@
 """Test the daikin_onecta config flow."""
+import base64
+import json
 from unittest.mock import patch
 
 import pytest
@@ -8,8 +10,10 @@ from homeassistant.components.application_credentials import (
 )
 from homeassistant.components.application_credentials import ClientCredential
 from homeassistant.core import HomeAssistant
+from homeassistant.data_entry_flow import FlowResultType
 from homeassistant.helpers import config_entry_oauth2_flow
 from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
 
 from custom_components.daikin_onecta.const import DOMAIN
 from custom_components.daikin_onecta.const import OAUTH2_AUTHORIZE
@@ -80,3 +84,112 @@ async def test_full_flow(
 
     assert len(hass.config_entries.async_entries(DOMAIN)) == 1
     assert len(mock_setup.mock_calls) == 1
+
+
+def jwt(claims) -> str:
+    """Return an unsigned JWT with the given claims."""
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip("=")
+    return f"e30.{payload}.signature"
+
+
+async def oauth_flow(hass: HomeAssistant, client, aioclient_mock, access_token, context):
+    """Run the OAuth flow which returns the given access token."""
+    result = await hass.config_entries.flow.async_init("daikin_onecta", context=context)
+    if result["step_id"] == "reauth_confirm":
+        result = await hass.config_entries.flow.async_configure(result["flow_id"], {})
+    state = config_entry_oauth2_flow._encode_jwt(
+        hass,
+        {
+            "flow_id": result["flow_id"],
+            "redirect_uri": "https://example.com/auth/external/callback",
+        },
+    )
+    resp = await client.get(f"/auth/external/callback?code=abcd&state={state}")
+    assert resp.status == 200
+
+    aioclient_mock.clear_requests()
+    aioclient_mock.post(
+        OAUTH2_TOKEN,
+        json={
+            "refresh_token": "mock-refresh-token",
+            "access_token": access_token,
+            "type": "Bearer",
+            "expires_in": 60,
+        },
+    )
+    with patch("custom_components.daikin_onecta.async_setup_entry", return_value=True):
+        return await hass.config_entries.flow.async_configure(result["flow_id"])
+
+
+async def test_multiple_accounts(
+    hass: HomeAssistant,
+    hass_client_no_auth,
+    aioclient_mock,
+    current_request_with_host,
+    setup_credentials,
+) -> None:
+    """Check an entry is created per Daikin account."""
+    assert await async_setup_component(hass, "daikin_onecta", {})
+    client = await hass_client_no_auth()
+    context = {"source": config_entries.SOURCE_USER}
+
+    result = await oauth_flow(hass, client, aioclient_mock, jwt({"sub": "account-1", "email": "one@example.com"}), context)
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["title"] == "one@example.com"
+    assert result["result"].unique_id == "account-1"
+
+    result = await oauth_flow(hass, client, aioclient_mock, jwt({"sub": "account-2"}), context)
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["result"].unique_id == "account-2"
+
+    result = await oauth_flow(hass, client, aioclient_mock, jwt({"sub": "account-1"}), context)
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "already_configured"
+    assert len(hass.config_entries.async_entries(DOMAIN)) == 2
+
+    # A reauth has to use the account of the entry
+    entry = hass.config_entries.async_entry_for_domain_unique_id(DOMAIN, "account-1")
+    context = {"source": config_entries.SOURCE_REAUTH, "entry_id": entry.entry_id}
+    result = await oauth_flow(hass, client, aioclient_mock, jwt({"sub": "account-2"}), context)
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "wrong_account"
+
+    result = await oauth_flow(hass, client, aioclient_mock, jwt({"sub": "account-1"}), context)
+    assert result["type"] == FlowResultType.ABORT
+    assert result["reason"] == "reauth_successful"
+
+
+async def test_options_flow(hass: HomeAssistant, config_entry: MockConfigEntry) -> None:
+    """Test the polling windows of the options have to fit within the daily rate limit."""
+    result = await hass.config_entries.options.async_init(config_entry.entry_id)
+    assert result["type"] is FlowResultType.FORM
+
+    options = {
+        "high_scan_interval": 10,
+        "low_scan_interval": 30,
+        "high_scan_start": "07:00:00",
+        "low_scan_start": "22:00:00",
+        "scan_ignore": 30,
+        "polling_windows": [
+            {"name": "office", "days": ["mon", "tue", "wed", "thu", "fri"], "start": "05:00", "interval": 5},
+            {"name": "night", "start": "23:00", "interval": 60},
+        ],
+    }
+    result = await hass.config_entries.options.async_configure(result["flow_id"], user_input=options)
+    assert result["type"] is FlowResultType.FORM
+    assert result["errors"] == {"base": "over_budget"}
+    assert result["description_placeholders"] == {"requests": "222", "limit": "200"}
+
+    options["polling_windows"][0]["interval"] = "abc"
+    result = await hass.config_entries.options.async_configure(result["flow_id"], user_input=options)
+    assert result["errors"] == {"polling_windows": "invalid_windows"}
+
+    options["polling_windows"][0]["interval"] = 10
+    result = await hass.config_entries.options.async_configure(result["flow_id"], user_input=options)
+    assert result["type"] is FlowResultType.CREATE_ENTRY
+    assert config_entry.options["polling_windows"][1] == {
+        "name": "night",
+        "days": ["mon", "tue", "wed", "thu", "fri", "sat", "sun"],
+        "start": "23:00",
+        "interval": 60,
+    }
@@ -0,0 +1,185 @@
+"""Test daikin_onecta energy helpers."""
+from datetime import datetime
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.core import State
+from pytest_homeassistant_custom_component.common import mock_restore_cache_with_extra_data
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.energy import current_period_energy
+from custom_components.daikin_onecta.energy import EnergyAccumulator
+from custom_components.daikin_onecta.energy import PowerEstimator
+
+
+def test_current_period_energy() -> None:
+    """Test summing the current period of the consumption data."""
+    assert current_period_energy([1] * 12 + [0.1, 0.2, None] + [None] * 9, "d") == 0.3
+    assert current_period_energy([5] * 7 + [1, 2, None, None, None, None, None], "w") == 3
+    assert current_period_energy([None] * 12 + [3, 4] + [None] * 10, "m") == 7
+
+
+def test_power_estimator() -> None:
+    """Test the average power of the completed buckets of the daily consumption."""
+    estimator = PowerEstimator(maxlen=3)
+    assert estimator.power is None
+
+    # At 13:30 the bucket of 12:00 is in progress, the bucket of 10:00 consumed 1.5 kWh, that is 750 W
+    today = [1.5] * 6 + [0.2] + [None] * 5
+    estimator.update(datetime(2024, 1, 2, 13, 30), [0] * 12 + today)
+    assert estimator.power == 750
+    assert estimator.bucket_start == datetime(2024, 1, 2, 10)
+
+    # The bucket in progress doesn't change the power, a revision of the completed bucket does
+    today[6] = 0.5
+    today[5] = 1.0
+    estimator.update(datetime(2024, 1, 2, 13, 50), [0] * 12 + today)
+    assert estimator.power == 500
+    assert len(estimator.history()) == 1
+
+    # The next bucket completes
+    today[7] = 0.1
+    estimator.update(datetime(2024, 1, 2, 14, 10), [0] * 12 + today)
+    assert estimator.power == 250
+    assert estimator.bucket_start == datetime(2024, 1, 2, 12)
+
+    # Just after midnight the last bucket of yesterday is complete
+    estimator.update(datetime(2024, 1, 3, 0, 30), [0] * 11 + [3] + [0.1] + [None] * 11)
+    assert estimator.power == 1500
+    assert estimator.bucket_start == datetime(2024, 1, 2, 22)
+
+    # The ring buffer only keeps the last 3 buckets and missing data is ignored
+    estimator.update(datetime(2024, 1, 3, 2, 30), [0] * 11 + [3] + [0.4, 0.1] + [None] * 10)
+    estimator.update(datetime(2024, 1, 3, 3, 0), None)
+    assert estimator.history() == [
+        (datetime(2024, 1, 2, 12), 250),
+        (datetime(2024, 1, 2, 22), 1500),
+        (datetime(2024, 1, 3, 0), 200),
+    ]
+
+
+async def test_power_sensor(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the power sensor derived from the daily consumption buckets."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    # The fixture has the bucket of 06:00 in progress and the bucket of 04:00 at 0 kWh
+    entity_id = "sensor.altherma_domestichotwatertank_heating_electrical_power"
+    assert hass.states.get(entity_id).state == "0.0"
+    assert hass.states.get(entity_id).attributes["unit_of_measurement"] == "W"
+
+    # The bucket of 06:00 completes with 1 kWh
+    devices = load_fixture_json("altherma")
+    for management_point in devices[0]["managementPoints"]:
+        if management_point["embeddedId"] == "domesticHotWaterTank":
+            daily = management_point["consumptionData"]["value"]["electrical"]["heating"]["d"]
+            daily[15] = 1
+            daily[16] = 0
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=devices)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    state = hass.states.get(entity_id)
+    assert float(state.state) == 500
+    assert state.attributes["bucket_start"].endswith("T06:00:00")
+
+
+def test_energy_accumulator() -> None:
+    """Test accumulating the daily consumption into a lifetime total."""
+    accumulator = EnergyAccumulator()
+    start = datetime(2024, 1, 1, 20, 0, 0)
+    yesterday = [1] * 12
+    today = [2] * 10 + [0, 0]
+
+    # The first data is the baseline
+    assert accumulator.update(start, yesterday + today) == 0
+
+    # The last bucket of today increases
+    today[10] = 0.5
+    assert accumulator.update(start + timedelta(hours=1), yesterday + today) == 0.5
+
+    # The cloud revises a bucket down and later up again, only the new increase is counted
+    revised = today.copy()
+    revised[10] = 0.3
+    assert accumulator.update(start + timedelta(hours=2), yesterday + revised) == 0.5
+    assert accumulator.revisions == 1
+    today[10] = 0.7
+    assert accumulator.update(start + timedelta(hours=3), yesterday + today) == 0.7
+
+    # At midnight today becomes yesterday, the remainder of yesterday and the
+    # first bucket of the new day are counted
+    today[11] = 0.4
+    new_today = [0.6] + [0] * 11
+    assert accumulator.update(start + timedelta(hours=5), today + new_today) == 1.7
+
+    # Missing a complete day counts all buckets as new
+    assert accumulator.update(start + timedelta(days=3), [1] * 12 + [0.5] + [0] * 11) == 14.2
+
+    # The state can be restored
+    restored = EnergyAccumulator.from_dict(accumulator.as_dict())
+    assert restored.total == 14.2
+    assert restored.buckets == accumulator.buckets
+    assert restored.last_update == accumulator.last_update
+    assert restored.revisions == 1
+
+
+async def test_energy_total_sensor_restore(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the lifetime energy sensor continues with the restored total."""
+    entity_id = "sensor.altherma_domestichotwatertank_heating_total_electrical_consumption"
+    devices = load_fixture_json("altherma")
+    for management_point in devices[0]["managementPoints"]:
+        if management_point["embeddedId"] == "domesticHotWaterTank":
+            buckets = management_point["consumptionData"]["value"]["electrical"]["heating"]["d"]
+
+    # Before the restart bucket 12 was 1 kWh lower
+    previous_buckets = [0 if v is None else v for v in buckets]
+    previous_buckets[12] -= 1
+    mock_restore_cache_with_extra_data(
+        hass,
+        [
+            (
+                State(entity_id, "100"),
+                {
+                    "native_value": 100,
+                    "native_unit_of_measurement": "kWh",
+                    "accumulator": {"total": 100, "buckets": previous_buckets, "last_update": datetime.now().isoformat(), "revisions": 0},
+                },
+            )
+        ],
+    )
+
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    assert float(hass.states.get(entity_id).state) == 101
+    assert hass.states.get(entity_id).attributes["state_class"] == "total_increasing"
@@ -6,6 +6,7 @@ from unittest.mock import patch
 
 import homeassistant.helpers.device_registry as dr
 import homeassistant.helpers.entity_registry as er
+import pytest
 import responses
 from homeassistant.components.climate import ATTR_FAN_MODE
 from homeassistant.components.climate import ATTR_HVAC_MODE
@@ -41,15 +42,20 @@ from homeassistant.const import Platform
 from homeassistant.const import STATE_OFF
 from homeassistant.const import STATE_ON
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import issue_registry as ir
+from homeassistant.helpers.update_coordinator import UpdateFailed
 from homeassistant.setup import async_setup_component
 from pytest_homeassistant_custom_component.common import MockConfigEntry
 from syrupy import SnapshotAssertion
 
 from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
 from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta import COMPONENT_TYPES
 from custom_components.daikin_onecta.const import COORDINATOR
 from custom_components.daikin_onecta.const import DAIKIN_API_URL
 from custom_components.daikin_onecta.const import DOMAIN as DAIKIN_DOMAIN
+from custom_components.daikin_onecta.const import FORWARDED_PLATFORMS
 from custom_components.daikin_onecta.const import SCHEDULE_OFF
 from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
 from custom_components.daikin_onecta.diagnostics import async_get_device_diagnostics
@@ -67,6 +73,38 @@ async def test_homehub(
 
     assert hass.states.get("sensor.homehub_ratelimit_minute").state == "0"
 
+    # The homehub has no climate, water heater or schedule, only the generic platforms are set up
+    assert config_entry.runtime_data[FORWARDED_PLATFORMS] == ["sensor", "switch", "binary_sensor"]
+    assert "climate" not in hass.config.components
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+
+async def test_new_device_platforms(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test a new device which needs a platform that wasn't set up reloads the config entry."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "homehub")
+    assert "climate" not in config_entry.runtime_data[FORWARDED_PLATFORMS]
+
+    devices_json = load_fixture_json("homehub") + load_fixture_json("altherma")
+    with patch_oauth_session(), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ), responses.RequestsMock() as rsps:
+        rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=devices_json)
+        await config_entry.runtime_data[COORDINATOR].async_refresh()
+        await hass.async_block_till_done()
+        # The reload polled the devices again
+        assert len(rsps.calls) == 2
+
+    assert config_entry.runtime_data[FORWARDED_PLATFORMS] == COMPONENT_TYPES
+    assert hass.states.get("climate.altherma_leaving_water_offset") is not None
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+
 
 async def test_offlinedevice(
     hass: HomeAssistant,
@@ -291,18 +329,36 @@ async def test_altherma_ratelimit(
         with responses.RequestsMock() as rsps:
             rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=429)
 
-            # Test that updating the data through with a 429 doesn't crash
-            coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
-            await coordinator._async_update_data()
+            # Test that updating the data through with a 429 fails the update
+            coordinator = config_entry.runtime_data[COORDINATOR]
+            with pytest.raises(UpdateFailed):
+                await coordinator._async_update_data()
 
         with responses.RequestsMock() as rsps:
             rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
 
             # Test that updating the data through with a status 200 works
-            coordinator = hass.data[DAIKIN_DOMAIN][COORDINATOR]
+            coordinator = config_entry.runtime_data[COORDINATOR]
             await coordinator._async_update_data()
 
 
+async def test_legacy_rate_limit_issues(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the rate limit issues without a config entry id are removed."""
+    for issue_id in ("minute_rate_limit", "day_rate_limit"):
+        ir.async_create_issue(hass, DAIKIN_DOMAIN, issue_id, is_fixable=False, severity=ir.IssueSeverity.ERROR, translation_key=issue_id)
+
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    assert ir.async_get(hass).async_get_issue(DAIKIN_DOMAIN, "minute_rate_limit") is None
+    assert ir.async_get(hass).async_get_issue(DAIKIN_DOMAIN, "day_rate_limit") is None
+
+
 async def test_climate_fixedfanmode(
     hass: HomeAssistant,
     config_entry: MockConfigEntry,
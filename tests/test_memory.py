@@ -0,0 +1,106 @@
+"""Test daikin_onecta memory accounting."""
+import tracemalloc
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import pytest
+import responses
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+from custom_components.daikin_onecta.memory import deep_sizeof
+from custom_components.daikin_onecta.memory import memory_report
+from custom_components.daikin_onecta.memory import stale_keys
+
+TICKS = 5
+
+
+def test_stale_keys() -> None:
+    """Test finding the keys which disappeared from the payload."""
+    assert stale_keys({"a": {"b": 1, "c": 2}, "d": 3, "e": [1]}, {"a": {"b": 1}, "e": [2]}) == ["/a/c", "/d"]
+    assert deep_sizeof({"a": "b"}) > deep_sizeof({})
+
+
+def test_memory_report_same_name() -> None:
+    """Test that devices with the same name are reported apart."""
+    devices = {
+        device_id: SimpleNamespace(id=device_id, name="Altherma", daikin_data={"id": device_id, "managementPoints": []})
+        for device_id in ("id-1", "id-2")
+    }
+    report = memory_report(devices, [], [{"id": "id-1"}, {"id": "id-2", "managementPoints": []}])
+    assert set(report["devices"]) == {"id-1", "id-2"}
+    assert report["devices"]["id-2"]["name"] == "Altherma"
+    assert report["growing_devices"] == ["id-1"]
+
+
+def integration_memory(snapshot):
+    return sum(statistic.size for statistic in snapshot.filter_traces([tracemalloc.Filter(True, "*daikin_onecta*")]).statistics("filename"))
+
+
+@pytest.mark.timeout(120)
+async def test_memory_growth(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    record_property,
+) -> None:
+    """Measure the memory retained by setup and coordinator ticks and flag growth."""
+    tracemalloc.start()
+    try:
+        await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+        setup_memory = integration_memory(tracemalloc.take_snapshot())
+
+        # Each tick the cloud sends a key which is gone in the next payload
+        coordinator = config_entry.runtime_data[COORDINATOR]
+        tick_memory = []
+        with patch(
+            "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+            return_value="XXXXXX",
+        ), patch(
+            "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+            return_value=0,
+        ):
+            for tick in range(TICKS):
+                devices = load_fixture_json("altherma")
+                devices[0][f"transient{tick}"] = {"value": "x" * 1000}
+                with responses.RequestsMock() as rsps:
+                    rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=devices)
+                    await coordinator.async_refresh()
+                    await hass.async_block_till_done()
+                tick_memory.append(integration_memory(tracemalloc.take_snapshot()))
+
+        memory = (await async_get_config_entry_diagnostics(hass, config_entry))["memory"]
+        assert "tracemalloc" in memory
+    finally:
+        tracemalloc.stop()
+
+    record_property("setup_bytes", setup_memory)
+    record_property("growth_per_tick_bytes", (tick_memory[-1] - tick_memory[0]) // (TICKS - 1))
+
+    altherma = memory["devices"]["1ece521b-5401-4a42-acce-6f76fba246aa"]
+    assert altherma["name"] == "Altherma"
+    assert memory["growing_devices"] == ["1ece521b-5401-4a42-acce-6f76fba246aa"]
+    assert altherma["stale_keys_count"] == TICKS - 1
+    assert altherma["stale_keys"] == [f"/transient{tick}" for tick in range(TICKS - 1)]
+    assert altherma["bytes"] > sum(altherma["management_points"].values())
+    assert set(altherma["management_points"]) == {
+        "gateway",
+        "climateControlMainZone",
+        "domesticHotWaterTank",
+        "indoorUnitHydro",
+        "outdoorUnit",
+        "userInterface",
+    }
+    assert memory["entity_classes"]["DaikinValueSensor"]["count"] > 0
+    assert memory["entity_classes"]["DaikinValueSensor"]["bytes"] > 0
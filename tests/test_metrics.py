@@ -0,0 +1,92 @@
+"""Test daikin_onecta request metrics."""
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.components.water_heater import ATTR_TEMPERATURE
+from homeassistant.components.water_heater import DOMAIN as WATER_HEATER_DOMAIN
+from homeassistant.components.water_heater import SERVICE_SET_TEMPERATURE
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+from custom_components.daikin_onecta.metrics import endpoint_name
+from custom_components.daikin_onecta.metrics import Histogram
+
+
+def test_histogram() -> None:
+    """Test the histogram buckets."""
+    histogram = Histogram(bounds=(10, 100))
+    for value in (5, 10, 50, 500):
+        histogram.observe(value)
+
+    assert histogram.as_dict() == {
+        "count": 4,
+        "average": 141.2,
+        "max": 500,
+        "buckets": {"<=10": 2, "<=100": 1, "+Inf": 1},
+    }
+
+
+def test_endpoint_name() -> None:
+    """Test the device id is removed from the endpoint."""
+    assert endpoint_name("GET", "/v1/gateway-devices") == "GET /v1/gateway-devices"
+    assert (
+        endpoint_name("PATCH", "/v1/gateway-devices/1ece521b/management-points/climateControl/characteristics/onOffMode")
+        == "PATCH /v1/gateway-devices/{id}/management-points/climateControl/characteristics/onOffMode"
+    )
+
+
+async def test_request_metrics(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the request metrics are available in the diagnostics."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.patch(
+                DAIKIN_API_URL
+                + "/v1/gateway-devices/1ece521b-5401-4a42-acce-6f76fba246aa/management-points/domesticHotWaterTank/characteristics/temperatureControl",
+                status=429,
+            )
+            await hass.services.async_call(
+                WATER_HEATER_DOMAIN,
+                SERVICE_SET_TEMPERATURE,
+                {ATTR_ENTITY_ID: "water_heater.altherma", ATTR_TEMPERATURE: 58},
+                blocking=True,
+            )
+            await hass.async_block_till_done()
+
+    metrics = (await async_get_config_entry_diagnostics(hass, config_entry))["request_metrics"]
+    assert metrics["summary"]["requests"] == 2
+    assert metrics["summary"]["rate_limited"] == 1
+    assert metrics["summary"]["errors"] == 0
+    assert metrics["status_codes"] == {200: 1, 429: 1}
+    assert metrics["lock_wait_ms"]["count"] == 2
+
+    get_metrics = metrics["endpoints"]["GET /v1/gateway-devices"]
+    assert get_metrics["latency_ms"]["count"] == 1
+    assert get_metrics["status_codes"] == {200: 1}
+    assert get_metrics["response_bytes"] > 0
+
+    patch_metrics = metrics["endpoints"]["PATCH /v1/gateway-devices/{id}/management-points/domesticHotWaterTank/characteristics/temperatureControl"]
+    assert patch_metrics["request_bytes"] == len('{"value": 58, "path": "/operationModes/heating/setpoints/domesticHotWaterTemperature"}')
+
+    # The request sensors are optional
+    entity_entry = entity_registry.async_get("sensor.altherma_requests_requests")
+    assert entity_entry is not None
+    assert entity_entry.disabled_by is er.RegistryEntryDisabler.INTEGRATION
@@ -0,0 +1,108 @@
+"""Test daikin_onecta phase aligned polling."""
+from datetime import timedelta
+from typing import Any
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from freezegun.api import FrozenDateTimeFactory
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.phase import initial_phase
+from custom_components.daikin_onecta.phase import next_poll
+from custom_components.daikin_onecta.phase import shifted_phase
+from custom_components.daikin_onecta.phase import STORAGE_KEY
+
+
+def test_next_poll() -> None:
+    """Test the polls are on the grid of the interval shifted by the phase."""
+    assert initial_phase("entry") == initial_phase("entry")
+    assert initial_phase("entry") != initial_phase("other entry")
+    assert 0 <= initial_phase("entry") < 1
+    assert 0 <= shifted_phase(0.9) < 1
+
+    assert next_poll(1000, 600, 0.5) == 1500
+    assert next_poll(1500, 600, 0.5) == 2100
+    # After a fetch the next poll is at least half an interval later
+    assert next_poll(1400, 600, 0.5, last_fetch=1400) == 2100
+    assert next_poll(1100, 600, 0.5, last_fetch=1100) == 1500
+
+
+async def test_phase_shift(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    hass_storage: dict[str, Any],
+    freezer: FrozenDateTimeFactory,
+) -> None:
+    """Test a scheduled poll which used up the minute limit moves and stores the phase."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    phase = coordinator.phase
+    assert phase == initial_phase(config_entry.entry_id)
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ), patch("custom_components.daikin_onecta.coordinator.MIN_REFRESH_SPACING", 0), responses.RequestsMock() as rsps:
+        rsps.get(
+            DAIKIN_API_URL + "/v1/gateway-devices",
+            status=200,
+            json=load_fixture_json("altherma"),
+            headers={
+                "X-RateLimit-Limit-minute": "20",
+                "X-RateLimit-Remaining-minute": "0",
+                "X-RateLimit-Limit-day": "200",
+                "X-RateLimit-Remaining-day": "100",
+            },
+        )
+        freezer.tick(2 * coordinator.update_interval)
+        async_fire_time_changed(hass)
+        await hass.async_block_till_done()
+        assert len(rsps.calls) == 1
+
+    assert coordinator.phase == shifted_phase(phase)
+    assert hass_storage[STORAGE_KEY.format(config_entry.entry_id)]["data"] == {"phase": coordinator.phase}
+
+    # The stored phase survives a reload
+    with patch_oauth_session(), responses.RequestsMock() as rsps:
+        rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+        assert await hass.config_entries.async_reload(config_entry.entry_id)
+        await hass.async_block_till_done()
+    assert config_entry.runtime_data[COORDINATOR].phase == shifted_phase(phase)
+
+
+async def test_period_boundary(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+    freezer: FrozenDateTimeFactory,
+) -> None:
+    """Test the interval is recomputed at the start of the high frequency period."""
+    freezer.move_to(dt_util.start_of_local_day() + timedelta(hours=6, minutes=59, seconds=50))
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    assert coordinator.update_interval == timedelta(minutes=30)
+
+    freezer.tick(timedelta(seconds=11))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+    assert coordinator.update_interval == timedelta(minutes=10)
@@ -0,0 +1,81 @@
+"""Test daikin_onecta refresh profiling."""
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import responses
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+from custom_components.daikin_onecta.profiler import RefreshProfiler
+
+
+def test_refresh_profiler() -> None:
+    """Test the profiler keeps a rolling window."""
+    profiler = RefreshProfiler(window=2)
+    assert profiler.as_dict() == {"refreshes": 0}
+
+    for network in (1.0, 2.0, 3.0):
+        profiler.start()
+        profiler.record_fetch(network + 0.5, 0.5)
+        profiler.record_merge("id-1", "Device", 0.125)
+        profiler.record_merge("id-2", "Device", 0.125)
+        profiler.record_entity(object(), 0.125)
+        profiler.finish()
+
+    profile = profiler.as_dict()
+    assert profile["refreshes"] == 2
+    assert profile["average"] == {"network_ms": 2500, "decode_ms": 500, "merge_ms": 250, "entities_ms": 125}
+    # Devices with the same name are kept apart
+    assert profile["slowest_devices_ms"] == {"id-1": {"name": "Device", "merge_ms": 125}, "id-2": {"name": "Device", "merge_ms": 125}}
+    assert profile["entity_classes_ms"] == {"object": 125}
+
+    # Without a started refresh nothing is recorded
+    profiler.record_merge("id-1", "Device", 1)
+    profiler.finish()
+    assert profiler.as_dict()["refreshes"] == 2
+
+
+async def test_refresh_profile_diagnostics(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the refresh profile is part of the diagnostics when enabled."""
+    hass.config_entries.async_update_entry(config_entry, options={"profiling": True})
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+
+    profile = (await async_get_config_entry_diagnostics(hass, config_entry))["refresh_profile"]
+    assert profile["refreshes"] == 2
+    assert profile["slowest_devices_ms"]["1ece521b-5401-4a42-acce-6f76fba246aa"]["name"] == "Altherma"
+    assert "DaikinClimate" in profile["entity_classes_ms"]
+    assert "DaikinValueSensor" in profile["entity_classes_ms"]
+    assert len(profile["slowest_entities_ms"]) == 5
+
+    # Disabling profiling removes the profile
+    hass.config_entries.async_update_entry(config_entry, options={"profiling": False})
+    await hass.async_block_till_done()
+    assert coordinator.profiler is None
+    assert "refresh_profile" not in await async_get_config_entry_diagnostics(hass, config_entry)
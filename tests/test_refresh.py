@@ -0,0 +1,193 @@
+"""Test daikin_onecta force_update and pull_devices services."""
+import asyncio
+import json
+import re
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import pytest
+import responses
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.const import DOMAIN as DAIKIN_DOMAIN
+
+
+async def test_force_update(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test concurrent force updates share one refresh and the rate limit is respected."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(
+                DAIKIN_API_URL + "/v1/gateway-devices",
+                status=200,
+                json=load_fixture_json("altherma3m"),
+                headers={"X-RateLimit-Limit-minute": "20", "X-RateLimit-Remaining-minute": "0", "X-RateLimit-Limit-day": "200", "retry-after": "30"},
+            )
+            results = await asyncio.gather(
+                *(hass.services.async_call(DAIKIN_DOMAIN, "force_update", {}, blocking=True, return_response=True) for _ in range(3))
+            )
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 1
+
+        for result in results:
+            account = result["accounts"][config_entry.entry_id]
+            assert account["result"] == "refreshed"
+            assert account["requests"] == 1
+            assert account["remaining_minute"] == 0
+
+        # The minute budget is used up, so the update is refused
+        with responses.RequestsMock() as rsps:
+            with pytest.raises(HomeAssistantError, match="retry after 30 seconds"):
+                await hass.services.async_call(DAIKIN_DOMAIN, "force_update", {}, blocking=True)
+            assert len(rsps.calls) == 0
+
+
+async def test_force_update_rate_limited(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test a poll refused with a 429 fails the refresh and backs off."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    coordinator = config_entry.runtime_data[COORDINATOR]
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(
+                DAIKIN_API_URL + "/v1/gateway-devices",
+                status=429,
+                headers={
+                    "X-RateLimit-Limit-minute": "20",
+                    "X-RateLimit-Remaining-minute": "5",
+                    "X-RateLimit-Limit-day": "200",
+                    "X-RateLimit-Remaining-day": "0",
+                    "retry-after": "600",
+                },
+            )
+            result = await hass.services.async_call(DAIKIN_DOMAIN, "force_update", {}, blocking=True, return_response=True)
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 1
+
+    assert result["accounts"][config_entry.entry_id]["result"] == "failed"
+    assert not coordinator.last_update_success
+    assert coordinator.update_interval.total_seconds() >= 660
+
+
+async def test_pull_devices(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test pulling the data of single devices."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    assert hass.states.get("water_heater.altherma").state != "off"
+
+    devices = {dev_data["id"]: dev_data for dev_data in load_fixture_json("altherma")}
+    for management_point in devices["1ece521b-5401-4a42-acce-6f76fba246aa"]["managementPoints"]:
+        if management_point["embeddedId"] == "domesticHotWaterTank":
+            management_point["onOffMode"]["value"] = "off"
+
+    def device_data(request):
+        return (200, {}, json.dumps(devices[request.url.rsplit("/", 1)[1]]))
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.GET, re.compile(DAIKIN_API_URL + "/v1/gateway-devices/[^/]+$"), callback=device_data)
+            result = await hass.services.async_call(
+                DAIKIN_DOMAIN, "pull_devices", {ATTR_ENTITY_ID: "water_heater.altherma"}, blocking=True, return_response=True
+            )
+            await hass.async_block_till_done()
+            assert result["accounts"][config_entry.entry_id]["requests"] == len(rsps.calls)
+
+        assert result["devices"]["1ece521b-5401-4a42-acce-6f76fba246aa"] == {"name": "Altherma", "result": "refreshed"}
+        assert hass.states.get("water_heater.altherma").state == "off"
+
+        # Unchanged device data isn't merged again and the rate limit is respected
+        daikin_api = config_entry.runtime_data[DAIKIN_API]
+        with responses.RequestsMock() as rsps:
+            rsps.add_callback(responses.GET, re.compile(DAIKIN_API_URL + "/v1/gateway-devices/[^/]+$"), callback=device_data)
+            daikin_api.rate_limits["minute"] = 20
+            daikin_api.rate_limits["remaining_minutes"] = 1
+            result = await hass.services.async_call(
+                DAIKIN_DOMAIN, "pull_devices", {ATTR_ENTITY_ID: "water_heater.altherma"}, blocking=True, return_response=True
+            )
+            assert len(rsps.calls) == 1
+
+        assert sorted(device["result"] for device in result["devices"].values()).count("unchanged") == 1
+        assert result["accounts"][config_entry.entry_id]["requests"] == 1
+
+
+async def test_refresh_coalescing(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test concurrent refreshes share one fetch and a scheduled refresh right after a fetch is skipped."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+    coordinator = config_entry.runtime_data[COORDINATOR]
+
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            await asyncio.gather(coordinator.async_refresh(), coordinator.async_refresh(), coordinator.async_force_refresh())
+            async_fire_time_changed(hass, dt_util.utcnow() + 2 * coordinator.update_interval)
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 1
+
+        assert coordinator.last_update_success
+        assert coordinator.refresh_stats["coalesced"] == 2
+        assert coordinator.refresh_stats["spaced"] == 1
+
+        # Once the spacing passed the scheduled refresh fetches again
+        with patch("custom_components.daikin_onecta.coordinator.MIN_REFRESH_SPACING", 0), responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            async_fire_time_changed(hass, dt_util.utcnow() + 2 * coordinator.update_interval)
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 1
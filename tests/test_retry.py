@@ -0,0 +1,108 @@
+"""Test daikin_onecta retry of transient failures."""
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import requests
+import responses
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import snapshot_platform_entities
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.deadline import DeadlineExceeded
+from custom_components.daikin_onecta.retry import classify_failure
+from custom_components.daikin_onecta.retry import RetryPolicy
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_classify_failure() -> None:
+    """Test which failures are retried."""
+    assert classify_failure(None, requests.ReadTimeout(), 10) == "timeout"
+    assert classify_failure(None, requests.ConnectionError(), 10) == "connection"
+    assert classify_failure(None, ConnectionResetError(), 10) == "connection"
+    assert classify_failure(None, ValueError(), 10) is None
+    assert classify_failure(None, TimeoutError(), 10) == "timeout"
+    assert classify_failure(None, DeadlineExceeded(), 10) is None
+    assert classify_failure(Response(503), None, 10) == "server_error"
+    assert classify_failure(Response(400), None, 10) is None
+    assert classify_failure(Response(429), None, 10) is None
+    assert classify_failure(Response(429, {"retry-after": "5"}), None, 10) == "rate_limited"
+    assert classify_failure(Response(429, {"retry-after": "60"}), None, 10) is None
+
+
+def test_retry_policy() -> None:
+    """Test the backoff is bounded and the attempts and deadline are honoured."""
+    policy = RetryPolicy(attempts=3, base_delay=1, max_delay=3, deadline=10)
+    for attempt in range(1, 6):
+        assert 0 <= policy.delay(attempt) <= min(3, 2 ** (attempt - 1))
+    assert 5 <= policy.delay(1, retry_after=5) <= 6
+    assert policy.allows(1, 0, 1)
+    assert not policy.allows(3, 0, 1)
+    assert not policy.allows(1, 9.5, 1)
+
+
+async def test_retry_get(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test transient failures of the GET are retried."""
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ), patch("custom_components.daikin_onecta.daikin_api.asyncio.sleep") as sleep:
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", body=requests.ConnectionError("reset"))
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=503)
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 3
+
+        assert coordinator.last_update_success
+        assert daikin_api.metrics.retries == 2
+        assert daikin_api.metrics.retry_reasons == {"connection": 1, "server_error": 1}
+
+        # A short retry-after of a 429 is honoured
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=429, headers={"retry-after": "2"})
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=load_fixture_json("altherma"))
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+        assert max(call.args[0] for call in sleep.call_args_list) >= 2
+        assert daikin_api.metrics.retry_reasons["rate_limited"] == 1
+
+        # When all attempts fail the update fails
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=500)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == daikin_api.retry_policy.attempts
+        assert not coordinator.last_update_success
+
+        # Client errors are not retried
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=404)
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert len(rsps.calls) == 1
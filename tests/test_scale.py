@@ -0,0 +1,96 @@
+"""Scale tests of daikin_onecta with synthetic accounts.
+
+The 1000 device account takes minutes, it only runs when DAIKIN_ONECTA_SCALE_1000 is set.
+The measurements are added as properties to the junit xml (--junitxml) to track them.
+"""
+import os
+import time
+import tracemalloc
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import pytest
+import responses
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import setup_config_entry
+from .fleet import generate_fleet
+from custom_components.daikin_onecta import COMPONENT_TYPES
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.const import DAIKIN_DEVICES
+
+
+def test_generate_fleet() -> None:
+    """Test the generated fleet is unique and reproducible."""
+    fleet = generate_fleet(20, seed=1)
+    assert len(fleet) == 20
+    assert len({device["id"] for device in fleet}) == 20
+    assert generate_fleet(20, seed=1) == fleet
+    assert generate_fleet(20, seed=2) != fleet
+
+    # A later tick changes the values of the same devices
+    later = generate_fleet(20, seed=1, tick=1)
+    assert [device["id"] for device in later] == [device["id"] for device in fleet]
+    assert later != fleet
+
+
+@pytest.mark.timeout(600)
+@pytest.mark.parametrize(
+    "count",
+    [
+        10,
+        100,
+        pytest.param(1000, marks=pytest.mark.skipif(not os.environ.get("DAIKIN_ONECTA_SCALE_1000"), reason="set DAIKIN_ONECTA_SCALE_1000 to run")),
+    ],
+)
+async def test_scale(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    entity_registry: er.EntityRegistry,
+    record_property,
+    count,
+) -> None:
+    """Measure setup time, memory per device and the CPU time of one poll."""
+    fleet = generate_fleet(count)
+
+    tracemalloc.start()
+    setup_start = time.perf_counter()
+    await setup_config_entry(hass, config_entry, fleet)
+    setup_seconds = time.perf_counter() - setup_start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(config_entry.runtime_data[DAIKIN_DEVICES]) == count
+    entity_entries = er.async_entries_for_config_entry(entity_registry, config_entry.entry_id)
+    platforms = {entity_entry.domain for entity_entry in entity_entries}
+    assert platforms == set(COMPONENT_TYPES)
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    devices = config_entry.runtime_data[DAIKIN_DEVICES]
+    last_updates = {device_id: device.last_data_update for device_id, device in devices.items()}
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=generate_fleet(count, tick=1))
+            poll_start = time.process_time()
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            poll_cpu_seconds = time.process_time() - poll_start
+
+    # The poll returned changed values, so all devices were merged
+    assert coordinator.last_update_success
+    assert all(device.last_data_update > last_updates[device_id] for device_id, device in devices.items())
+    record_property("devices", count)
+    record_property("entities", len(entity_entries))
+    record_property("setup_ms", round(setup_seconds * 1000))
+    record_property("memory_per_device_kb", round(memory / count / 1024))
+    record_property("poll_cpu_per_device_ms", round(poll_cpu_seconds * 1000 / count, 3))
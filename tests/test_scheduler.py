@@ -0,0 +1,95 @@
+"""Test daikin_onecta with multiple accounts."""
+import asyncio
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
+from .conftest import setup_config_entry
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_DEVICES
+from custom_components.daikin_onecta.const import DOMAIN as DAIKIN_DOMAIN
+from custom_components.daikin_onecta.const import SCHEDULER
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+from custom_components.daikin_onecta.scheduler import RequestScheduler
+
+
+async def test_scheduler_fairness() -> None:
+    """Test a busy account doesn't starve another account."""
+    scheduler = RequestScheduler(max_concurrent=1)
+    order = []
+
+    async def account(name, count):
+        lock = asyncio.Lock()
+
+        async def request():
+            async with lock, scheduler.slot(name):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(request() for _ in range(count)))
+
+    await asyncio.gather(account("busy", 4), account("quiet", 2))
+    assert order[:4] == ["busy", "quiet", "busy", "quiet"]
+    assert scheduler.as_dict()["accounts"]["busy"]["requests"] == 4
+    scheduler.close()
+
+
+async def test_multiple_accounts(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+) -> None:
+    """Test each account has its own state and all share the scheduler."""
+    await setup_config_entry(hass, config_entry, load_fixture_json("altherma"))
+    second_entry = MockConfigEntry(domain=DAIKIN_DOMAIN, unique_id="account-2", data=config_entry.data)
+    second_entry.add_to_hass(hass)
+    await setup_config_entry(hass, second_entry, load_fixture_json("dry"))
+
+    assert "1ece521b-5401-4a42-acce-6f76fba246aa" in config_entry.runtime_data[DAIKIN_DEVICES]
+    assert "1ece521b-5401-4a42-acce-6f76fba246aa" not in second_entry.runtime_data[DAIKIN_DEVICES]
+    first_api = config_entry.runtime_data[DAIKIN_API]
+    second_api = second_entry.runtime_data[DAIKIN_API]
+    assert first_api is not second_api
+    assert first_api.scheduler is second_api.scheduler
+    assert first_api.transport == second_api.transport
+    assert list(hass.data[DAIKIN_DOMAIN]) == [SCHEDULER]
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, second_entry)
+    assert diagnostics["scheduler"]["accounts"].keys() == {config_entry.entry_id, second_entry.entry_id}
+
+    # The connection pool is closed when the last account is unloaded
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert hass.states.get("water_heater.altherma").state == "unavailable"
+    assert hass.data[DAIKIN_DOMAIN][SCHEDULER] is second_api.scheduler
+    assert await hass.config_entries.async_unload(second_entry.entry_id)
+    assert DAIKIN_DOMAIN not in hass.data
+
+
+async def test_failed_setup_releases_scheduler(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+) -> None:
+    """Test a failed setup doesn't keep the account in the shared scheduler."""
+    with patch_oauth_session(), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.async_config_entry_first_refresh",
+        side_effect=ConfigEntryAuthFailed("Token revoked"),
+    ):
+        assert not await hass.config_entries.async_setup(config_entry.entry_id)
+    assert config_entry.state is ConfigEntryState.SETUP_RETRY
+    assert DAIKIN_DOMAIN not in hass.data
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    with patch_oauth_session(), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.async_load_phase",
+        side_effect=RuntimeError("Storage broken"),
+    ):
+        assert not await hass.config_entries.async_setup(config_entry.entry_id)
+    assert config_entry.state is ConfigEntryState.SETUP_ERROR
+    assert DAIKIN_DOMAIN not in hass.data
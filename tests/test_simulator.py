@@ -0,0 +1,136 @@
+"""Test daikin_onecta against the Daikin cloud simulator."""
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import pytest
+from homeassistant.components.water_heater import ATTR_TEMPERATURE
+from homeassistant.components.water_heater import DOMAIN as WATER_HEATER_DOMAIN
+from homeassistant.components.water_heater import SERVICE_SET_TEMPERATURE
+from homeassistant.const import ATTR_ENTITY_ID
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import issue_registry as ir
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
+from .simulator import OnectaSimulator
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DOMAIN as DAIKIN_DOMAIN
+from custom_components.daikin_onecta.daikin_api import DaikinRateLimitError
+
+DEVICE_ID = "1ece521b-5401-4a42-acce-6f76fba246aa"
+
+
+async def test_simulator_stale_read(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    socket_enabled: None,
+) -> None:
+    """Test a write followed by a GET within the stale read window."""
+    now = [0.0]
+    simulator = OnectaSimulator(load_fixture_json("altherma"), stale_read_window=10, clock=lambda: now[0])
+
+    async with simulator.serve():
+        with patch_oauth_session(), patch(
+            "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+            return_value=0,
+        ):
+            assert await hass.config_entries.async_setup(config_entry.entry_id)
+            await hass.async_block_till_done()
+            assert hass.states.get("water_heater.altherma").attributes["temperature"] == 48
+
+            await hass.services.async_call(
+                WATER_HEATER_DOMAIN,
+                SERVICE_SET_TEMPERATURE,
+                {ATTR_ENTITY_ID: "water_heater.altherma", ATTR_TEMPERATURE: 58},
+                blocking=True,
+            )
+            await hass.async_block_till_done()
+            dhw = simulator.management_point(DEVICE_ID, "domesticHotWaterTank")
+            assert dhw["temperatureControl"]["value"]["operationModes"]["heating"]["setpoints"]["domesticHotWaterTemperature"]["value"] == 58
+
+            # Within the stale read window the GET returns the old setpoint
+            coordinator = config_entry.runtime_data[COORDINATOR]
+            now[0] = 5
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert hass.states.get("water_heater.altherma").attributes["temperature"] == 48
+
+            now[0] = 11
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert hass.states.get("water_heater.altherma").attributes["temperature"] == 58
+
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+    assert simulator.count("GET") == 3
+    assert simulator.count("PATCH", 204) == 1
+
+
+async def test_simulator_rate_limit(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    socket_enabled: None,
+) -> None:
+    """Test the rate limit headers and the 429 response of the simulator."""
+    now = [0.0]
+    simulator = OnectaSimulator(load_fixture_json("altherma"), minute_limit=2, clock=lambda: now[0])
+
+    async with simulator.serve():
+        with patch_oauth_session():
+            assert await hass.config_entries.async_setup(config_entry.entry_id)
+            await hass.async_block_till_done()
+            daikin_api = config_entry.runtime_data[DAIKIN_API]
+            assert daikin_api.rate_limits["remaining_minutes"] == 1
+
+            assert await daikin_api.getCloudDeviceDetails()
+            now[0] = 20
+            with pytest.raises(DaikinRateLimitError):
+                await daikin_api.getCloudDeviceDetails()
+            assert daikin_api.rate_limits["remaining_minutes"] == 0
+            assert daikin_api.rate_limits["retry_after"] == 41
+            assert ir.async_get(hass).async_get_issue(DAIKIN_DOMAIN, f"minute_rate_limit_{config_entry.entry_id}")
+
+            # After a minute new requests are allowed
+            now[0] = 60
+            assert await daikin_api.getCloudDeviceDetails()
+            assert ir.async_get(hass).async_get_issue(DAIKIN_DOMAIN, f"minute_rate_limit_{config_entry.entry_id}") is None
+
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+    assert simulator.count(status=429) == 1
+
+
+async def test_simulator_errors(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    socket_enabled: None,
+) -> None:
+    """Test the coordinator with injected errors and latency."""
+    simulator = OnectaSimulator(load_fixture_json("altherma"), latency=0.01, jitter=0.01)
+
+    async with simulator.serve():
+        with patch_oauth_session(), patch(
+            "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+            return_value=0,
+        ):
+            assert await hass.config_entries.async_setup(config_entry.entry_id)
+            await hass.async_block_till_done()
+
+            coordinator = config_entry.runtime_data[COORDINATOR]
+            config_entry.runtime_data[DAIKIN_API].retry_policy.base_delay = 0
+            simulator.error_rate = 1.0
+            await coordinator.async_refresh()
+            assert not coordinator.last_update_success
+
+            simulator.error_rate = 0.0
+            await coordinator.async_refresh()
+            assert coordinator.last_update_success
+
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
+
+    assert simulator.count("GET", 500) == 3
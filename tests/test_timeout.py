@@ -0,0 +1,111 @@
+"""Test daikin_onecta request timeouts and deadlines."""
+from unittest.mock import AsyncMock
+from unittest.mock import patch
+
+import homeassistant.helpers.entity_registry as er
+import pytest
+import requests
+import responses
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from syrupy import SnapshotAssertion
+
+from .conftest import load_fixture_json
+from .conftest import patch_oauth_session
+from .conftest import snapshot_platform_entities
+from .simulator import OnectaSimulator
+from custom_components.daikin_onecta.const import COORDINATOR
+from custom_components.daikin_onecta.const import DAIKIN_API
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.daikin_api import DaikinApiError
+from custom_components.daikin_onecta.deadline import remaining_time
+from custom_components.daikin_onecta.deadline import request_deadline
+from custom_components.daikin_onecta.diagnostics import async_get_config_entry_diagnostics
+
+
+def test_request_deadline() -> None:
+    """Test nested deadlines can only shorten the deadline."""
+    assert remaining_time(60) == 60
+    with request_deadline(10):
+        assert 9 < remaining_time(60) <= 10
+        with request_deadline(30):
+            assert 9 < remaining_time(60) <= 10
+        with request_deadline(5):
+            assert 4 < remaining_time(60) <= 5
+        assert remaining_time(2) == 2
+    assert remaining_time(60) == 60
+
+
+async def test_read_timeout(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    snapshot: SnapshotAssertion,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the configured timeouts are used and timeouts are counted."""
+    hass.config_entries.async_update_entry(config_entry, options={"connect_timeout": 5, "read_timeout": 20})
+    await snapshot_platform_entities(hass, config_entry, Platform.SENSOR, entity_registry, snapshot, "altherma")
+
+    coordinator = config_entry.runtime_data[COORDINATOR]
+    daikin_api = config_entry.runtime_data[DAIKIN_API]
+    daikin_api.retry_policy.base_delay = 0
+    with patch(
+        "custom_components.daikin_onecta.DaikinApi.async_get_access_token",
+        return_value="XXXXXX",
+    ), patch(
+        "custom_components.daikin_onecta.OnectaDataUpdateCoordinator.scan_ignore",
+        return_value=0,
+    ):
+        with responses.RequestsMock() as rsps:
+            rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", body=requests.ReadTimeout())
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert rsps.calls[0].request.req_kwargs["timeout"] == (5, 20)
+
+        assert not coordinator.last_update_success
+        assert daikin_api.metrics.timeouts == {"read": 3}
+
+        # Requests within an exceeded deadline are not sent
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as rsps:
+            with request_deadline(0), pytest.raises(DaikinApiError):
+                await daikin_api.getCloudDeviceDetails()
+            assert len(rsps.calls) == 0
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["request_metrics"]["timeouts"] == {"read": 3, "deadline": 1}
+    assert diagnostics["request_metrics"]["summary"]["timeouts"] == 4
+
+
+async def test_total_timeout(
+    hass: HomeAssistant,
+    config_entry: MockConfigEntry,
+    onecta_auth: AsyncMock,
+    socket_enabled: None,
+) -> None:
+    """Test a hanging request is abandoned after the total timeout and keeps the lock until it finished."""
+    simulator = OnectaSimulator(load_fixture_json("altherma"))
+    hass.config_entries.async_update_entry(config_entry, options={"total_timeout": 0.2})
+
+    async with simulator.serve():
+        with patch_oauth_session():
+            assert await hass.config_entries.async_setup(config_entry.entry_id)
+            await hass.async_block_till_done()
+
+            daikin_api = config_entry.runtime_data[DAIKIN_API]
+            daikin_api.retry_policy.attempts = 1
+            simulator.latency = 0.5
+            with pytest.raises(DaikinApiError):
+                await daikin_api.getCloudDeviceDetails()
+            assert daikin_api._cloud_lock.locked()
+            assert daikin_api.metrics.timeouts == {"total": 1}
+
+            # The next request is sent after the abandoned one finished, not alongside it
+            simulator.latency = 0
+            daikin_api.total_timeout = 5
+            assert await daikin_api.getCloudDeviceDetails()
+            assert [path for _, path, _ in simulator.requests] == ["/v1/gateway-devices"] * 3
+            assert not daikin_api._cloud_lock.locked()
+
+            assert await hass.config_entries.async_unload(config_entry.entry_id)
@@ -0,0 +1,70 @@
+"""Test daikin_onecta polling timetable."""
+from datetime import datetime
+
+from custom_components.daikin_onecta.timetable import Timetable
+
+MONDAY = datetime(2026, 10, 19)
+
+
+def test_options_timetable() -> None:
+    """Test the high and low frequency periods of the options."""
+    timetable = Timetable.from_options({"high_scan_start": "07:00:00", "low_scan_start": "22:00:00"})
+    assert timetable.interval(MONDAY.replace(hour=6, minute=59)) == 1800
+    assert timetable.interval(MONDAY.replace(hour=7)) == 600
+    assert timetable.interval(MONDAY.replace(hour=21, minute=59)) == 600
+    assert timetable.interval(MONDAY.replace(hour=22)) == 1800
+    assert timetable.next_boundary(MONDAY.replace(hour=6, minute=30, second=15)) == MONDAY.replace(hour=7)
+    assert timetable.next_boundary(MONDAY.replace(hour=23)) == MONDAY.replace(day=20, hour=7)
+
+    # A high frequency period over midnight
+    timetable = Timetable.from_options({"high_scan_start": "22:00:00", "low_scan_start": "06:00:00"})
+    assert timetable.interval(MONDAY.replace(hour=1)) == 600
+    assert timetable.interval(MONDAY.replace(hour=12)) == 1800
+
+    # The same start of both periods never uses the high frequency
+    timetable = Timetable.from_options({"high_scan_start": "07:00:00", "low_scan_start": "07:00:00"})
+    assert timetable.interval(MONDAY.replace(hour=12)) == 1800
+    assert timetable.next_boundary(MONDAY) is None
+
+
+def test_weekly_timetable() -> None:
+    """Test windows on weekdays and the weekend, wrapping around the week."""
+    timetable = Timetable(
+        [
+            ((0, 1, 2, 3, 4), "06:30", 300),
+            ((0, 1, 2, 3, 4), "08:00", 1200),
+            ((0, 1, 2, 3, 4), "17:00", 600),
+            ((0, 1, 2, 3, 4, 5, 6), "23:00", 3600),
+            ((5, 6), "09:00", 900),
+        ],
+        1800,
+    )
+    assert timetable.interval(MONDAY.replace(hour=0)) == 3600
+    assert timetable.interval(MONDAY.replace(hour=7)) == 300
+    assert timetable.interval(MONDAY.replace(hour=12)) == 1200
+    assert timetable.interval(MONDAY.replace(hour=18)) == 600
+    assert timetable.interval(MONDAY.replace(day=24, hour=7)) == 3600
+    assert timetable.interval(MONDAY.replace(day=24, hour=9)) == 900
+    assert timetable.next_boundary(MONDAY.replace(day=25, hour=23, minute=30)) == MONDAY.replace(day=26, hour=6, minute=30)
+    assert Timetable([], 1800).interval(MONDAY) == 1800
+
+
+def test_polling_windows() -> None:
+    """Test the polling windows of the options replace the high and low frequency periods."""
+    timetable = Timetable.from_options(
+        {
+            "high_scan_start": "07:00:00",
+            "polling_windows": [
+                {"name": "office", "days": ["mon", "tue", "wed", "thu", "fri"], "start": "08:00", "interval": 10},
+                {"name": "evening", "days": ["mon", "tue", "wed", "thu", "fri"], "start": "18:00", "interval": 60},
+                {"name": "weekend", "days": ["sat", "sun"], "start": "00:00", "interval": 240},
+            ],
+        }
+    )
+    # Until the office window Monday continues the weekend window, the other days the evening window
+    assert timetable.interval(MONDAY.replace(hour=7, minute=30)) == 14400
+    assert timetable.interval(MONDAY.replace(day=20, hour=7, minute=30)) == 3600
+    assert timetable.interval(MONDAY.replace(hour=9)) == 600
+    assert timetable.interval(MONDAY.replace(day=25, hour=9)) == 14400
+    # Tuesday to Friday have 8 polls before the office, 60 in the office and 6 in the evening
+    assert timetable.requests_per_day() == 74
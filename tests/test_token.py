@@ -0,0 +1,100 @@
+"""Test daikin_onecta token refresh."""
+import asyncio
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import responses
+from aiohttp import ClientError
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.daikin_onecta.const import DAIKIN_API_URL
+from custom_components.daikin_onecta.const import DOMAIN
+from custom_components.daikin_onecta.daikin_api import DaikinApi
+from custom_components.daikin_onecta.daikin_api import TOKEN_REFRESH_MARGIN
+from custom_components.daikin_onecta.daikin_api import TOKEN_REFRESH_RETRY
+from custom_components.daikin_onecta.scheduler import async_release_scheduler
+
+
+def token_entry(hass: HomeAssistant, expires_in) -> MockConfigEntry:
+    """Return a config entry with a token expiring in expires_in seconds."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            "auth_implementation": "cloud",
+            "token": {"refresh_token": "mock-refresh-token", "access_token": "token-0", "expires_at": time.time() + expires_in},
+        },
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+def token_implementation(release=None):
+    """Return an OAuth implementation handing out numbered tokens."""
+    implementation = MagicMock()
+
+    async def refresh_token(token):
+        if release is not None:
+            await release.wait()
+        return {**token, "access_token": f"token-{implementation.async_refresh_token.call_count}", "expires_at": time.time() + 3600}
+
+    implementation.async_refresh_token = AsyncMock(side_effect=refresh_token)
+    return implementation
+
+
+async def test_token_refresh_single_flight(hass: HomeAssistant) -> None:
+    """Test concurrent requests share one refresh which doesn't hold the cloud lock."""
+    entry = token_entry(hass, -10)
+    release = asyncio.Event()
+    implementation = token_implementation(release)
+    daikin_api = DaikinApi(hass, entry, implementation)
+
+    tokens = asyncio.gather(*(daikin_api.async_get_access_token() for _ in range(3)))
+    with responses.RequestsMock() as rsps:
+        rsps.get(DAIKIN_API_URL + "/v1/gateway-devices", status=200, json=[])
+        request = hass.async_create_task(daikin_api.doBearerRequest("GET", "/v1/gateway-devices"))
+        await asyncio.sleep(0)
+        assert not daikin_api._cloud_lock.locked()
+
+        release.set()
+        assert await tokens == ["token-1"] * 3
+        assert await request == []
+        assert rsps.calls[0].request.headers["Authorization"] == "Bearer token-1"
+
+    assert implementation.async_refresh_token.call_count == 1
+    assert entry.data["token"]["access_token"] == "token-1"
+    async_release_scheduler(hass, entry.entry_id)
+
+
+async def test_token_background_refresh(hass: HomeAssistant) -> None:
+    """Test the token is refreshed before it expires and a failed refresh is retried."""
+    entry = token_entry(hass, 3600)
+    implementation = token_implementation()
+    daikin_api = DaikinApi(hass, entry, implementation)
+
+    with patch("custom_components.daikin_onecta.daikin_api.random.uniform", return_value=0):
+        daikin_api.async_start_token_refresh()
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=3600 - TOKEN_REFRESH_MARGIN - 5))
+        await hass.async_block_till_done()
+        assert implementation.async_refresh_token.call_count == 0
+
+        refresh_token = implementation.async_refresh_token.side_effect
+        implementation.async_refresh_token.side_effect = ClientError("unreachable")
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=3600 - TOKEN_REFRESH_MARGIN + 1))
+        await hass.async_block_till_done()
+        assert implementation.async_refresh_token.call_count == 1
+        assert await daikin_api.async_get_access_token() == "token-0"
+
+        implementation.async_refresh_token.side_effect = refresh_token
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=3600 - TOKEN_REFRESH_MARGIN + TOKEN_REFRESH_RETRY + 2))
+        await hass.async_block_till_done()
+        assert implementation.async_refresh_token.call_count == 2
+        assert entry.data["token"]["access_token"] == "token-2"
+
+    daikin_api.async_stop_token_refresh()
+    async_release_scheduler(hass, entry.entry_id)